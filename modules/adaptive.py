@@ -0,0 +1,172 @@
+from collections import deque
+from dataclasses import dataclass, fields, replace
+from typing import Deque, List, Optional, Tuple
+
+from .capture import ENCODERS, RecordSpec, output_size
+from .constants import STATS_WARMUP_SEC
+from .procstats import cpu_count
+from .progress import EncoderStats
+
+# Adaptivni kvalitet: zatvorena petlja nad -progress statistikom. Kad
+# enkoder kasni (speed < 1 ili drop/dup frejmovi) ide se stepenik nize
+# (brzi x264 preset -> manji fps -> manja rezolucija), a kad ima rezerve
+# (nizak CPU, bez dropova) stepenik vise. Ova klasa samo odlucuje;
+# Recorder primenjuje odluku na sledecoj bezbednoj granici.
+
+FPS_STEPS = (48, 30, 24, 15)
+SCALE_STEPS = (0.75, 0.5)
+
+@dataclass
+class AdaptiveConfig:
+    down_speed: float = 0.95     # prozorski speed ispod ovoga = kasni
+    max_drop_pct: float = 2.0    # (drop + dup) / frejmova u prozoru
+    down_hold_sec: float = 3.0
+    up_cpu_pct: float = 50.0     # CPU FFmpeg-a kao % svih jezgara
+    up_hold_sec: float = 30.0
+    cooldown_sec: float = 10.0
+    window_sec: float = 5.0
+    max_defer_sec: float = 10.0  # koliko step-down sme da ceka granicu segmenta
+    allow_fps: bool = True
+    allow_scale: bool = True
+    min_fps: int = 15
+
+    @classmethod
+    def from_cfg(cls, d: Optional[dict]) -> "AdaptiveConfig":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (d or {}).items() if k in names})
+
+@dataclass(frozen=True)
+class QualityLevel:
+    preset: str
+    fps: int
+    scale: float = 1.0
+
+    def describe(self) -> str:
+        return f"{self.preset}, {self.fps} fps, {self.scale:.0%}"
+
+def build_ladder(spec: RecordSpec, cfg: AdaptiveConfig, allow_geometry: bool = True) -> List[QualityLevel]:
+    presets = ENCODERS[spec.encoder].presets if spec.encoder in ENCODERS else ()
+    if spec.x264_preset in presets:
+        faster = list(reversed(presets[: presets.index(spec.x264_preset)]))
+    else:
+        faster = []
+    ladder = [QualityLevel(spec.x264_preset, spec.fps)]
+    for p in faster:
+        ladder.append(QualityLevel(p, spec.fps))
+    last = ladder[-1]
+    if allow_geometry and cfg.allow_fps:
+        for fps in [f for f in FPS_STEPS if cfg.min_fps <= f < spec.fps][:2]:
+            last = QualityLevel(last.preset, fps, last.scale)
+            ladder.append(last)
+    if allow_geometry and cfg.allow_scale:
+        for sc in SCALE_STEPS:
+            last = QualityLevel(last.preset, last.fps, sc)
+            ladder.append(last)
+    return ladder
+
+def apply_level(base: RecordSpec, level: QualityLevel) -> RecordSpec:
+    spec = replace(base, x264_preset=level.preset, fps=level.fps)
+    if level.scale < 1.0:
+        w, h = output_size(base)
+        # libx264 + yuv420p trazi parne dimenzije
+        wh = (int(w * level.scale) // 2 * 2, int(h * level.scale) // 2 * 2)
+        spec = replace(spec, res_mode="Custom", custom_wh=wh)
+    return spec
+
+class AdaptiveController:
+    def __init__(self, spec: RecordSpec, cfg: Optional[AdaptiveConfig] = None, allow_geometry: bool = True):
+        self.cfg = cfg or AdaptiveConfig()
+        self.base = spec
+        self.ladder = build_ladder(spec, self.cfg, allow_geometry)
+        self.level = 0
+        self.pending: Optional[int] = None
+        self._samples: Deque[Tuple[float, float, int, int, Optional[float]]] = deque()
+        self._bad_since: Optional[float] = None
+        self._good_since: Optional[float] = None
+        self._t_first: Optional[float] = None
+        self._last_change = 0.0
+        self._last_up = None
+        self._backoff = 1.0
+        self._ncpu = cpu_count()
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.ladder) > 1
+
+    @property
+    def current(self) -> QualityLevel:
+        return self.ladder[self.level]
+
+    def spec_for(self, level: int) -> RecordSpec:
+        return apply_level(self.base, self.ladder[level])
+
+    # Pauza / novi proces: stari uzorci vise ne vaze
+    def hold(self) -> None:
+        self._samples.clear()
+        self._bad_since = self._good_since = None
+        self._t_first = None
+
+    def window(self) -> Optional[Tuple[float, float, Optional[float]]]:
+        # (speed, drop %, CPU %) za poslednjih window_sec
+        if len(self._samples) < 2:
+            return None
+        t0, o0, f0, b0, c0 = self._samples[0]
+        t1, o1, f1, b1, c1 = self._samples[-1]
+        dt = t1 - t0
+        if dt <= 0:
+            return None
+        drop = (b1 - b0) * 100.0 / max(1, f1 - f0)
+        cpu = (c1 - c0) / dt / self._ncpu * 100.0 if c0 is not None and c1 is not None else None
+        return (o1 - o0) / dt, drop, cpu
+
+    def feed(self, stats: EncoderStats, cpu_sec: Optional[float], now: float) -> Optional[Tuple[int, str]]:
+        if stats.ended or self.pending is not None:
+            return None
+        # Zagrevanje se meri zidnim satom: spor enkoder sporo skuplja out_time
+        if self._t_first is None:
+            self._t_first = now
+        if now - self._t_first < STATS_WARMUP_SEC:
+            return None
+        self._samples.append((now, stats.out_time_sec, stats.frame, stats.drop_frames + stats.dup_frames, cpu_sec))
+        # Prozor uvek pokriva bar window_sec
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.cfg.window_sec:
+            self._samples.popleft()
+        w = self.window()
+        if w is None or now - self._samples[0][0] < self.cfg.window_sec * 0.8:
+            return None
+        speed, drop, cpu = w
+
+        bad = speed < self.cfg.down_speed or drop > self.cfg.max_drop_pct
+        good = not bad and speed >= 0.99 and drop == 0 and cpu is not None and cpu < self.cfg.up_cpu_pct
+        self._bad_since = (self._bad_since or now) if bad else None
+        self._good_since = (self._good_since or now) if good else None
+        stats_txt = f"speed {speed:.2f}x, drop {drop:.1f}%" + (f", CPU {cpu:.0f}%" if cpu is not None else "")
+
+        if bad and now - self._bad_since >= self.cfg.down_hold_sec and self.level < len(self.ladder) - 1:
+            # Pad odmah posle penjanja: sledece penjanje tek posle duzeg cekanja
+            if self._last_up is not None and now - self._last_up < self.cfg.up_hold_sec * self._backoff:
+                self._backoff = min(8.0, self._backoff * 2)
+            self.pending = self.level + 1
+            return self.pending, f"kasni ({stats_txt})"
+        if (
+            good and self.level > 0
+            and now - self._good_since >= self.cfg.up_hold_sec * self._backoff
+            and now - self._last_change >= self.cfg.cooldown_sec
+        ):
+            self.pending = self.level - 1
+            return self.pending, f"ima rezerve ({stats_txt})"
+        return None
+
+    def applied(self, now: float) -> None:
+        if self.pending is None:
+            return
+        if self.pending < self.level:
+            self._last_up = now
+        self.level, self.pending = self.pending, None
+        self._last_change = now
+        self.hold()
+
+    def rejected(self, now: float) -> None:
+        self.pending = None
+        self._last_change = now
+        self.hold()
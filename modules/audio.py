@@ -0,0 +1,322 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict, replace
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .constants import (
+    AUDIO_BUFFER_MS, AUDIO_DEFAULT_DEVICE, AUDIO_DEVICES_FILE, AUDIO_DEVICES_TTL_SEC, AUDIO_THREAD_QUEUE, FFMPEG_PATH,
+    FFMPEG_LOGLEVEL, STOP_TIMEOUT_SEC, ensure_dir,
+)
+from .progress import ProgressParser
+
+# Audio ulazi: enumeracija uredjaja (kes na disku, osvezavanje u pozadini),
+# ulazni argumenti po platformi i zaseban FFmpeg proces po uredjaju koji
+# pise lossless medjufajl (FLAC u Matroski) - mux sa videom ide na finalize.
+# Uredjaj "lavfi:<src>" je sinteticki izvor (npr. lavfi:sine) za testove.
+
+@dataclass
+class AudioDevice:
+    name: str            # ono sto ide u -i
+    label: str = ""      # ljudski opis (pulse), ili isto sto i name
+    kind: str = "dshow"  # dshow / pulse
+    loopback: bool = False  # sistemski zvuk (Stereo Mix, pulse monitor)
+    default: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.label or self.name
+
+# --- Parseri izlaza FFmpeg-a
+# Novi FFmpeg:   [dshow @ 0x..] "Stereo Mix (Realtek(R) Audio)" (audio)
+# Stari FFmpeg:  [dshow @ 0x..] DirectShow audio devices  + [dshow @ 0x..]  "Ime"
+_DSHOW_NEW = re.compile(r'\]\s+"(.+)"\s+\((audio|video|audio, video|none)\)\s*$')
+_DSHOW_OLD = re.compile(r'\]\s+"(.+)"\s*$')
+_LOOPBACK_HINTS = ("stereo mix", "what u hear", "loopback", "wave out", "monitor of")
+
+def _is_loopback(text: str) -> bool:
+    t = text.lower()
+    return any(h in t for h in _LOOPBACK_HINTS)
+
+def parse_dshow_devices(text: str) -> List[AudioDevice]:
+    out, section = [], None
+    for line in text.splitlines():
+        if "Alternative name" in line:
+            continue
+        if "DirectShow audio devices" in line:
+            section = "audio"
+            continue
+        if "DirectShow video devices" in line:
+            section = "video"
+            continue
+        m = _DSHOW_NEW.search(line)
+        if m:
+            if "audio" in m.group(2):
+                out.append(AudioDevice(m.group(1), kind="dshow", loopback=_is_loopback(m.group(1))))
+            continue
+        m = _DSHOW_OLD.search(line)
+        if m and section == "audio":
+            out.append(AudioDevice(m.group(1), kind="dshow", loopback=_is_loopback(m.group(1))))
+    return out
+
+# "ffmpeg -sources pulse":  [*] ime [opis] (none)
+_SOURCE = re.compile(r"^\s*(\*)?\s*(\S+)\s+\[(.*)\]")
+
+def parse_pulse_sources(text: str) -> List[AudioDevice]:
+    out = []
+    for line in text.splitlines():
+        m = _SOURCE.match(line)
+        if not m:
+            continue
+        name, label = m.group(2), m.group(3)
+        out.append(AudioDevice(name, label, "pulse", name.endswith(".monitor") or _is_loopback(label), bool(m.group(1))))
+    return out
+
+def _popen_flags() -> int:
+    return subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+def list_audio_devices(ffmpeg_path: str = FFMPEG_PATH, platform: str = sys.platform) -> Optional[List[AudioDevice]]:
+    if platform == "win32":
+        args, parse, stream = ["-list_devices", "true", "-f", "dshow", "-i", "dummy"], parse_dshow_devices, "stderr"
+    else:
+        args, parse, stream = ["-sources", "pulse"], parse_pulse_sources, "stdout"
+    try:
+        p = subprocess.run(
+            [ffmpeg_path, "-hide_banner"] + args, stdin=subprocess.DEVNULL, capture_output=True, timeout=10,
+            creationflags=_popen_flags(),
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    found = parse(getattr(p, stream).decode("utf-8", "replace"))
+    # dshow uvek izlazi sa greskom ("dummy"); prazna lista + greska = enumeracija nije uspela
+    return found if found or p.returncode == 0 else None
+
+# Ulaz za jedan uredjaj. Veci thread_queue_size = audio paketi cekaju u
+# sopstvenom redu umesto da zastoj uredjaja koci demux videa.
+def audio_input_args(device: str, platform: str = sys.platform) -> List[str]:
+    if device.startswith("lavfi:"):
+        # arealtime: tempo pravog uredjaja (-re ima pocetni burst koji kvari pomeraj)
+        return ["-f", "lavfi", "-i", (device[len("lavfi:"):] or "sine") + ",arealtime"]
+    if platform == "win32":
+        return [
+            "-f", "dshow", "-audio_buffer_size", str(AUDIO_BUFFER_MS), "-thread_queue_size", str(AUDIO_THREAD_QUEUE),
+            "-i", f"audio={device}",
+        ]
+    return ["-f", "pulse", "-thread_queue_size", str(AUDIO_THREAD_QUEUE), "-i", device]
+
+# --- Kes uredjaja: lista je odmah dostupna (disk), enumeracija ide u pozadini
+class AudioDeviceCache:
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, path: Path = AUDIO_DEVICES_FILE,
+                 ttl: float = AUDIO_DEVICES_TTL_SEC):
+        self.ffmpeg_path = ffmpeg_path
+        self.path = Path(path)
+        self.ttl = ttl
+        from .recorder import Hook  # recorder uvozi ovaj modul
+        self.on_changed = Hook()  # (List[AudioDevice])
+        self._devices: Optional[List[AudioDevice]] = None
+        self._stamp = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Thread] = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            d = json.loads(self.path.read_text(encoding="utf-8"))
+            self._devices = [AudioDevice(**x) for x in d.get("devices", [])]
+            self._stamp = float(d.get("stamp", 0.0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def _save(self) -> None:
+        try:
+            ensure_dir(self.path.parent)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"stamp": self._stamp, "devices": [asdict(d) for d in self._devices or []]},
+                                      indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    # None = jos nikad enumerisano (tada se imena ne proveravaju)
+    def devices(self) -> Optional[List[AudioDevice]]:
+        with self._lock:
+            return list(self._devices) if self._devices is not None else None
+
+    @property
+    def stale(self) -> bool:
+        return self._devices is None or time.time() - self._stamp > self.ttl
+
+    def refresh_async(self, force: bool = False) -> None:
+        if not force and not self.stale:
+            return
+        if self._refreshing is not None and self._refreshing.is_alive():
+            return
+        self._refreshing = threading.Thread(target=self.refresh, daemon=True)
+        self._refreshing.start()
+
+    def refresh(self) -> Optional[List[AudioDevice]]:
+        found = list_audio_devices(self.ffmpeg_path)
+        if found is None:
+            return self.devices()
+        with self._lock:
+            changed = self._devices is None or [asdict(d) for d in found] != [asdict(d) for d in self._devices]
+            self._devices, self._stamp = found, time.time()
+        self._save()
+        if changed:
+            self.on_changed.emit(list(found))
+        return found
+
+    # Prvi uredjaj sistemskog zvuka (Stereo Mix / pulse monitor) sa ove masine
+    def loopback(self) -> Optional[str]:
+        for d in self.devices() or []:
+            if d.loopback:
+                return d.name
+        return None
+
+    # Tacno ime, pa bez obzira na velika/mala slova, pa prefiks/podstring
+    # ("Stereo Mix" -> "Stereo Mix (Realtek(R) Audio)"). None = nema ga.
+    def resolve(self, name: str) -> Optional[str]:
+        if name.startswith("lavfi:"):
+            return name
+        devs = self.devices()
+        if not devs:
+            return name
+        names = [d.name for d in devs]
+        if name in names:
+            return name
+        low = name.lower()
+        for test in (lambda n: n.lower() == low, lambda n: n.lower().startswith(low), lambda n: low in n.lower()):
+            hit = [n for n in names if test(n)]
+            if hit:
+                return hit[0]
+        return None
+
+_CACHE: Optional[AudioDeviceCache] = None
+
+def device_cache() -> AudioDeviceCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = AudioDeviceCache()
+    return _CACHE
+
+def audio_sources(spec) -> Tuple[str, ...]:
+    if not spec.record_audio:
+        return ()
+    return tuple(spec.audio_devices) or (AUDIO_DEFAULT_DEVICE,)
+
+# Replay ring nema finalize po snimku, pa je audio tamo uvek u video procesu
+def inline_audio(spec) -> Tuple[str, ...]:
+    return audio_sources(spec) if spec.audio_mode != "separate" or spec.output_mode == "replay" else ()
+
+def separate_audio(spec) -> Tuple[str, ...]:
+    return () if inline_audio(spec) else audio_sources(spec)
+
+# Imena iz spec-a -> stvarni uredjaji; uredjaj koji ne postoji se preskace
+# (snimanje krece bez tog traga) umesto da obori ceo start. Podrazumevani
+# sistemski zvuk (AUDIO_DEFAULT_DEVICE) kojeg nema -> loopback sa ove masine.
+def resolve_audio(spec, log: Callable[[str], None], cache: Optional[AudioDeviceCache] = None):
+    wanted = audio_sources(spec)
+    if not wanted:
+        return spec
+    cache = cache or device_cache()
+    found = []
+    for name in wanted:
+        real = cache.resolve(name)
+        if real is None and name == AUDIO_DEFAULT_DEVICE:
+            real = cache.loopback()
+        if real in found:
+            continue
+        if real is None:
+            log(f"Audio: uredjaj '{name}' ne postoji - snimam bez njega.")
+        else:
+            if real != name:
+                log(f"Audio: '{name}' -> '{real}'")
+            found.append(real)
+    return replace(spec, record_audio=bool(found), audio_devices=tuple(found))
+
+# --- Zaseban audio proces: uredjaj -> FLAC/Matroska medjufajl
+def audio_part_path(outfile: str, n: int) -> str:
+    p = Path(outfile)
+    return str(p.with_name(f"{p.stem}.a{n}.mka"))
+
+def build_audio_args(device: str, outfile: str, ffmpeg_path: str = FFMPEG_PATH,
+                     loglevel: str = FFMPEG_LOGLEVEL) -> List[str]:
+    return (
+        [ffmpeg_path, "-y", "-hide_banner", "-loglevel", loglevel, "-progress", "pipe:1", "-stats_period", "0.1",
+         "-nostats"]
+        + audio_input_args(device)
+        + ["-c:a", "flac", "-f", "matroska", outfile]
+    )
+
+class AudioCapture:
+    def __init__(self, device: str, outfile: str, ffmpeg_path: str = FFMPEG_PATH, log=None):
+        self.device = device
+        self.outfile = outfile
+        self.ffmpeg_path = ffmpeg_path
+        self.log = log or (lambda msg: None)
+        self.proc = None
+        self.first_wall: Optional[float] = None  # time.time() prvog uzorka
+        self.exit_code: Optional[int] = None
+        self._reader: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        try:
+            self.proc = subprocess.Popen(
+                build_audio_args(self.device, self.outfile, self.ffmpeg_path),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=_popen_flags(),
+            )
+        except OSError as e:
+            self.log(f"Audio '{self.device}': start nije uspeo ({e})")
+            return False
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        threading.Thread(target=self._read_err, daemon=True).start()
+        return True
+
+    # Pocetak se racuna isto kao za video: sat u trenutku bloka - out_time
+    def _read(self) -> None:
+        parser = ProgressParser()
+        for raw in iter(self.proc.stdout.readline, b""):
+            st = parser.feed(raw.decode("utf-8", "replace"))
+            if st is not None and self.first_wall is None and st.out_time_sec > 0:
+                self.first_wall = st.wall_time - st.out_time_sec
+
+    def _read_err(self) -> None:
+        for raw in iter(self.proc.stderr.readline, b""):
+            line = raw.decode("utf-8", "replace").strip()
+            if line:
+                self.log(f"Audio '{self.device}': {line}")
+
+    def request_stop(self) -> None:
+        if self.proc and self.proc.poll() is None:
+            try:
+                self.proc.stdin.write(b"q")
+                self.proc.stdin.flush()
+            except OSError:
+                pass
+
+    def wait(self, timeout: float = STOP_TIMEOUT_SEC) -> int:
+        if self.proc is None:
+            return -1
+        try:
+            self.exit_code = self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.exit_code = self.proc.wait()
+        if self._reader:
+            self._reader.join(timeout=1.0)
+        return self.exit_code
+
+    def kill(self) -> None:
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and os.path.isfile(self.outfile) and os.path.getsize(self.outfile) > 0
@@ -0,0 +1,250 @@
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict, field, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .constants import (
+    BENCH_SUITE_CASES, BENCH_SUITE_SECONDS, BENCH_SUITE_THRESHOLDS, DEFAULT_SCRATCH_ROOT, FFMPEG_PATH, LOG_DIR,
+    PRESETS, START_TIMEOUT_SEC, STATS_WARMUP_SEC, STOP_TIMEOUT_SEC, suggest_preset_for_monitor,
+)
+from .cli import build_spec
+from .procstats import cpu_count, cpu_seconds
+from .recorder import Recorder, RecState
+
+# Regresioni benchmark celog recorder-a: Recorder (lifecycle ispod
+# FfmpegController-a) -> FFmpeg nad sinteticki lavfi izvorom (-re, realno
+# vreme), po jedan slucaj za 1080p30 / 1440p60 / 4K60 sa presetom koji GUI
+# predlaze za taj monitor. Bez Qt-a, radi na goloj Linux masini.
+#   python -m modules.bench_suite --out bench.json --baseline prosli.json
+
+RESULTS_VERSION = 1
+
+@dataclass
+class CaseResult:
+    case: str
+    width: int
+    height: int
+    fps: int
+    preset: str
+    ok: bool = False
+    error: str = ""
+    start_latency_ms: Optional[float] = None
+    speed: Optional[float] = None         # odrzivo, posle warmup-a
+    frames: int = 0
+    drop_frames: int = 0
+    dup_frames: int = 0
+    drop_pct: Optional[float] = None
+    cpu_per_sec: Optional[float] = None   # CPU sekundi po snimljenoj sekundi
+    recorded_sec: float = 0.0
+    stop_ms: Optional[float] = None       # stop() -> izlaz procesa
+    finalize_ms: Optional[float] = None   # izlaz procesa -> fajl spreman
+    file_bytes: int = 0
+    checks: List[str] = field(default_factory=list)  # prekoraceni pragovi
+
+def _ffmpeg_version(ffmpeg_path: str) -> str:
+    try:
+        out = subprocess.run([ffmpeg_path, "-hide_banner", "-version"], capture_output=True, timeout=10).stdout
+        return out.decode("utf-8", "replace").splitlines()[0]
+    except (OSError, subprocess.TimeoutExpired, IndexError):
+        return "?"
+
+# Brzina iz out_time kroz zidni sat izmedju prvog uzorka posle warmup-a i
+# poslednjeg; warmup je po zidnom satu (spor enkoder ga po out_time ne stigne)
+def sustained_speed(history) -> Optional[float]:
+    live = [s for s in history if not s.ended]
+    if len(live) < 2:
+        return None
+    warm = [s for s in live if s.wall_time >= live[0].wall_time + STATS_WARMUP_SEC]
+    live = warm if len(warm) >= 2 else live
+    a, b = live[0], live[-1]
+    wall = b.wall_time - a.wall_time
+    return (b.out_time_sec - a.out_time_sec) / wall if wall > 0 else None
+
+# Jedan Recorder za sve slucajeve, kao kontroler u GUI-ju. spec ide kroz
+# isti build_spec kao CLI, sa praznim config-om (bez profila sa masine).
+def run_case(rec: Recorder, name: str, w: int, h: int, root: str, seconds: float = BENCH_SUITE_SECONDS,
+             log=None, **spec_kw) -> CaseResult:
+    log = log or (lambda msg: None)
+    pi = suggest_preset_for_monitor(w, h)
+    p = PRESETS[pi]
+    res = CaseResult(name, w, h, p.fps, p.name)
+    opts = {"geometry": f"{w}x{h}", "preset": pi, "backend": "lavfi", "output": root,
+            "output_mode": spec_kw.pop("output_mode", None)}
+    spec, _ = build_spec({}, opts)
+    spec = replace(spec, **spec_kw)
+
+    # on_process_ended stize posle finalize-a, a pre nego sto wait() pusti
+    marks: Dict[str, float] = {}
+    on_state = lambda s: marks.setdefault(s, time.perf_counter())
+    on_ended = lambda code: marks.setdefault("ended", time.perf_counter())
+    rec.on_state.connect(on_state)
+    rec.on_process_ended.connect(on_ended)
+    cpu = [None]
+    done = threading.Event()
+
+    # CPU se uzorkuje dok proces radi (posle exit-a /proc ili handle vise ne vazi)
+    def _sample():
+        while not done.wait(0.2):
+            proc = rec.proc
+            v = cpu_seconds(proc) if proc is not None else None
+            if v is not None:
+                cpu[0] = v
+
+    sampler = threading.Thread(target=_sample, daemon=True)
+    sampler.start()
+    try:
+        if not rec.start(spec):
+            res.error = "start nije prihvacen"
+            return res
+        deadline = time.perf_counter() + START_TIMEOUT_SEC + 1.0
+        while rec.state == RecState.STARTING and time.perf_counter() < deadline:
+            time.sleep(0.02)
+        if rec.state != RecState.RECORDING:
+            res.error = f"snimanje nije krenulo ({rec.state})"
+            rec.wait(STOP_TIMEOUT_SEC)
+            return res
+        res.start_latency_ms = rec.start_latency_ms
+        time.sleep(seconds)
+
+        t_stop = time.perf_counter()
+        rec.stop()
+        if not rec.wait(STOP_TIMEOUT_SEC + 30.0):
+            res.error = "stop/finalize timeout"
+            return res
+        if RecState.FINALIZING in marks:
+            res.stop_ms = (marks[RecState.FINALIZING] - t_stop) * 1000.0
+            if "ended" in marks:
+                res.finalize_ms = (marks["ended"] - marks[RecState.FINALIZING]) * 1000.0
+
+        history = rec.stats_history()
+        last = history[-1] if history else None
+        res.speed = sustained_speed(history)
+        if last is not None:
+            res.frames, res.drop_frames, res.dup_frames = last.frame, last.drop_frames, last.dup_frames
+            res.recorded_sec = last.out_time_sec
+            res.drop_pct = 100.0 * last.drop_frames / max(1, last.frame + last.drop_frames)
+            if cpu[0] is not None and last.out_time_sec > 0:
+                res.cpu_per_sec = cpu[0] / last.out_time_sec
+        res.file_bytes = sum(Path(f).stat().st_size for f in rec.parts if Path(f).is_file())
+        res.ok = rec.state == RecState.IDLE and rec.last_exit_code == 0
+        if not res.ok:
+            res.error = f"FFmpeg izlaz {rec.last_exit_code}"
+    finally:
+        done.set()
+        sampler.join()
+        rec.on_state.disconnect(on_state)
+        rec.on_process_ended.disconnect(on_ended)
+    log(
+        f"{name}: start {_fmt(res.start_latency_ms)} ms, speed {_fmt(res.speed, 3)}x, "
+        f"drop {res.drop_frames}/dup {res.dup_frames}, CPU {_fmt(res.cpu_per_sec, 2)} s/s, "
+        f"stop {_fmt(res.stop_ms)} ms, finalize {_fmt(res.finalize_ms)} ms"
+    )
+    return res
+
+def _fmt(v, nd=0) -> str:
+    return "N/A" if v is None else f"{v:.{nd}f}"
+
+# Apsolutni limiti + regresija u odnosu na baseline (isti slucaj)
+def check(res: CaseResult, baseline: Optional[dict], thresholds=BENCH_SUITE_THRESHOLDS) -> List[str]:
+    fails = [] if res.ok else [f"neuspesno: {res.error}"]
+    for metric, (limit, rel, slack) in thresholds.items():
+        v = getattr(res, metric, None)
+        if v is None:
+            continue
+        higher_better = metric == "speed"
+        if limit is not None and (v < limit if higher_better else v > limit):
+            fails.append(f"{metric} {v:.3g} {'<' if higher_better else '>'} limit {limit:g}")
+        old = (baseline or {}).get(metric)
+        if rel is None or old is None:
+            continue
+        delta = (old - v) if higher_better else (v - old)
+        if delta > max(abs(old) * rel, slack or 0.0):
+            fails.append(f"{metric} {v:.3g} vs baseline {old:.3g} (dozvoljeno {rel:.0%})")
+    return fails
+
+def run_suite(cases=BENCH_SUITE_CASES, seconds: float = BENCH_SUITE_SECONDS, ffmpeg_path: str = FFMPEG_PATH,
+              baseline: Optional[dict] = None, thresholds=BENCH_SUITE_THRESHOLDS, keep: bool = False,
+              log=None, **spec_kw) -> dict:
+    log = log or (lambda msg: None)
+    Path(DEFAULT_SCRATCH_ROOT).mkdir(parents=True, exist_ok=True)
+    root = tempfile.mkdtemp(prefix="bench_", dir=DEFAULT_SCRATCH_ROOT)
+    base = {c["case"]: c for c in (baseline or {}).get("cases", [])}
+    results = []
+    rec = Recorder(ffmpeg_path)
+    try:
+        for name, w, h in cases:
+            log(f"Benchmark {name} ({w}x{h}), {seconds:g}s...")
+            r = run_case(rec, name, w, h, root, seconds, log, **spec_kw)
+            r.checks = check(r, base.get(name), thresholds)
+            for c in r.checks:
+                log(f"  PRAG: {c}")
+            results.append(r)
+    finally:
+        rec.close()
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "platform": f"{platform.system()} {platform.release()} {platform.machine()}",
+            "python": platform.python_version(),
+            "cpus": cpu_count(),
+            "ffmpeg": _ffmpeg_version(ffmpeg_path),
+        },
+        "seconds": seconds,
+        "spec": spec_kw,
+        "thresholds": {k: list(v) for k, v in thresholds.items()},
+        "passed": all(not r.checks for r in results),
+        "cases": [asdict(r) for r in results],
+    }
+
+def main(argv=None) -> int:
+    names = [c[0] for c in BENCH_SUITE_CASES]
+    ap = argparse.ArgumentParser(prog="python -m modules.bench_suite",
+                                 description="Regresioni benchmark recorder-a na lavfi izvoru.")
+    ap.add_argument("--out", help="JSON rezultat (podrazumevano logs/bench/bench_<vreme>.json)")
+    ap.add_argument("--baseline", help="prethodni JSON rezultat za poredjenje")
+    ap.add_argument("--thresholds", help="JSON {metrika: [limit, rel, slack]} preko podrazumevanih")
+    ap.add_argument("--cases", default=",".join(names), help=f"podskup od: {', '.join(names)}")
+    ap.add_argument("--seconds", type=float, default=BENCH_SUITE_SECONDS)
+    ap.add_argument("--ffmpeg", default=FFMPEG_PATH)
+    ap.add_argument("--encoder")
+    ap.add_argument("--x264-preset", dest="x264_preset")
+    ap.add_argument("--output-mode", dest="output_mode")
+    ap.add_argument("--keep", action="store_true", help="ne brisi snimljene fajlove")
+    args = ap.parse_args(argv)
+
+    wanted = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in wanted if c not in names]
+    if unknown:
+        ap.error(f"nepoznat slucaj: {', '.join(unknown)}")
+    thresholds = dict(BENCH_SUITE_THRESHOLDS)
+    if args.thresholds:
+        thresholds.update({k: tuple(v) for k, v in json.loads(Path(args.thresholds).read_text("utf-8")).items()})
+    baseline = json.loads(Path(args.baseline).read_text("utf-8")) if args.baseline else None
+    spec_kw = {k: v for k, v in (("encoder", args.encoder), ("x264_preset", args.x264_preset),
+                                 ("output_mode", args.output_mode)) if v}
+
+    log = lambda msg: print(msg, file=sys.stderr, flush=True)
+    result = run_suite(
+        [c for c in BENCH_SUITE_CASES if c[0] in wanted], args.seconds, args.ffmpeg, baseline, thresholds,
+        args.keep, log, **spec_kw,
+    )
+    out = Path(args.out) if args.out else LOG_DIR / "bench" / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    log(f"Rezultat: {out} ({'OK' if result['passed'] else 'PRAGOVI PREKORACENI'})")
+    return 0 if result["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
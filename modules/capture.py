@@ -0,0 +1,559 @@
+import os
+import sys
+from pathlib import Path
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .audio import audio_input_args, inline_audio
+from .constants import (
+    AUDIO_BITRATE, DEDUP_KEEP_SEC, DEDUP_MAX_SEC, DEDUP_THRESHOLD, FFMPEG_PATH, FFMPEG_LOGLEVEL, PROGRESS_PERIOD_SEC,
+    STREAM_KEYFRAME_SEC, Rendition,
+)
+from .streaming import StreamTarget, build_tee_target
+
+# Opis jednog snimanja - sve sto treba da se sklopi FFmpeg komanda.
+# Namerno bez Qt-a i bez subprocess-a, da bi builder bio cista funkcija.
+@dataclass
+class RecordSpec:
+    left: int
+    top: int
+    width: int
+    height: int
+    fps: int
+    crf: int
+    outfile: str
+    backend: str = "gdigrab"
+    monitor_index: int = 1
+    res_mode: str = "Native"
+    custom_wh: Optional[Tuple[int, int]] = None
+    record_audio: bool = False
+    # Audio uredjaji (prazno = podrazumevani sistemski zvuk) i nacin snimanja:
+    # "inline" u video procesu, "separate" zaseban proces + mux na finalize
+    audio_devices: Tuple[str, ...] = ()
+    audio_mode: str = "inline"
+    display: str = ":0.0"
+    # Izlaz: "mp4" (klasican), "fmp4" (fragmentisan), "segment" ili "replay"
+    output_mode: str = "mp4"
+    frag_sec: float = 2.0
+    frag_size_mb: int = 0
+    segment_sec: int = 300
+    faststart: bool = False
+    replay_sec: int = 60
+    # Enkoder (podrazumevano ono sto je ranije bilo zakucano)
+    encoder: str = "libx264"
+    x264_preset: str = "veryfast"
+    threads: int = 0
+    # Region: left/top su apsolutni, origin je pocetak monitora (ddagrab
+    # ocekuje offset u odnosu na monitor). window = prozor koji se prati
+    # (gdigrab: naslov, x11grab: window id).
+    origin: Tuple[int, int] = (0, 0)
+    window: str = ""
+    # Two-stage: capture_codec = jeftin lossless kodek prvog koraka (vidi
+    # CAPTURE_CODECS), transcode_to = finalni fajl; max_bytes = granica
+    # velicine izlaza posle koje se snimanje uredno zaustavlja (0 = bez)
+    capture_codec: str = ""
+    transcode_to: str = ""
+    max_bytes: int = 0
+    # Disk: stage_to = konacan fajl kad se snima u staging folder (premesta se
+    # posle finalize-a), min_free_mb = stop pre nego sto se disk napuni
+    stage_to: str = ""
+    min_free_mb: int = 0
+    # VFR: (skoro) isti frejmovi se izbacuju pre enkodera, timestamp-ovi
+    # ostaju; dedup_threshold = mpdecimate "hi", dedup_max_sec = najduzi
+    # razmak izmedju zadrzanih frejmova
+    dedup: bool = False
+    dedup_threshold: int = DEDUP_THRESHOLD
+    dedup_max_sec: float = DEDUP_MAX_SEC
+    # Dodatni -metadata parovi (npr. zajednicki creation_time u multi sesiji)
+    metadata: Tuple[Tuple[str, str], ...] = ()
+    # Screenshot tap: dodatni rawvideo izlaz na stdout (0 = iskljucen)
+    tap_fps: float = 0.0
+    # Stream izlazi (RTMP/SRT/UDP/pipe) iz istog enkoda kao fajl (tee)
+    streams: Tuple[StreamTarget, ...] = ()
+    # Dodatne verzije snimka (proxy...) iz istog capture-a, svaka svoj fajl
+    renditions: Tuple[Rendition, ...] = ()
+
+    @classmethod
+    def for_monitor(cls, mon, fps: int, crf: int, outfile: str, **kw) -> "RecordSpec":
+        kw.setdefault("display", os.environ.get("DISPLAY", ":0.0"))
+        kw.setdefault("origin", (mon.left, mon.top))
+        return cls(mon.left, mon.top, mon.w, mon.h, fps, crf, str(outfile), monitor_index=mon.index, **kw)
+
+# Capture backend: ulazni argumenti, nativni pixel format grabbera i
+# procenjena cena po frejmu (ms po megapikselu) na tipicnoj masini.
+@dataclass(frozen=True)
+class CaptureBackend:
+    name: str
+    label: str
+    platforms: Tuple[str, ...]
+    pix_fmt: str
+    frame_cost_ms: float
+    input_args: Callable[[RecordSpec], List[str]]
+    vf_prefix: Tuple[str, ...] = ()
+    selectable: bool = True
+
+    def supported(self, platform: str = sys.platform) -> bool:
+        return not self.platforms or platform in self.platforms
+
+    def frame_ms(self, w: int, h: int) -> float:
+        return self.frame_cost_ms * (w * h) / 1_000_000.0
+
+    def max_fps(self, w: int, h: int) -> float:
+        ms = self.frame_ms(w, h)
+        return 1000.0 / ms if ms > 0 else float("inf")
+
+# Crop se radi u samom grabberu (offset + video_size), pa se konvertuje i
+# enkoduje samo izabrana oblast, ne ceo monitor
+def _gdigrab_input(s: RecordSpec) -> List[str]:
+    if s.window:
+        # Prozor: gdigrab prati prozor gde god da se pomeri
+        return [
+            "-f", "gdigrab", "-framerate", str(s.fps),
+            "-video_size", f"{s.width}x{s.height}",
+            "-i", f"title={s.window}",
+        ]
+    return [
+        "-f", "gdigrab",
+        "-framerate", str(s.fps),
+        "-offset_x", str(s.left),
+        "-offset_y", str(s.top),
+        "-video_size", f"{s.width}x{s.height}",
+        "-i", "desktop",
+    ]
+
+def _ddagrab_input(s: RecordSpec) -> List[str]:
+    if s.window:
+        raise ValueError("ddagrab ne podržava snimanje prozora - izaberi gdigrab.")
+    # ddagrab je lavfi source; output_idx je DXGI redni broj monitora (od 0)
+    src = (
+        f"ddagrab=output_idx={max(0, s.monitor_index - 1)}"
+        f":framerate={s.fps}:video_size={s.width}x{s.height}"
+    )
+    dx, dy = s.left - s.origin[0], s.top - s.origin[1]
+    if dx or dy:
+        src += f":offset_x={dx}:offset_y={dy}"
+    return ["-f", "lavfi", "-i", src]
+
+def _x11grab_input(s: RecordSpec) -> List[str]:
+    if s.window:
+        return [
+            "-f", "x11grab", "-framerate", str(s.fps),
+            "-window_id", s.window,
+            "-video_size", f"{s.width}x{s.height}",
+            "-i", s.display,
+        ]
+    return [
+        "-f", "x11grab",
+        "-framerate", str(s.fps),
+        "-video_size", f"{s.width}x{s.height}",
+        "-i", f"{s.display}+{s.left},{s.top}",
+    ]
+
+def _lavfi_input(s: RecordSpec) -> List[str]:
+    # -re drzi sinteticki izvor u realnom vremenu, kao pravi grabber
+    return ["-re", "-f", "lavfi", "-i", f"testsrc2=size={s.width}x{s.height}:rate={s.fps}"]
+
+# Rawvideo sa stdin-a (standby grabber ili Python izvor frejmova)
+PIPE_PIX_FMT = "yuv420p"
+
+def _pipe_input(s: RecordSpec) -> List[str]:
+    return [
+        "-f", "rawvideo",
+        "-pix_fmt", PIPE_PIX_FMT,
+        "-video_size", f"{s.width}x{s.height}",
+        "-framerate", str(s.fps),
+        "-i", "pipe:0",
+    ]
+
+CAPTURE_BACKENDS: Dict[str, CaptureBackend] = {}
+
+def register_backend(backend: CaptureBackend) -> None:
+    CAPTURE_BACKENDS[backend.name] = backend
+
+register_backend(CaptureBackend("gdigrab", "GDI (gdigrab)", ("win32",), "bgra", 9.0, _gdigrab_input))
+register_backend(CaptureBackend(
+    "ddagrab", "Desktop Duplication (ddagrab)", ("win32",), "bgra", 1.0, _ddagrab_input,
+    vf_prefix=("hwdownload", "format=bgra"),
+))
+register_backend(CaptureBackend("x11grab", "X11 (x11grab)", ("linux",), "bgr0", 3.0, _x11grab_input))
+register_backend(CaptureBackend("lavfi", "Sinteticki (lavfi testsrc2)", (), "yuv420p", 0.5, _lavfi_input))
+register_backend(CaptureBackend("pipe", "Rawvideo (stdin)", (), PIPE_PIX_FMT, 0.0, _pipe_input, selectable=False))
+
+def get_backend(name: str) -> CaptureBackend:
+    try:
+        return CAPTURE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Nepoznat capture backend: {name}") from None
+
+def available_backends(platform: str = sys.platform) -> List[CaptureBackend]:
+    return [b for b in CAPTURE_BACKENDS.values() if b.selectable and b.supported(platform)]
+
+def default_backend(platform: str = sys.platform) -> str:
+    if platform == "win32":
+        return "gdigrab"
+    if platform.startswith("linux"):
+        return "x11grab"
+    return "lavfi"
+
+def suggest_backend(w: int, h: int, fps: int, platform: str = sys.platform) -> str:
+    # Najjeftiniji pravi grabber koji stize ciljani fps; lavfi nikad nije predlog
+    real = [b for b in available_backends(platform) if b.name != "lavfi"]
+    fast = sorted((b for b in real if b.max_fps(w, h) >= fps), key=lambda b: b.frame_cost_ms)
+    return fast[0].name if fast else default_backend(platform)
+
+# Builder delovi - ciste funkcije nad RecordSpec
+def output_size(spec: RecordSpec) -> Tuple[int, int]:
+    if spec.res_mode == "Custom" and spec.custom_wh:
+        return spec.custom_wh
+    return spec.width, spec.height
+
+def frame_bytes(w: int, h: int, pix_fmt: str = PIPE_PIX_FMT) -> int:
+    if pix_fmt == "yuv420p":
+        return w * h * 3 // 2
+    if pix_fmt in ("bgra", "bgr0", "rgba"):
+        return w * h * 4
+    if pix_fmt in ("rgb24", "bgr24"):
+        return w * h * 3
+    raise ValueError(f"Nepodrzan pixel format: {pix_fmt}")
+
+def build_input_args(spec: RecordSpec) -> List[str]:
+    args = get_backend(spec.backend).input_args(spec)
+
+    # Audio ulazi posle videa (ulaz 0), svaki sa svojim redom paketa
+    for dev in inline_audio(spec):
+        args += audio_input_args(dev)
+    return args
+
+def build_video_filters(spec: RecordSpec) -> List[str]:
+    filters = list(get_backend(spec.backend).vf_prefix)
+    # Scale ako je custom rezolucija
+    if spec.res_mode == "Custom" and spec.custom_wh:
+        filters.append(f"scale={spec.custom_wh[0]}:{spec.custom_wh[1]}")
+    if spec.dedup:
+        filters.append(build_dedup_filter(spec))
+    return filters
+
+def dedup_keep(spec: RecordSpec) -> int:
+    return max(1, int(spec.fps * DEDUP_KEEP_SEC))
+
+# lo/hi u istom odnosu kao podrazumevani mpdecimate (320/768)
+def build_dedup_filter(spec: RecordSpec) -> str:
+    hi = max(0, int(spec.dedup_threshold))
+    return (
+        f"mpdecimate=hi={hi}:lo={hi * 5 // 12}:frac=0.33"
+        f":max={max(1, int(spec.fps * spec.dedup_max_sec))}:keep={dedup_keep(spec)}"
+    )
+
+def rendition_path(outfile: str, name: str) -> str:
+    p = Path(outfile)
+    return str(p.with_name(f"{p.stem}_{name}{p.suffix}"))
+
+# Spec jedne dodatne verzije: isti izvor, izlaz i mod, svoja velicina i
+# enkoder. None = veca od glavnog snimka (nema upscale-a).
+def rendition_spec(spec: RecordSpec, r: Rendition) -> Optional[RecordSpec]:
+    w, h = output_size(spec)
+    rh = r.height or h
+    if rh > h:
+        return None
+    rw = max(2, int(round(w * rh / h / 2.0)) * 2)
+    enc = get_encoder(r.encoder or spec.encoder)
+    # Preset koji enkoder ne poznaje -> njegov najbrzi
+    preset = r.x264_preset if r.x264_preset in enc.presets else enc.presets[0]
+    return replace(
+        spec, outfile=rendition_path(spec.outfile, r.name), res_mode="Custom", custom_wh=(rw, rh - rh % 2),
+        crf=r.crf, encoder=enc.name, x264_preset=preset, renditions=(), streams=(), tap_fps=0.0,
+    )
+
+# Lossless prvi korak (two-stage) nema verzije - one nastaju iz finalnog enkoda
+def rendition_specs(spec: RecordSpec) -> List[RecordSpec]:
+    if spec.capture_codec:
+        return []
+    return [rs for rs in (rendition_spec(spec, r) for r in spec.renditions) if rs is not None]
+
+# Enkoderi: kako se CRF i preset prevode u opcije konkretnog enkodera
+@dataclass(frozen=True)
+class EncoderInfo:
+    name: str
+    hw: bool
+    presets: Tuple[str, ...]  # od najbrzeg ka najkvalitetnijem
+    quality_args: Callable[[int], List[str]]
+    preset_flag: str = "-preset"
+    pix_fmt: str = "yuv420p"
+
+ENCODERS: Dict[str, EncoderInfo] = {
+    e.name: e for e in (
+        EncoderInfo(
+            "libx264", False, ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium"),
+            lambda q: ["-crf", str(q)],
+        ),
+        EncoderInfo(
+            "h264_nvenc", True, ("p1", "p2", "p3", "p4"),
+            lambda q: ["-rc", "vbr", "-cq", str(q), "-b:v", "0"],
+        ),
+        EncoderInfo(
+            "h264_qsv", True, ("veryfast", "faster", "fast", "medium"),
+            lambda q: ["-global_quality", str(q)], pix_fmt="nv12",
+        ),
+        EncoderInfo(
+            "h264_amf", True, ("speed", "balanced", "quality"),
+            lambda q: ["-rc", "cqp", "-qp_i", str(q), "-qp_p", str(q)], preset_flag="-quality",
+        ),
+    )
+}
+
+def get_encoder(name: str) -> EncoderInfo:
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Nepoznat enkoder: {name}") from None
+
+def build_video_codec_args(encoder: str, preset: str, quality: int, threads: int = 0) -> List[str]:
+    enc = get_encoder(encoder)
+    args = ["-c:v", enc.name, enc.preset_flag, preset] + enc.quality_args(quality)
+    if threads > 0 and not enc.hw:
+        args += ["-threads", str(threads)]
+    return args + ["-pix_fmt", enc.pix_fmt]
+
+# Prvi korak two-stage snimanja: sto manje CPU-a po frejmu, disk je jeftin
+CAPTURE_CODECS: Dict[str, Tuple[str, List[str]]] = {
+    "x264_qp0": ("H.264 lossless (ultrafast, qp 0)", ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0"]),
+    "utvideo": ("Ut Video (intraframe)", ["-c:v", "utvideo"]),
+    "ffv1": ("FFV1 (intraframe)", ["-c:v", "ffv1", "-level", "3", "-g", "1", "-slices", "4", "-slicecrc", "0"]),
+}
+
+def build_capture_codec_args(codec: str, threads: int = 0) -> List[str]:
+    try:
+        args = list(CAPTURE_CODECS[codec][1])
+    except KeyError:
+        raise ValueError(f"Nepoznat capture kodek: {codec}") from None
+    if threads > 0:
+        args += ["-threads", str(threads)]
+    return args + ["-pix_fmt", "yuv420p"]
+
+def build_encoder_args(spec: RecordSpec) -> List[str]:
+    # VFR: izbaceni frejmovi se ne vracaju, timestamp-ovi idu iz grabbera
+    args = ["-vsync", "vfr"] if spec.dedup else ["-vsync", "cfr", "-r", str(spec.fps)]
+    if spec.capture_codec:
+        args += build_capture_codec_args(spec.capture_codec, spec.threads)
+    else:
+        args += build_video_codec_args(spec.encoder, spec.x264_preset, spec.crf, spec.threads)
+        if spec.dedup and spec.encoder == "libx264":
+            # Lookahead kraci od keep-a: frejm posle promene ne ceka sledecu promenu
+            args += ["-rc-lookahead", str(max(1, dedup_keep(spec) // 2))]
+    # Crash-safe izlazi seku na keyframe-ovima, pa GOP mora da prati fragment;
+    # stream izlazi (ponovno povezivanje, novi gledaoci) krecu od keyframe-a
+    # (kod VFR-a broj frejmova ne meri vreme - keyframe po vremenu)
+    gop = [spec.frag_sec] if spec.output_mode in ("fmp4", "segment", "replay") else []
+    if spec.streams:
+        gop.append(STREAM_KEYFRAME_SEC)
+    if gop:
+        if spec.dedup:
+            args += ["-force_key_frames", f"expr:gte(t,n_forced*{min(gop):g})"]
+        else:
+            args += ["-g", str(max(1, int(round(spec.fps * min(gop)))))]
+    if inline_audio(spec):
+        # Medjufajl cuva audio bez gubitaka, AAC tek u transcode-u
+        args += ["-c:a", "flac"] if spec.capture_codec else ["-c:a", "aac", "-b:a", AUDIO_BITRATE]
+    return args
+
+# Sa vise audio ulaza FFmpeg sam bira samo jedan - zato eksplicitan map
+# (tee izlaz nema podrazumevane kodeke, pa bez map-a ne dobija nista)
+def build_map_args(spec: RecordSpec) -> List[str]:
+    devs = inline_audio(spec)
+    if not devs:
+        return ["-map", "0:v"] if spec.streams else []
+    args = ["-map", "0:v"]
+    for i in range(len(devs)):
+        args += ["-map", f"{i + 1}:a"]
+    return args
+
+def build_progress_args(url: Optional[str]) -> List[str]:
+    # Masinski citljiv tok statistike umesto parsiranja stderr-a
+    if not url:
+        return []
+    return ["-progress", url, "-stats_period", str(PROGRESS_PERIOD_SEC), "-nostats"]
+
+OUTPUT_MODES = {
+    "mp4": "MP4 (klasičan)",
+    "fmp4": "Fragmentisan MP4 (crash-safe)",
+    "segment": "Segmenti (crash-safe)",
+}
+FRAG_MOVFLAGS = "+frag_keyframe+empty_moov+default_base_moof"
+
+def segment_pattern(outfile: str) -> str:
+    p = Path(outfile)
+    return str(p.with_name(f"{p.stem}_%03d{p.suffix}"))
+
+def segment_list_path(outfile: str) -> str:
+    return str(Path(outfile).with_suffix(".ffconcat"))
+
+# Novi deo snimka posle promene parametara enkodera (adaptivni kvalitet)
+def part_path(outfile: str, n: int) -> str:
+    p = Path(outfile)
+    return str(p.with_name(f"{p.stem}_p{n:02d}{p.suffix}"))
+
+# Replay: kratki fragmentisani MP4 segmenti u scratch folderu (citljivi i
+# dok se pisu, kao u "segment" modu); outfile je samo baza imena
+def replay_pattern(outfile: str) -> str:
+    p = Path(outfile)
+    return str(p.with_name(f"{p.stem}_%06d.mp4"))
+
+def replay_list_path(outfile: str) -> str:
+    return str(Path(outfile).with_suffix(".csv"))
+
+def replay_ring_size(spec: RecordSpec) -> int:
+    return int(-(-spec.replay_sec // spec.frag_sec)) + 2
+
+# Muxer kao (format, opcije, cilj) - isti opis se renderuje kao CLI
+# argumenti ili kao tee slave (uz stream izlaze)
+def build_muxer(spec: RecordSpec) -> Tuple[Optional[str], List[Tuple[str, str]], str]:
+    if spec.output_mode == "fmp4":
+        opts = [
+            ("movflags", FRAG_MOVFLAGS),
+            ("frag_duration", str(int(spec.frag_sec * 1_000_000))),
+            ("flush_packets", "1"),  # bez ovoga fragment moze da ostane u avio baferu
+        ]
+        if spec.frag_size_mb > 0:
+            opts.append(("frag_size", str(spec.frag_size_mb * 1024 * 1024)))
+        return "mp4", opts, str(spec.outfile)
+    if spec.output_mode == "segment":
+        opts = [
+            ("segment_time", str(spec.segment_sec)),
+            ("reset_timestamps", "1"),
+            ("segment_format", "mp4"),
+            ("segment_format_options", f"movflags={FRAG_MOVFLAGS}:flush_packets=1"),
+            ("segment_list", segment_list_path(spec.outfile)),
+            ("segment_list_type", "ffconcat"),
+        ]
+        return "segment", opts, segment_pattern(spec.outfile)
+    if spec.output_mode == "replay":
+        opts = [
+            ("segment_time", str(spec.frag_sec)),
+            ("segment_format", "mp4"),
+            ("segment_format_options", f"movflags={FRAG_MOVFLAGS}:flush_packets=1"),
+            ("segment_list", replay_list_path(spec.outfile)),
+            ("segment_list_type", "csv"),
+            ("segment_list_size", str(replay_ring_size(spec))),
+        ]
+        return "segment", opts, replay_pattern(spec.outfile)
+    if spec.output_mode != "mp4":
+        raise ValueError(f"Nepoznat output mod: {spec.output_mode}")
+    return None, [], str(spec.outfile)
+
+def build_output_args(spec: RecordSpec) -> List[str]:
+    fmt, opts, target = build_muxer(spec)
+    args = []
+    for k, v in spec.metadata:
+        args += ["-metadata", f"{k}={v}"]
+    if spec.streams:
+        # Jedan enkod, vise izlaza: tee ne prenosi zahtev muxera za global
+        # header enkoderu, pa se trazi eksplicitno (mp4/flv ga traze)
+        return args + ["-flags", "+global_header", "-f", "tee", build_tee_target(fmt, opts, target, spec.streams)]
+    for k, v in opts:
+        args += [f"-{k}", v]
+    if fmt:
+        args += ["-f", fmt]
+    return args + [target]
+
+def build_record_args(
+    spec: RecordSpec,
+    ffmpeg_path: str = FFMPEG_PATH,
+    loglevel: str = FFMPEG_LOGLEVEL,
+    progress: Optional[str] = None,
+) -> List[str]:
+    args = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", loglevel]
+    args += build_progress_args(progress)
+    args += build_input_args(spec)
+    renditions = rendition_specs(spec)
+    if renditions:
+        args += build_rendition_args(spec, renditions)
+    else:
+        filters = build_video_filters(spec)
+        if filters:
+            args += ["-vf", ",".join(filters)]
+        args += build_map_args(spec)
+        args += build_encoder_args(spec)
+        args += build_output_args(spec)
+    if spec.tap_fps > 0:
+        args += build_tap_args(spec)
+    return args
+
+# Glavni snimak + verzije iz jednog capture-a: prefix grabbera, konverzija
+# boja i VFR dedup jednom, pa split; posle split-a svaka verzija ima samo
+# svoj scale, enkoder i izlaz (audio se enkoduje za svaki izlaz)
+def build_rendition_args(spec: RecordSpec, renditions: List[RecordSpec]) -> List[str]:
+    outs = [spec] + renditions
+    pix_fmt = get_encoder(spec.encoder).pix_fmt
+    pre = list(get_backend(spec.backend).vf_prefix) + [f"format={pix_fmt}"]
+    if spec.dedup:
+        pre.append(build_dedup_filter(spec))
+    graph = ["[0:v]" + ",".join(pre) + f",split={len(outs)}" + "".join(f"[s{i}]" for i in range(len(outs)))]
+    labels = []
+    for i, s in enumerate(outs):
+        w, h = output_size(s)
+        if (w, h) == (spec.width, spec.height):
+            labels.append(f"[s{i}]")
+            continue
+        graph.append(f"[s{i}]scale={w}:{h}[v{i}]")
+        labels.append(f"[v{i}]")
+    args = ["-filter_complex", ";".join(graph)]
+    audio = [f"{i + 1}:a" for i in range(len(inline_audio(spec)))]
+    for s, label in zip(outs, labels):
+        args += ["-map", label]
+        for a in audio:
+            args += ["-map", a]
+        args += build_encoder_args(s)
+        args += build_output_args(s)
+    return args
+
+# Tap za screenshot-ove: nativna velicina grabbera (pre scale-a), proreden
+# fps, RGB na stdout. -progress tada ide na stderr (vidi Recorder).
+# Kosta stalno (w*h*3*fps B/s kroz pipe + konverzija boja), pa je opt-in.
+TAP_PIX_FMT = "rgb24"
+
+def build_tap_args(spec: RecordSpec) -> List[str]:
+    filters = list(get_backend(spec.backend).vf_prefix) + [f"fps={spec.tap_fps:g}"]
+    return ["-map", "0:v", "-vf", ",".join(filters), "-pix_fmt", TAP_PIX_FMT, "-f", "rawvideo", "pipe:1"]
+
+# Vise izvora u jednom FFmpeg procesu: svi ulazi se otvaraju zajedno, a
+# svaki izvor ima svoj izlaz (map + filteri + enkoder). Audio, stream
+# izlazi i dodatne verzije se ne snimaju.
+def build_multi_record_args(
+    specs: List[RecordSpec],
+    ffmpeg_path: str = FFMPEG_PATH,
+    loglevel: str = FFMPEG_LOGLEVEL,
+    progress: Optional[str] = None,
+) -> List[str]:
+    specs = [replace(s, record_audio=False, tap_fps=0.0, streams=(), renditions=()) for s in specs]
+    args = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", loglevel]
+    args += build_progress_args(progress)
+    for s in specs:
+        args += build_input_args(s)
+    for i, s in enumerate(specs):
+        args += ["-map", f"{i}:v"]
+        filters = build_video_filters(s)
+        if filters:
+            args += ["-filter:v", ",".join(filters)]
+        args += build_encoder_args(s)
+        args += build_output_args(s)
+    return args
+
+# Standby: grabber stalno radi i salje rawvideo na stdout; scale i konverzija
+# boja se rade ovde, pa enkoder na START samo cita gotove frejmove.
+def build_standby_args(spec: RecordSpec, ffmpeg_path: str = FFMPEG_PATH, loglevel: str = FFMPEG_LOGLEVEL) -> List[str]:
+    # Dedup radi enkoder (pipe_spec ga zadrzava), grabber salje svaki frejm
+    grab = replace(spec, record_audio=False, tap_fps=0.0, dedup=False)
+    args = [ffmpeg_path, "-hide_banner", "-nostdin", "-loglevel", loglevel]
+    args += build_input_args(grab)
+    filters = build_video_filters(grab)
+    if filters:
+        args += ["-vf", ",".join(filters)]
+    args += ["-pix_fmt", PIPE_PIX_FMT, "-f", "rawvideo", "pipe:1"]
+    return args
+
+def pipe_spec(spec: RecordSpec) -> RecordSpec:
+    # Isti izlaz, ali ulaz je rawvideo sa stdin-a u vec skaliranoj velicini
+    w, h = output_size(spec)
+    return replace(
+        spec, backend="pipe", width=w, height=h, res_mode="Native", custom_wh=None, record_audio=False, tap_fps=0.0,
+    )
@@ -0,0 +1,448 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Optional, Tuple
+
+from .adaptive import AdaptiveConfig
+from .audio import AudioDeviceCache, device_cache
+from .capture import RecordSpec, OUTPUT_MODES, available_backends, default_backend, output_size
+from .constants import (
+    AUDIO_DEFAULT_DEVICE, CONTROL_PORT, DEDUP_MAX_SEC, DEDUP_THRESHOLD, DEFAULT_OUTPUT_ROOT, FFMPEG_PATH, PRESETS,
+    SHOT_BURST_HZ, SHOT_PNG_LEVEL, ensure_output_root, load_config, suggest_preset_for_monitor,
+)
+from .control import ControlServer
+from .encoder_bench import get_profile
+from .framesource import FRAME_SOURCES, FramePipeline, make_source
+from .hardware import WinMonitor, win32_list_monitors_with_dpi, win32_list_windows
+from .recorder import Recorder, RecState, new_capture_path
+from .region import Region, apply_area, region_presets
+from .screenshot import Screenshotter, same_area
+from .spans import SPANS
+from .storage import StorageConfig, plan as plan_storage, throughput_cache
+from .streaming import parse_targets
+
+# Headless snimanje bez Qt-a: isti RecordSpec builder i Recorder lifecycle
+# kao GUI, a status ide kao JSON linije na stdout (jedan objekat po liniji).
+#   python -m modules.cli record --monitor 1 --preset 2 --duration 600
+#   python -m modules.cli daemon   (komande kao JSON linije na stdin-u)
+
+class JsonOut:
+    def __init__(self, stream=None, logs: bool = True):
+        self.stream = stream or sys.stdout
+        self.logs = logs
+        self._lock = threading.Lock()  # hook-ovi stizu iz vise tredova
+
+    def emit(self, event: str, **kw) -> None:
+        line = json.dumps({"event": event, "t": round(time.time(), 3), **kw}, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                self.stream.write(line + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def attach(self, rec: Recorder) -> None:
+        rec.on_state.connect(lambda s: self.emit("state", state=s))
+        rec.on_status.connect(lambda msg, col: self.emit("status", msg=msg))
+        rec.on_started.connect(lambda f: self.emit("started", outfile=f, start_latency_ms=rec.start_latency_ms))
+        rec.on_failed.connect(lambda r: self.emit("failed", reason=r))
+        rec.on_process_ended.connect(lambda c: self.emit("ended", exit_code=c, files=list(rec.parts)))
+        rec.on_stats.connect(lambda s: self.emit("stats", **s.to_dict()))
+        rec.on_stream.connect(lambda target, kind, msg: self.emit("stream", target=target, kind=kind, msg=msg))
+        if self.logs:
+            rec.on_log_batch.connect(lambda lines: self.emit("log", lines=lines))
+
+# "1920x1080+0+0" -> monitor bez Win32 API-ja (x11grab, lavfi, testovi)
+def parse_geometry(text: str, index: int = 1) -> WinMonitor:
+    try:
+        wh, _, xy = text.partition("+")
+        w, h = (int(v) for v in wh.lower().split("x"))
+        x, y = (int(v) for v in xy.split("+")) if xy else (0, 0)
+    except ValueError:
+        raise ValueError(f"Neispravna geometrija '{text}' (ocekivano WxH+X+Y).")
+    return WinMonitor(index, "geometry", x, y, x + w, y + h)
+
+def find_monitor(index: int, geometry: Optional[str] = None) -> WinMonitor:
+    if geometry:
+        return parse_geometry(geometry, index)
+    for m in win32_list_monitors_with_dpi():
+        if m.index == index:
+            return m
+    raise ValueError(f"Monitor {index} ne postoji (--geometry WxH+X+Y za rucno zadatu oblast).")
+
+def _area(cfg: dict, mon: WinMonitor, opts: dict):
+    if opts.get("rect"):
+        try:
+            return Region(*(int(v) for v in str(opts["rect"]).split(",")))
+        except (TypeError, ValueError):
+            raise ValueError(f"Neispravan --rect '{opts['rect']}' (ocekivano x,y,w,h).")
+    if opts.get("region"):
+        found = region_presets(cfg).get(opts["region"])
+        if found is None:
+            raise ValueError(f"Region preset '{opts['region']}' ne postoji.")
+        return found[1]
+    if opts.get("window"):
+        title = str(opts["window"]).lower()
+        for w in win32_list_windows():
+            if title in w.title.lower():
+                return w
+        raise ValueError(f"Prozor '{opts['window']}' nije pronadjen.")
+    return None
+
+def _opt(opts: dict, key: str, default):
+    v = opts.get(key)
+    return default if v is None else v
+
+# opts: kljucevi iz argparse-a (record) ili JSON komande (daemon); ono sto
+# nije zadato uzima se iz config.json kao u GUI-ju.
+def build_spec(cfg: dict, opts: dict) -> Tuple[RecordSpec, Optional[AdaptiveConfig]]:
+    mon = find_monitor(int(opts.get("monitor") or 1), opts.get("geometry"))
+    pi = opts.get("preset")
+    pi = int(pi) if pi is not None else suggest_preset_for_monitor(mon.w, mon.h)
+    if not 0 <= pi < len(PRESETS):
+        raise ValueError(f"Preset {pi} ne postoji (0..{len(PRESETS) - 1}).")
+    p = PRESETS[pi]
+    fps = int(opts.get("fps") or p.fps)
+    crf = int(opts["crf"]) if opts.get("crf") is not None else p.crf
+    cwh = (p.width, p.height) if p.mode == "Custom" else None
+
+    root = opts.get("output") or cfg.get("OutputFolder", DEFAULT_OUTPUT_ROOT)
+    ok, msg = ensure_output_root(root)
+    if not ok:
+        raise ValueError(msg)
+    backend = opts.get("backend") or cfg.get("CaptureBackends", {}).get(mon.device, default_backend())
+    kw = {
+        "output_mode": opts.get("output_mode") or cfg.get("OutputMode", "mp4"),
+        "faststart": bool(_opt(opts, "faststart", cfg.get("Faststart", False))),
+        "frag_sec": float(cfg.get("FragmentSeconds", 2.0)),
+        "frag_size_mb": int(cfg.get("FragmentSizeMB", 0)),
+        "segment_sec": int(cfg.get("SegmentSeconds", 300)),
+        "dedup": bool(_opt(opts, "dedup", cfg.get("DedupVFR", False))),
+        "dedup_threshold": int(cfg.get("DedupThreshold", DEDUP_THRESHOLD)),
+        "dedup_max_sec": float(cfg.get("DedupMaxSeconds", DEDUP_MAX_SEC)),
+    }
+    # --stream dodaje cilj (ponovljivo), --streaming ukljucuje StreamTargets iz config-a
+    targets = opts.get("stream") or []
+    targets = [targets] if isinstance(targets, (str, dict)) else list(targets)
+    if _opt(opts, "streaming", cfg.get("Streaming", False)):
+        targets += list(cfg.get("StreamTargets") or [])
+    kw["streams"] = parse_targets(targets)
+    # --audio = sistemski zvuk, --audio-device dodaje tragove (npr. mikrofon)
+    devices = list(opts.get("audio_device") or [])
+    if opts.get("audio"):
+        devices.insert(0, cfg.get("AudioSystemDevice") or device_cache().loopback() or AUDIO_DEFAULT_DEVICE)
+    spec = RecordSpec.for_monitor(
+        mon, fps, crf, str(new_capture_path(root, mon.index)), backend=backend,
+        res_mode=p.mode, custom_wh=cwh, record_audio=bool(devices), audio_devices=tuple(devices),
+        renditions=() if opts.get("no_renditions") else p.renditions,
+        audio_mode=opts.get("audio_mode") or cfg.get("AudioMode", "inline"), **kw,
+    )
+    spec = apply_area(spec, mon, _area(cfg, mon, opts))
+    wh = cwh or (spec.width, spec.height)
+    prof = get_profile(cfg, wh[0], wh[1], fps)
+    if prof is not None:
+        spec = replace(spec, **prof.spec_kwargs())
+    adaptive = None
+    if _opt(opts, "adaptive", cfg.get("AdaptiveQuality", False)):
+        adaptive = AdaptiveConfig.from_cfg(cfg.get("Adaptive"))
+    return spec, adaptive
+
+def _spec_info(spec: RecordSpec) -> dict:
+    return {
+        "outfile": spec.outfile, "monitor": spec.monitor_index, "left": spec.left, "top": spec.top,
+        "width": spec.width, "height": spec.height, "fps": spec.fps, "crf": spec.crf, "backend": spec.backend,
+        "encoder": spec.encoder, "x264_preset": spec.x264_preset, "output_mode": spec.output_mode,
+        "dedup": spec.dedup, "streams": [t.label for t in spec.streams],
+        "renditions": [r.name for r in spec.renditions],
+    }
+
+def _dedup_info(rec: Recorder) -> dict:
+    if rec.spec is None or not rec.spec.dedup:
+        return {}
+    skipped, expected = rec.dedup_counts
+    return {"skipped_frames": skipped, "expected_frames": expected}
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def _install_signals() -> None:
+    signal.signal(signal.SIGINT, _interrupt)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _interrupt)
+    if hasattr(signal, "SIGBREAK"):  # Ctrl+Break na Windows-u
+        signal.signal(signal.SIGBREAK, _interrupt)
+
+# --- Komande
+def cmd_record(args) -> int:
+    out = JsonOut(logs=not args.quiet)
+    rec = Recorder(args.ffmpeg)
+    out.attach(rec)
+    try:
+        cfg = load_config()
+        spec, adaptive = build_spec(cfg, vars(args))
+        spec = plan_storage(spec, StorageConfig.from_cfg(cfg.get("Storage")), rec.log)
+        # Python izvor frejmova ulazi kao standby: enkoder cita rawvideo sa stdin-a
+        source = FramePipeline(make_source(args.source, *output_size(spec), spec.fps), rec.log) if args.source else None
+    except ValueError as e:
+        rec.close()
+        out.emit("error", msg=str(e))
+        return 2
+    out.emit("spec", **_spec_info(spec))
+    if source is not None and not source.start():
+        rec.close()
+        out.emit("error", msg="Izvor frejmova nije pokrenut.")
+        return 2
+
+    started = []
+    rec.on_started.connect(lambda f: started.append(time.monotonic()))
+    _install_signals()
+    if not rec.start(spec, standby=source, adaptive=adaptive):
+        if source is not None:
+            source.stop()
+        rec.close()
+        out.emit("done", state=rec.state, exit_code=None, files=[])
+        return 1
+
+    # Trajanje se racuna od prvog frejma, ne od pokretanja procesa
+    while True:
+        try:
+            if rec.wait(0.2):
+                break
+            if args.duration and started and time.monotonic() - started[0] >= args.duration:
+                rec.stop()
+        except KeyboardInterrupt:
+            out.emit("status", msg="Prekid - zaustavljam snimanje.")
+            rec.stop()
+    rec.close()
+    if source is not None:
+        source.stop()
+        out.emit("frame_source", **source.stats())
+    out.emit("done", state=rec.state, exit_code=rec.last_exit_code, files=list(rec.parts),
+             renditions=list(rec.rendition_files), **_dedup_info(rec))
+    _measure_deferred_disks(out)
+    return 0 if rec.state == RecState.IDLE and rec.last_exit_code == 0 else 1
+
+# Disk koji plan() nije zatekao izmeren meri se posle snimanja (za sledeci start)
+def _measure_deferred_disks(out) -> None:
+    cache = throughput_cache()
+    for folder in cache.take_pending():
+        mbps = cache.measure(folder)
+        if mbps:
+            out.emit("disk", folder=folder, mbps=round(mbps, 1))
+
+# Daemon: jedan Recorder, komande kao JSON linije na stdin-u:
+#   {"cmd": "start", "monitor": 1, "preset": 2, "duration": 600}
+#   {"cmd": "pause"} | {"cmd": "stop"} | {"cmd": "marker", "label": "x"} | {"cmd": "screenshot"}
+#   {"cmd": "status"} | {"cmd": "quit"}
+# Sa --listen iste komande stizu i preko lokalnog kontrolnog API-ja (control.py).
+def cmd_daemon(args) -> int:
+    out = JsonOut(logs=not args.quiet)
+    rec = Recorder(args.ffmpeg)
+    out.attach(rec)
+    shots = Screenshotter(args.ffmpeg)
+    shots.on_saved.connect(lambda paths: out.emit("screenshot_saved", paths=paths))
+    shots.on_failed.connect(lambda r: out.emit("error", msg=r))
+    timer = [None]
+    quit_ev = threading.Event()
+
+    # Timer trajanja vazi samo za snimak koji ga je zadao: kraj snimka (i
+    # sam od sebe) ga gasi, da ne bi zaustavio sledeci start
+    def cancel_timer(*_):
+        t, timer[0] = timer[0], None
+        if t:
+            t.cancel()
+
+    rec.on_process_ended.connect(cancel_timer)
+    rec.on_process_ended.connect(
+        lambda c: threading.Thread(target=_measure_deferred_disks, args=(out,), daemon=True).start()
+    )
+
+    def status(cmd):
+        s = rec.latest_stats
+        return {
+            "state": rec.state, "paused": rec.is_paused, "outfile": rec.spec.outfile if rec.spec else None,
+            "files": list(rec.parts), "stats": s.to_dict() if s else None,
+        }
+
+    def start(cmd):
+        if rec.is_busy:
+            raise ValueError("Snimanje je vec u toku.")
+        cancel_timer()
+        cfg = load_config()
+        spec, adaptive = build_spec(cfg, cmd)
+        spec = plan_storage(spec, StorageConfig.from_cfg(cfg.get("Storage")), rec.log)
+        out.emit("spec", **_spec_info(spec))
+        if not rec.start(spec, adaptive=adaptive):
+            raise ValueError("Start nije prihvacen.")
+        if cmd.get("duration"):
+            timer[0] = threading.Timer(float(cmd["duration"]), rec.stop)
+            timer[0].daemon = True
+            timer[0].start()
+        return {"outfile": spec.outfile}
+
+    def stop(cmd=None):
+        cancel_timer()
+        rec.stop()
+
+    def marker(cmd):
+        pos = rec.marker(cmd.get("label") or "")
+        if pos is None:
+            raise ValueError("Marker: snimanje nije u toku.")
+        return {"t": round(pos, 3), "index": len(rec.markers)}
+
+    # Tokom snimanja iste oblasti frejm ide iz tap-a, inace kratak grabber
+    def screenshot(cmd):
+        cfg = load_config()
+        spec, _ = build_spec(cfg, cmd)
+        root = cmd.get("output") or cfg.get("OutputFolder", DEFAULT_OUTPUT_ROOT)
+        tap = rec.frame_tap if same_area(rec.spec, spec) else None
+        fmt = cmd.get("format") or cfg.get("ScreenshotFormat", "png")
+        if not shots.shoot(spec, root, int(cmd.get("count") or 1), float(cmd.get("hz") or SHOT_BURST_HZ), fmt,
+                           int(cfg.get("ScreenshotPngLevel", SHOT_PNG_LEVEL)), tap=tap):
+            raise ValueError(f"Screenshot nije pokrenut ({fmt}).")
+        return {"queued": True, "tap": tap is not None}
+
+    handlers = {"start": start, "stop": stop, "pause": lambda c: rec.pause_toggle(), "marker": marker,
+                "screenshot": screenshot, "status": status}
+    server = None
+    if args.listen is not None:
+        cfg = load_config()
+        handlers["quit"] = lambda c: quit_ev.set()
+        server = ControlServer(handlers, args.listen or int(cfg.get("ControlPort", CONTROL_PORT)),
+                               str(cfg.get("ControlToken", "")), log=rec.log)
+        if not server.start():
+            rec.close()
+            shots.close()
+            out.emit("error", msg="Kontrolni API nije pokrenut.")
+            return 2
+        server.attach(rec, shots)
+
+    def read_stdin():
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                cmd = json.loads(line)
+                name = cmd["cmd"]
+            except (ValueError, KeyError, TypeError):
+                out.emit("error", msg=f"Neispravna komanda: {line[:200]}")
+                continue
+            if name == "quit":
+                break
+            fn = handlers.get(name)
+            if fn is None:
+                out.emit("error", msg=f"Nepoznata komanda '{name}'.")
+                continue
+            try:
+                res = fn(cmd)
+            except ValueError as e:
+                out.emit("error", msg=str(e))
+                continue
+            if name in ("status", "marker"):
+                out.emit("snapshot" if name == "status" else "marker", **res)
+        else:
+            # Zatvoren stdin: daemon sa --listen nastavlja do "quit" preko API-ja
+            if server is not None:
+                return
+        quit_ev.set()
+
+    _install_signals()
+    out.emit("ready", pid=os.getpid(), port=server.port if server else None)
+    threading.Thread(target=read_stdin, daemon=True).start()
+    try:
+        while not quit_ev.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    if server is not None:
+        server.stop()
+    stop()
+    rec.close()
+    shots.close()
+    out.emit("done", state=rec.state, exit_code=rec.last_exit_code, files=list(rec.parts),
+             renditions=list(rec.rendition_files), **_dedup_info(rec))
+    return 0
+
+def cmd_monitors(args) -> int:
+    for m in win32_list_monitors_with_dpi():
+        JsonOut().emit(
+            "monitor", index=m.index, device=m.device, left=m.left, top=m.top, width=m.w, height=m.h,
+            scale_pct=m.scale_pct, suggested_preset=suggest_preset_for_monitor(m.w, m.h),
+        )
+    return 0
+
+def cmd_audio_devices(args) -> int:
+    cache = AudioDeviceCache(args.ffmpeg)
+    for d in cache.refresh() or []:
+        JsonOut().emit("audio_device", name=d.name, label=d.label, kind=d.kind, loopback=d.loopback, default=d.default)
+    return 0
+
+def cmd_presets(args) -> int:
+    for i, p in enumerate(PRESETS):
+        JsonOut().emit("preset", index=i, name=p.name, fps=p.fps, crf=p.crf, mode=p.mode, width=p.width,
+                       height=p.height)
+    return 0
+
+def _add_spec_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--monitor", type=int, default=1, help="indeks monitora (1..N)")
+    p.add_argument("--geometry", help="oblast WxH+X+Y umesto Win32 monitora")
+    p.add_argument("--preset", type=int, help=f"indeks u PRESETS (0..{len(PRESETS) - 1}); podrazumevano po monitoru")
+    p.add_argument("--fps", type=int)
+    p.add_argument("--crf", type=int)
+    p.add_argument("--output", help="output root (podrazumevano OutputFolder iz config-a)")
+    p.add_argument("--backend", choices=[b.name for b in available_backends()])
+    p.add_argument("--output-mode", dest="output_mode", choices=list(OUTPUT_MODES))
+    p.add_argument("--faststart", action="store_true", default=None)
+    p.add_argument("--audio", action="store_true", help="sistemski zvuk (Stereo Mix)")
+    p.add_argument("--audio-device", dest="audio_device", action="append", metavar="NAME",
+                   help="dodatni audio uredjaj kao poseban trag (ponovljivo; lavfi:sine za test)")
+    p.add_argument("--audio-mode", dest="audio_mode", choices=["inline", "separate"],
+                   help="audio u video procesu ili zaseban proces + mux posle stopa")
+    p.add_argument("--adaptive", action="store_true", default=None)
+    p.add_argument("--dedup", action="store_true", default=None, help="VFR: preskoci staticne (iste) frejmove")
+    p.add_argument("--stream", action="append", metavar="URL",
+                   help="i stream iz istog enkoda (rtmp/srt/udp/tcp URL ili pipe; ponovljivo)")
+    p.add_argument("--streaming", action="store_true", default=None, help="i StreamTargets iz config-a")
+    p.add_argument("--no-renditions", dest="no_renditions", action="store_true",
+                   help="samo glavni snimak, bez dodatnih verzija preseta (proxy)")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--rect", help="region x,y,w,h unutar monitora")
+    g.add_argument("--region", help="ime region preseta iz config-a")
+    g.add_argument("--window", help="deo naslova prozora")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.cli", description="Headless snimanje (JSON status na stdout).")
+    ap.add_argument("--ffmpeg", default=FFMPEG_PATH)
+    ap.add_argument("--quiet", action="store_true", help="bez FFmpeg log linija")
+    ap.add_argument("--spans", metavar="JSONL", help="latencije (first_frame/stop/finalize) u JSONL fajl")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="snimi jedan fajl")
+    _add_spec_args(p)
+    p.add_argument("--duration", type=float, default=0.0, help="sekunde od prvog frejma (0 = do Ctrl+C)")
+    p.add_argument("--source", choices=list(FRAME_SOURCES), help="Python izvor frejmova umesto FFmpeg grabbera")
+    p.set_defaults(fn=cmd_record)
+    p = sub.add_parser("daemon", help="komande kao JSON linije na stdin-u")
+    p.add_argument("--listen", type=int, nargs="?", const=0, metavar="PORT",
+                   help=f"i lokalni kontrolni API na 127.0.0.1 (bez PORT-a: ControlPort iz config-a / {CONTROL_PORT})")
+    p.set_defaults(fn=cmd_daemon)
+    sub.add_parser("monitors", help="spisak monitora").set_defaults(fn=cmd_monitors)
+    sub.add_parser("presets", help="spisak preseta").set_defaults(fn=cmd_presets)
+    sub.add_parser("audio-devices", help="spisak audio uredjaja (osvezava kes)").set_defaults(fn=cmd_audio_devices)
+
+    args = ap.parse_args(argv)
+    if args.spans:
+        SPANS.enable(args.spans)
+    try:
+        return args.fn(args)
+    finally:
+        SPANS.disable()
+
+if __name__ == "__main__":
+    sys.exit(main())
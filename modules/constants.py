@@ -1,4 +1,5 @@
 import json
+import tempfile
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Optional, List, Tuple
@@ -8,16 +9,143 @@ APP_VERSION = "v3.0 (Stereo Mix Edition)"
 FFMPEG_PATH = "ffmpeg"
 FFMPEG_LOGLEVEL = "error"
 STOP_TIMEOUT_SEC = 5.0
+START_TIMEOUT_SEC = 10.0
+STANDBY_PREROLL_SEC = 1.0  # max frejmova koji se cuvaju dok se enkoder podize
+FRAME_POOL_SIZE = 4        # bafera u pool-u Python izvora frejmova (framesource)
+FRAME_MAX_LAG_SEC = 1.0    # kasnjenje izvora preko ovoga se odbacuje umesto ponavljanja frejmova
+
+# VFR rezim (mpdecimate): prag razlike 8x8 bloka za "isti" frejm, najduzi
+# razmak izmedju frejmova i koliko istih frejmova posle promene ipak ide u
+# enkoder (gura lookahead, pa poslednja promena na ekranu ne ceka)
+DEDUP_THRESHOLD = 768
+DEDUP_MAX_SEC = 2.0
+DEDUP_KEEP_SEC = 0.5
+
+# Lokalni kontrolni API (JSON linije preko loopback TCP-a)
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 47115
+CONTROL_EVENT_QUEUE = 256  # dogadjaja po klijentu; spor klijent gubi najstarije
+
+# Stream izlazi (tee uz fajl): pauza izmedju pokusaja povezivanja i red
+# paketa po izlazu - pun red odbacuje pakete, enkoder i fajl ne cekaju mrezu
+STREAM_RETRY_SEC = 2.0
+STREAM_KEYFRAME_SEC = 2.0  # najduzi GOP uz stream izlaze (servisi traze <= 2 s)
+STREAM_QUEUE_PACKETS = 600
+
+# Telemetrija enkodera (-progress)
+PROGRESS_PERIOD_SEC = 0.1  # ujedno i granularnost detekcije prvog frejma
+STATS_INTERVAL_SEC = 1.0
+STATS_HISTORY = 600
+STATS_WARMUP_SEC = 3.0
+
+# Log pipeline (batch ka GUI-ju)
+LOG_FLUSH_SEC = 0.1
+LOG_MAX_PENDING = 2000
+LOG_LINE_CAP = 5000
+SESSION_LOG_MAX_BYTES = 5 * 1024 * 1024
+SESSION_LOG_BACKUPS = 3
+
+# Latencije (spans); iskljuceno osim ako je LatencySpans u config-u
+SPAN_HISTORY = 200  # uzoraka po span-u za p50/p95
+
+# Audio: podrazumevani uredjaj (sistemski zvuk), dshow bafer i red paketa
+# po audio ulazu (zastoj uredjaja ne sme da koci demux videa)
+AUDIO_DEFAULT_DEVICE = "Stereo Mix (Realtek(R) Audio)"
+AUDIO_BUFFER_MS = 100
+AUDIO_THREAD_QUEUE = 1024
+AUDIO_DEVICES_TTL_SEC = 24 * 3600  # posle toga enumeracija se ponavlja u pozadini
+AUDIO_BITRATE = "192k"
+
+# Disk: merenje brzine upisa (po volumenu) i procena bitrate-a snimanja
+STORAGE_PROBE_MB = 64
+STORAGE_TTL_SEC = 7 * 24 * 3600
+STORAGE_HEADROOM = 2.0       # keyframe-ovi i burst-ovi enkodera
+STORAGE_MIN_FREE_MB = 2048   # ispod ovoga snimanje se uredno zaustavlja
+STORAGE_BPP_CRF23 = 0.1      # bita po pikselu za x264 na CRF 23 (konzervativno)
+STORAGE_LOSSLESS_BPP = {"x264_qp0": 4.0, "ffv1": 6.0, "utvideo": 8.0}
 
 # Putanje
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG_DIR = BASE_DIR / "config"
 CONFIG_FILE = CONFIG_DIR / "config.json"
+LOG_DIR = BASE_DIR / "logs"
+SPANS_FILE = LOG_DIR / "spans.jsonl"
+JOBS_FILE = CONFIG_DIR / "jobs.json"
+LIBRARY_DB = CONFIG_DIR / "library.db"
+AUDIO_DEVICES_FILE = CONFIG_DIR / "audio_devices.json"
+STORAGE_FILE = CONFIG_DIR / "storage.json"
+CONTROL_FILE = CONFIG_DIR / "control.json"  # port aktivnog kontrolnog API-ja (za klijente)
 DEFAULT_OUTPUT_ROOT = str(Path.home() / "Videos" / "ScreenCaptures")
 
 VIDEO_SUBDIR = "video"
 SCREENSHOT_SUBDIR = "screenshot"
 
+# Benchmark enkodera (profil po geometriji i fps-u)
+BENCH_SECONDS = 4.0
+# Bench meri samo enkoder na praznoj masini (bez grabbera, scale-a, igre),
+# pa je margina velika; x264 preset nikad nije sporiji od podrazumevanog
+BENCH_HEADROOM = 1.5  # enkoder mora da drzi bar 1.5x realnog vremena
+BENCH_X264_CEILING = "veryfast"
+BENCH_TIMEOUT_SEC = 60.0
+
+# Benchmark suite (ceo recorder na lavfi izvoru): slucajevi i pragovi.
+# Prag: metrika -> (apsolutni limit, dozvoljen relativni pomak od baseline-a,
+# minimalni apsolutni pomak koji se uopste racuna); None = ne proverava se.
+BENCH_SUITE_SECONDS = 10.0
+BENCH_SUITE_CASES = (("1080p30", 1920, 1080), ("1440p60", 2560, 1440), ("2160p60", 3840, 2160))
+BENCH_SUITE_THRESHOLDS = {
+    "start_latency_ms": (3000.0, 0.25, 50.0),
+    "speed": (0.95, 0.05, 0.02),  # vece je bolje
+    "drop_pct": (1.0, None, None),
+    "cpu_per_sec": (None, 0.15, 0.05),
+    "stop_ms": (5000.0, 0.25, 50.0),
+    "finalize_ms": (None, 0.50, 50.0),
+}
+
+# Multi-monitor sesija
+CORES_PER_ENCODER = 2    # limit istovremenih enkodera = jezgra / ovo
+ALIGN_MIN_OFFSET_MS = 5  # manji pomak od ovoga se ne ispravlja remux-om
+
+# Screenshot-ovi
+SHOT_TAP_FPS = 5.0      # tap izlaz tokom snimanja (max brzina burst-a bez standby-a)
+SHOT_BURST_HZ = 5.0
+SHOT_PNG_LEVEL = 3      # zlib 0-9
+SHOT_TIMEOUT_SEC = 5.0  # cekanje na frejm iz tap-a / grabbera
+SHOT_MAX_WORKERS = 4
+
+# Post-processing red poslova
+JOB_WORKERS = 0            # 0 = pola jezgara
+JOB_WORKERS_RECORDING = 1  # dok enkoder snima
+JOB_KEEP_FINISHED = 100    # zavrseni poslovi koji ostaju u jobs.json
+
+# Biblioteka snimaka
+LIBRARY_EXTS = (".mp4", ".mkv", ".mov")
+THUMB_SUBDIR = "thumbs"
+THUMB_CACHE_MB = 64
+THUMB_WIDTH = 320
+
+# Scratch (replay ring, privremeni fajlovi)
+DEFAULT_SCRATCH_ROOT = str(Path(tempfile.gettempdir()) / "SceneScreenRecorder")
+REPLAY_SUBDIR = "replay"
+# Two-stage: jeftin lossless snimak u scratch, finalni enkod kao posao posle stopa
+TWO_STAGE_SUBDIR = "intermediate"
+TWO_STAGE_CODEC = "x264_qp0"
+TWO_STAGE_CAP_GB = 50.0      # svi medjufajlovi koji cekaju transcode
+TWO_STAGE_X264_PRESET = "slow"
+REPLAY_SEGMENT_SEC = 2.0
+REPLAY_DEFAULT_SEC = 60
+
+# Dodatna verzija istog snimka (npr. lak proxy za pregled): isti capture i
+# konverzija boja, pa split - svaka verzija ima svoj scale i enkoder.
+# height 0 = visina glavnog snimka; sirina prati odnos stranica.
+@dataclass(frozen=True)
+class Rendition:
+    name: str                     # sufiks fajla: capture_..._<name>.mp4
+    height: int = 0
+    crf: int = 23
+    x264_preset: str = "superfast"
+    encoder: str = ""             # "" = enkoder glavnog snimka
+
 # Presets Data Class
 @dataclass
 class Preset:
@@ -27,12 +155,17 @@ class Preset:
     mode: str
     width: Optional[int] = None
     height: Optional[int] = None
+    renditions: Tuple[Rendition, ...] = ()
 
 PRESETS: List[Preset] = [
     Preset("Scene: Native / Balanced (30fps, CRF23)", 30, 23, "Native"),
     Preset("YouTube 1080p30 (CRF21)", 30, 21, "Custom", 1920, 1080),
     Preset("Tutorial 1440p60 (CRF20)", 60, 20, "Custom", 2560, 1440),
     Preset("Full Dump Native / HQ (60fps, CRF18)", 60, 18, "Native"),
+    Preset("Arhiva Native CRF18 + 1080p proxy (30fps)", 30, 18, "Native",
+           renditions=(Rendition("1080p", 1080, 23, "superfast"),)),
+    Preset("Arhiva Native CRF18 + 720p proxy (60fps)", 60, 18, "Native",
+           renditions=(Rendition("720p", 720, 24, "ultrafast"),)),
 ]
 
 def suggest_preset_for_monitor(w: int, h: int) -> int:
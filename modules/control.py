@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional
+
+from .constants import CONTROL_EVENT_QUEUE, CONTROL_FILE, CONTROL_HOST, CONTROL_PORT, ensure_dir
+
+# Lokalni kontrolni API za skripte i automatizaciju: JSON linije preko
+# loopback TCP-a. Potvrda ide odmah iz treda klijenta - handler samo
+# prosledi komandu (GUI: Qt signal, daemon: Recorder) i nikad ne ceka GUI;
+# ishod (state/started/failed/stats...) stize pretplacenim klijentima.
+#   -> {"id": 1, "cmd": "start", "monitor": 1, "preset": 2, "region": "kod"}
+#   <- {"id": 1, "ok": true, "queued": true, "ms": 0.3}
+#   -> {"id": 2, "cmd": "subscribe", "events": ["state", "stats"]}
+#   <- {"event": "stats", "t": 1712345678.9, "frame": 120, ...}
+#   python -m modules.control start monitor=1 preset=2
+
+def _encode(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+# Jedan povezan klijent: odgovori imaju prednost, dogadjaji idu kroz
+# ogranicen red (hook Recorder-a nikad ne ceka na spor socket)
+class _Client:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.events: Optional[set] = None  # None = bez pretplate, prazan skup = svi dogadjaji
+        self.dropped = 0
+        self.closed = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._replies = deque()
+        self._events = deque()
+
+    def wants(self, event: str) -> bool:
+        ev = self.events
+        return ev is not None and (not ev or event in ev)
+
+    def send(self, line: bytes, event: bool = False) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            if event:
+                if len(self._events) >= CONTROL_EVENT_QUEUE:
+                    self._events.popleft()
+                    self.dropped += 1
+                self._events.append(line)
+            else:
+                self._replies.append(line)
+            self._cond.notify()
+
+    def pump(self) -> None:
+        while True:
+            with self._cond:
+                while not self.closed and not self._closing and not self._replies and not self._events:
+                    self._cond.wait()
+                if self.closed:
+                    return
+                if not self._replies and not self._events:
+                    break
+                line = self._replies.popleft() if self._replies else self._events.popleft()
+            try:
+                self.sock.sendall(line)
+            except OSError:
+                break
+        self.close()
+
+    # Klijent je zatvorio svoju stranu: posalje se ono sto ceka, pa se zatvara
+    def finish(self) -> None:
+        with self._cond:
+            self.events = None
+            self._closing = True
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+# handlers: ime komande -> fn(cmd) -> dict (dodaje se u odgovor) ili None;
+# ValueError = komanda odbijena (ok: false). Moraju da se vrate odmah.
+class ControlServer:
+    def __init__(self, handlers: Dict[str, Callable[[dict], Optional[dict]]], port: int = CONTROL_PORT,
+                 token: str = "", host: str = CONTROL_HOST, log: Optional[Callable[[str], None]] = None):
+        self.handlers = dict(handlers)
+        self.host = host
+        self.port = port
+        self.token = token
+        self.log = log or (lambda msg: None)
+        self._sock: Optional[socket.socket] = None
+        self._clients = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None
+
+    def start(self) -> bool:
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Windows: drugi proces ne sme da "preotme" isti port
+            if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((self.host, self.port))
+            s.listen(8)
+        except OSError as e:
+            self.log(f"Control API: {self.host}:{self.port} nije dostupan ({e})")
+            return False
+        self._sock = s
+        self.port = s.getsockname()[1]
+        try:
+            ensure_dir(CONTROL_FILE.parent)
+            CONTROL_FILE.write_text(json.dumps({"host": self.host, "port": self.port, "pid": os.getpid()}),
+                                    encoding="utf-8")
+        except OSError:
+            pass
+        threading.Thread(target=self._accept, args=(s,), daemon=True).start()
+        self.log(f"Control API: {self.host}:{self.port}" + (" (token)" if self.token else ""))
+        return True
+
+    def stop(self) -> None:
+        s, self._sock = self._sock, None
+        if s is None:
+            return
+        s.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for c in clients:
+            c.close()
+        try:
+            if json.loads(CONTROL_FILE.read_text(encoding="utf-8")).get("pid") == os.getpid():
+                CONTROL_FILE.unlink()
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    # Iz bilo kog treda; bez pretplatnika nema ni serijalizacije
+    def publish(self, event: str, **kw) -> None:
+        with self._lock:
+            targets = [c for c in self._clients if c.wants(event)]
+        if not targets:
+            return
+        line = _encode({"event": event, "t": round(time.time(), 3), **kw})
+        for c in targets:
+            c.send(line, event=True)
+
+    # Lifecycle dogadjaji Recorder-a (i screenshot-ova) ka pretplatnicima
+    def attach(self, rec, shots=None) -> None:
+        rec.on_state.connect(lambda s: self.publish("state", state=s))
+        rec.on_status.connect(lambda msg, col: self.publish("status", msg=msg))
+        rec.on_started.connect(lambda f: self.publish("started", outfile=f, start_latency_ms=rec.start_latency_ms))
+        rec.on_failed.connect(lambda r: self.publish("failed", reason=r))
+        rec.on_process_ended.connect(lambda c: self.publish("ended", exit_code=c, files=list(rec.parts)))
+        rec.on_stats.connect(lambda s: self.publish("stats", **s.to_dict()))
+        rec.on_stream.connect(lambda target, kind, msg: self.publish("stream", target=target, kind=kind, msg=msg))
+        if shots is not None:
+            shots.on_saved.connect(lambda paths: self.publish("screenshot_saved", paths=paths))
+            shots.on_failed.connect(lambda r: self.publish("error", msg=r))
+
+    def _accept(self, s: socket.socket) -> None:
+        while True:
+            try:
+                conn, _ = s.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            c = _Client(conn)
+            with self._lock:
+                self._clients.append(c)
+            threading.Thread(target=c.pump, daemon=True).start()
+            threading.Thread(target=self._serve, args=(c,), daemon=True).start()
+
+    def _serve(self, c: _Client) -> None:
+        try:
+            with c.sock.makefile("rb") as f:
+                for raw in f:
+                    if raw.strip():
+                        self._handle(c, raw)
+        except (OSError, ValueError):
+            pass
+        finally:
+            c.finish()
+            with self._lock:
+                if c in self._clients:
+                    self._clients.remove(c)
+
+    def _handle(self, c: _Client, raw: bytes) -> None:
+        t0 = time.perf_counter()
+        try:
+            cmd = json.loads(raw)
+            name = cmd["cmd"]
+        except (ValueError, KeyError, TypeError):
+            c.send(_encode({"ok": False, "error": f"Neispravna komanda: {raw[:200].decode('utf-8', 'replace')}"}))
+            return
+        reply = {"id": cmd["id"]} if "id" in cmd else {}
+        if self.token and cmd.get("token") != self.token:
+            reply.update(ok=False, error="Pogresan token.")
+        elif name == "subscribe":
+            c.events = set(cmd.get("events") or ())
+            reply.update(ok=True)
+        elif name == "unsubscribe":
+            c.events = None
+            reply.update(ok=True, dropped=c.dropped)
+        elif name == "ping":
+            reply.update(ok=True)
+        elif name not in self.handlers:
+            reply.update(ok=False, error=f"Nepoznata komanda '{name}'.")
+        else:
+            try:
+                reply.update(self.handlers[name](cmd) or {})
+                reply["ok"] = True
+            except ValueError as e:
+                reply.update(ok=False, error=str(e))
+            except Exception as e:
+                self.log(f"Control API: {name} nije uspeo: {e}")
+                reply.update(ok=False, error=str(e))
+        reply["ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        c.send(_encode(reply))
+
+# Klijent za skripte i testove; port iz config/control.json ako nije zadat
+class ControlClient:
+    def __init__(self, port: Optional[int] = None, token: str = "", host: str = CONTROL_HOST, timeout: float = 5.0):
+        if port is None:
+            try:
+                port = int(json.loads(CONTROL_FILE.read_text(encoding="utf-8"))["port"])
+            except (OSError, ValueError, KeyError, TypeError):
+                port = CONTROL_PORT
+        self.token = token
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._f = self.sock.makefile("rb")
+        self._id = 0
+        self._pending = deque()  # dogadjaji stigli dok se cekao odgovor
+
+    def call(self, cmd: str, **kw) -> dict:
+        self._id += 1
+        msg = {"id": self._id, "cmd": cmd, **kw}
+        if self.token:
+            msg["token"] = self.token
+        self.sock.sendall(_encode(msg))
+        while True:
+            obj = self._read()
+            if obj.get("id") == self._id:
+                return obj
+            if "event" in obj:
+                self._pending.append(obj)
+
+    def events(self) -> Iterator[dict]:
+        while True:
+            yield self._pending.popleft() if self._pending else self._read()
+
+    def _read(self) -> dict:
+        line = self._f.readline()
+        if not line:
+            raise ConnectionError("Control API je zatvorio vezu.")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._f.close()
+        self.sock.close()
+
+def _value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.control", description="Komanda lokalnom kontrolnom API-ju.")
+    ap.add_argument("--port", type=int, help="podrazumevano iz config/control.json")
+    ap.add_argument("--token", default="")
+    ap.add_argument("cmd", help="start | stop | pause | marker | screenshot | status | subscribe")
+    ap.add_argument("params", nargs="*", metavar="KEY=VALUE", help="npr. monitor=1 preset=2 region=kod")
+    args = ap.parse_args(argv)
+    kw = {}
+    for p in args.params:
+        k, sep, v = p.partition("=")
+        if not sep:
+            ap.error(f"ocekivano KEY=VALUE: {p}")
+        kw[k] = _value(v)
+    if args.cmd == "subscribe" and "events" in kw and isinstance(kw["events"], str):
+        kw["events"] = kw["events"].split(",")
+    try:
+        client = ControlClient(args.port, args.token)
+    except OSError as e:
+        print(f"Control API nije dostupan: {e}", file=sys.stderr)
+        return 2
+    reply = {}
+    try:
+        reply = client.call(args.cmd, **kw)
+        print(json.dumps(reply, ensure_ascii=False), flush=True)
+        if args.cmd == "subscribe" and reply.get("ok"):
+            client.sock.settimeout(None)
+            for ev in client.events():
+                print(json.dumps(ev, ensure_ascii=False), flush=True)
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        client.close()
+    return 0 if reply.get("ok") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
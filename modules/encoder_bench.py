@@ -0,0 +1,193 @@
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+from .capture import ENCODERS, build_video_codec_args, get_encoder
+from .constants import BENCH_HEADROOM, BENCH_SECONDS, BENCH_TIMEOUT_SEC, BENCH_X264_CEILING, FFMPEG_PATH
+from .procstats import cpu_count, cpu_seconds
+from .progress import ProgressParser
+
+# Auto-benchmark enkodera: za zadatu geometriju i fps pusta se kratak
+# sinteticki test (lavfi testsrc2 -> enkoder -> null) i meri se brzina
+# i CPU. Pobednik (najjeftiniji po CPU-u koji drzi BENCH_HEADROOM) se
+# pamti u config-u kao profil za "WxH@fps".
+
+BENCH_CRF = 23
+
+@dataclass
+class EncoderProfile:
+    encoder: str
+    preset: str
+    threads: int = 0
+    speed: float = 0.0
+    cpu_pct: Optional[float] = None  # % jednog jezgra
+    measured_at: float = 0.0
+
+    @property
+    def sustains(self) -> bool:
+        return self.speed >= BENCH_HEADROOM
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> Optional["EncoderProfile"]:
+        try:
+            p = cls(**{k: d[k] for k in cls.__dataclass_fields__ if k in d})
+            get_encoder(p.encoder)
+            return p
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def spec_kwargs(self) -> dict:
+        return {"encoder": self.encoder, "x264_preset": self.preset, "threads": self.threads}
+
+    def label(self) -> str:
+        cpu = f"{self.cpu_pct:.0f}% CPU" if self.cpu_pct is not None else "CPU N/A"
+        th = f", {self.threads} thr" if self.threads else ""
+        return f"{self.encoder} {self.preset}{th} ({self.speed:.2f}x, {cpu})"
+
+def profile_key(w: int, h: int, fps: int) -> str:
+    return f"{w}x{h}@{fps}"
+
+def _popen_flags() -> int:
+    return subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+def list_ffmpeg_encoders(ffmpeg_path: str = FFMPEG_PATH) -> List[str]:
+    try:
+        out = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-encoders"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            timeout=10, creationflags=_popen_flags(),
+        ).stdout.decode("utf-8", "replace")
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    names = []
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            names.append(parts[1])
+    return names
+
+def build_bench_args(w: int, h: int, fps: int, encoder: str, preset: str, threads: int = 0,
+                     seconds: float = BENCH_SECONDS, ffmpeg_path: str = FFMPEG_PATH) -> List[str]:
+    return [
+        ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}",
+        "-t", f"{seconds:g}",
+    ] + build_video_codec_args(encoder, preset, BENCH_CRF, threads) + [
+        "-progress", "pipe:1", "-nostats", "-f", "null", "-",
+    ]
+
+def run_bench(w: int, h: int, fps: int, encoder: str, preset: str, threads: int = 0,
+              seconds: float = BENCH_SECONDS, ffmpeg_path: str = FFMPEG_PATH) -> Optional[EncoderProfile]:
+    args = build_bench_args(w, h, fps, encoder, preset, threads, seconds, ffmpeg_path)
+    try:
+        proc = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            creationflags=_popen_flags(),
+        )
+    except OSError:
+        return None
+
+    # CPU se uzorkuje dok proces radi (posle exit-a handle/proc vise ne vazi)
+    cpu = [None]
+    done = threading.Event()
+    def _sample():
+        while not done.wait(0.2):
+            v = cpu_seconds(proc)
+            if v is not None:
+                cpu[0] = v
+    sampler = threading.Thread(target=_sample, daemon=True)
+    t0 = time.perf_counter()
+    sampler.start()
+
+    parser, last = ProgressParser(), None
+    killer = threading.Timer(BENCH_TIMEOUT_SEC, proc.kill)
+    killer.start()
+    try:
+        for raw in iter(proc.stdout.readline, b""):
+            st = parser.feed(raw.decode("utf-8", "replace"))
+            if st is not None and st.frame > 0:
+                last = st
+        code = proc.wait()
+    finally:
+        killer.cancel()
+        done.set()
+        sampler.join()
+    wall = time.perf_counter() - t0
+
+    if code != 0 or last is None or wall <= 0:
+        return None
+    # Brzina iz broja frejmova kroz zidni sat (speed iz ffmpeg-a je zaokruzen)
+    speed = (last.frame / fps) / wall
+    cpu_pct = cpu[0] / wall * 100.0 if cpu[0] is not None else None
+    return EncoderProfile(encoder, preset, threads, round(speed, 3),
+                          round(cpu_pct, 1) if cpu_pct is not None else None, time.time())
+
+def _cpu_or_inf(p: EncoderProfile) -> float:
+    return p.cpu_pct if p.cpu_pct is not None else float("inf")
+
+def benchmark(w: int, h: int, fps: int, ffmpeg_path: str = FFMPEG_PATH,
+              seconds: float = BENCH_SECONDS, log: Optional[Callable[[str], None]] = None,
+              ) -> Optional[EncoderProfile]:
+    log = log or (lambda msg: None)
+    available = set(list_ffmpeg_encoders(ffmpeg_path))
+    results: List[EncoderProfile] = []
+
+    def _try(enc, preset, threads=0):
+        r = run_bench(w, h, fps, enc, preset, threads, seconds, ffmpeg_path)
+        if r is None:
+            log(f"Bench {enc} {preset}: nije uspeo")
+        else:
+            log(f"Bench {r.label()}")
+            results.append(r)
+        return r
+
+    # HW enkoderi: najbrzi preset je dovoljan test da li uopste rade
+    for name, info in ENCODERS.items():
+        if info.hw and name in available:
+            _try(name, info.presets[0])
+
+    # x264: od podrazumevanog (BENCH_X264_CEILING) ka najbrzem, prvi koji drzi
+    # realno vreme sa marginom. Jaca masina ne dobija skuplji preset - CPU
+    # tokom snimanja ostaje za grabber i aplikaciju koja se snima.
+    x264 = None
+    presets = ENCODERS["libx264"].presets
+    for preset in reversed(presets[:presets.index(BENCH_X264_CEILING) + 1]):
+        r = _try("libx264", preset)
+        if r is not None and r.sustains:
+            x264 = r
+            break
+    # Manje niti = manje CPU-a ako i dalje drzi (vise mesta za igru/aplikaciju)
+    if x264 is not None and cpu_count() > 2:
+        for threads in (cpu_count() // 2, max(1, cpu_count() // 4)):
+            _try("libx264", x264.preset, threads)
+
+    sustaining = [r for r in results if r.sustains]
+    if not sustaining:
+        return max(results, key=lambda r: r.speed, default=None)
+    hw = [r for r in sustaining if get_encoder(r.encoder).hw]
+    if hw:
+        return min(hw, key=_cpu_or_inf)
+    best_preset = x264.preset if x264 else sustaining[0].preset
+    same = [r for r in sustaining if r.encoder == "libx264" and r.preset == best_preset]
+    return min(same, key=_cpu_or_inf)
+
+# --- Profili u config-u
+def get_profile(cfg: dict, w: int, h: int, fps: int) -> Optional[EncoderProfile]:
+    d = cfg.get("EncoderProfiles", {}).get(profile_key(w, h, fps))
+    return EncoderProfile.from_dict(d) if isinstance(d, dict) else None
+
+def store_profile(cfg: dict, w: int, h: int, fps: int, profile: EncoderProfile) -> None:
+    profiles = cfg.get("EncoderProfiles")
+    if not isinstance(profiles, dict):
+        profiles = cfg["EncoderProfiles"] = {}
+    profiles[profile_key(w, h, fps)] = profile.to_dict()
+
+def resolve_encoder(cfg: dict, w: int, h: int, fps: int) -> Dict[str, object]:
+    p = get_profile(cfg, w, h, fps)
+    return p.spec_kwargs() if p else {}
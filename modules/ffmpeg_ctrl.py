@@ -1,173 +1,303 @@
-import subprocess
-import threading
-import time
-import sys
-from pathlib import Path
-from datetime import datetime
+import os
 from PySide6 import QtCore
-from .constants import FFMPEG_PATH, FFMPEG_LOGLEVEL, STOP_TIMEOUT_SEC, VIDEO_SUBDIR, ensure_dir, ensure_output_root
+from .constants import FFMPEG_PATH, SHOT_BURST_HZ, SHOT_PNG_LEVEL, ensure_output_root
+from .capture import RecordSpec, default_backend
+from .recorder import Recorder, new_capture_path
+from .session import RecordingSession
+from .region import apply_area
+from .screenshot import Screenshotter, same_area
+from .standby import StandbyCapture
+from .storage import plan as plan_storage
+from .twostage import plan as plan_two_stage, transcode_jobs
 
+# Qt omotac oko Recorder-a: lifecycle je u recorder.py (bez Qt-a),
+# ovde se samo hook-ovi prosledjuju na Qt signale za GUI.
 class FfmpegController(QtCore.QObject):
-    sig_log = QtCore.Signal(str)
+    sig_log_batch = QtCore.Signal(list)
     sig_status = QtCore.Signal(str, str)
+    sig_state = QtCore.Signal(str)
+    sig_started = QtCore.Signal(str)  # outfile
+    sig_failed = QtCore.Signal(str)
     sig_process_ended = QtCore.Signal(int)
+    sig_stats = QtCore.Signal(object)  # EncoderStats
+    sig_shots_saved = QtCore.Signal(list)  # putanje screenshot-ova
+    sig_stream = QtCore.Signal(str, str, str)  # stream izlaz, "retry"/"lost", poruka
 
-    def __init__(self, ffmpeg_path: str = FFMPEG_PATH):
+    # jobs: zajednicki JobQueue; posle svakog snimanja dobija post_jobs poslove
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, jobs=None):
         super().__init__()
-        self.ffmpeg_path = ffmpeg_path
-        self.proc = None
-        self._stderr_thread = None
-        self._stderr_stop = threading.Event()
-        self.is_recording = False
-        self.is_paused = False
+        self.rec = Recorder(ffmpeg_path)
+        self.rec.on_log_batch.connect(self.sig_log_batch.emit)
+        self.rec.on_status.connect(self.sig_status.emit)
+        self.rec.on_state.connect(self.sig_state.emit)
+        self.rec.on_started.connect(self.sig_started.emit)
+        self.rec.on_failed.connect(self.sig_failed.emit)
+        self.rec.on_process_ended.connect(self.sig_process_ended.emit)
+        self.rec.on_stats.connect(self.sig_stats.emit)
+        self.rec.on_stream.connect(self.sig_stream.emit)
         self.current_crf = 23
+        self.standbys = {}  # mon.index -> StandbyCapture (armed rezim)
+        self.shots = Screenshotter(ffmpeg_path)
+        self.shots.on_saved.connect(self.sig_shots_saved.emit)
+        self.shots.on_failed.connect(self.rec.log)
+        self.shots.on_log.connect(self.rec.log)
+        self.jobs = jobs
+        self.post_jobs = []  # npr. ["thumbnail", "checksum"]
+        self.two_stage = None  # TwoStageConfig tekuceg snimanja (transcode posle stopa)
+        self.sig_process_ended.connect(self._queue_post_jobs)
+        self.sig_state.connect(self._jobs_throttle)
+
+    @property
+    def logs(self):
+        return self.rec.logs
+
+    @property
+    def state(self) -> str:
+        return self.rec.state
+
+    @property
+    def is_recording(self) -> bool:
+        return self.rec.is_recording
+
+    @property
+    def is_busy(self) -> bool:
+        return self.rec.is_busy
+
+    @property
+    def is_paused(self) -> bool:
+        return self.rec.is_paused
 
     def _emit_log(self, msg):
-        self.sig_log.emit(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+        self.rec.log(msg)
 
     def _emit_status(self, msg, col):
         self.sig_status.emit(msg, col)
-    
-    def _read_stderr(self):
-        while not self._stderr_stop.is_set() and self.proc:
-            try:
-                line = self.proc.stderr.readline()
-                if not line:
-                    break
-                if line.strip():
-                    self.sig_log.emit(f"ffmpeg: {line.strip()}")
-            except:
-                break
 
-    def start_recording(self, mon, res_mode, custom_wh, root, fps, crf, record_audio=False):
-        if self.is_recording:
+    # Python API za telemetriju (bez Qt-a)
+    def add_stats_listener(self, cb):
+        self.rec.add_stats_listener(cb)
+
+    def remove_stats_listener(self, cb):
+        self.rec.remove_stats_listener(cb)
+
+    @property
+    def latest_stats(self):
+        return self.rec.latest_stats
+
+    def stats_history(self):
+        return self.rec.stats_history()
+
+    # Ne blokira: rezultat stize preko sig_started / sig_failed
+    # Dodatni RecordSpec parametri (output_mode, faststart...) idu kroz spec_kw
+    # adaptive: AdaptiveConfig ukljucuje adaptivni kvalitet
+    # area: Region (deo monitora) ili WinWindow (prozor); None = ceo monitor
+    # two_stage: TwoStageConfig = lossless snimak u scratch + transcode posao
+    # storage: StorageConfig = procena brzine diska, staging, minimum slobodnog mesta
+    def start_recording(self, mon, res_mode, custom_wh, root, fps, crf, record_audio=False, backend=None,
+                        adaptive=None, area=None, two_stage=None, scratch=None, storage=None, **spec_kw):
+        if self.rec.is_busy:
             return False
-        
+
         # Check output
         ok, msg = ensure_output_root(root)
         if not ok:
             self._emit_status(msg, "#FF4444")
             return False
 
-        out_path = Path(root) / VIDEO_SUBDIR
-        ensure_dir(out_path)
-        outfile = out_path / f"capture_{mon.index}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-
-        # Video (gdigrab)
-        args = [
-            self.ffmpeg_path,
-            "-y",
-            "-hide_banner",
-            "-loglevel", FFMPEG_LOGLEVEL,
-            "-f", "gdigrab",
-            "-framerate", str(fps),
-            "-offset_x", str(mon.left),
-            "-offset_y", str(mon.top),
-            "-video_size", f"{mon.w}x{mon.h}",
-            "-i", "desktop",
-        ]
-
-        # Audio (Stereo Mix preko DirectShow-a)
-        # Ovo koristi tvoj novi sistemski FFmpeg i dshow koji provereno radi
-        if record_audio:
-            args += [
-                "-f", "dshow",
-                "-audio_buffer_size", "100",
-                "-i", "audio=Stereo Mix (Realtek(R) Audio)" # Tacan naziv iz tvojih logova
-            ]
-        
-        # Scale ako je custom rezolucija
-        if res_mode == "Custom" and custom_wh:
-            args += ["-vf", f"scale={custom_wh[0]}:{custom_wh[1]}"]
-            
-        # Output Encoder Settings
-        encoding_args = [
-            "-vsync", "cfr",
-            "-r", str(fps),
-            "-c:v", "libx264",
-            "-preset", "veryfast",
-            "-crf", str(crf),
-            "-pix_fmt", "yuv420p",
-        ]
-        
-        if record_audio:
-            encoding_args += ["-c:a", "aac", "-b:a", "192k"]
-            
-        args += encoding_args
-        args.append(str(outfile))
-        
-        self._emit_log(f"CMD: {' '.join(args)}")
-        
-        try:
-            cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-            self.proc = subprocess.Popen(
-                args,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                creationflags=cf,
-            )
-            time.sleep(0.5)
-            if self.proc.poll() is not None:
-                self._emit_status("FFmpeg fail (start)", "#FF4444")
+        spec = RecordSpec.for_monitor(
+            mon, fps, crf, new_capture_path(root, mon.index),
+            backend=backend or default_backend(), res_mode=res_mode, custom_wh=custom_wh,
+            record_audio=record_audio, **spec_kw,
+        )
+        spec = apply_area(spec, mon, area)
+        self.two_stage = None
+        if two_stage is not None and scratch and self.jobs is not None:
+            staged = plan_two_stage(spec, scratch, two_stage, self._emit_log)
+            if staged is not None:
+                spec, self.two_stage = staged, two_stage
+        if storage is not None:
+            try:
+                spec = plan_storage(spec, storage, self._emit_log)
+            except ValueError as e:
+                self._emit_status(str(e), "#FF4444")
                 return False
-            
-            self.is_recording = True
-            self.is_paused = False
-            self._stderr_stop.clear()
-            self._stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
-            self._stderr_thread.start()
-            self._emit_status("Snimanje u toku", "#88FF88")
+        return self.rec.start(spec, standby=self.standbys.get(mon.index), adaptive=adaptive)
+
+    # Armed rezim: standby grabber po monitoru, spreman pre START-a
+    def arm(self, mon, res_mode, custom_wh, fps, backend=None, area=None):
+        spec = RecordSpec.for_monitor(
+            mon, fps, self.current_crf, "",
+            backend=backend or default_backend(), res_mode=res_mode, custom_wh=custom_wh,
+        )
+        spec = apply_area(spec, mon, area)
+        old = self.standbys.get(mon.index)
+        if old and old.alive and old.matches(spec):
             return True
-        except Exception as e:
-            self._emit_log(f"Error: {e}")
-            self._emit_status("Greška pri startu", "#FF4444")
-            self.proc = None
+        self.disarm(mon.index)
+        sb = StandbyCapture(spec, self.rec.ffmpeg_path, log=self.rec.log)
+        if not sb.start():
             return False
+        self.standbys[mon.index] = sb
+        self._emit_log(f"Armed: monitor {mon.index} u standby rezimu.")
+        return True
 
-    def stop_recording(self):
-        if not self.proc:
+    def disarm(self, index=None):
+        for i in ([index] if index is not None else list(self.standbys)):
+            sb = self.standbys.pop(i, None)
+            if sb is None:
+                continue
+            # Standby koji trenutno snima ostaje dok se snimanje ne zavrsi
+            if sb.live and self.rec.is_busy:
+                def _stop_later(code, sb=sb):
+                    self.rec.on_process_ended.disconnect(_stop_later)
+                    sb.stop()
+                self.rec.on_process_ended.connect(_stop_later)
+            else:
+                sb.stop()
+                self._emit_log(f"Armed: standby za monitor {i} ugasen.")
+
+    # Tap capture-a koji vec snima (ili je armed) bas tu oblast
+    def find_tap(self, spec):
+        if same_area(self.rec.spec, spec) and self.rec.frame_tap is not None:
+            return self.rec.frame_tap
+        sb = self.standbys.get(spec.monitor_index)
+        if sb is not None and sb.alive and same_area(sb.spec, spec):
+            return sb.tap
+        return None
+
+    # Ne blokira: putanje stizu preko sig_shots_saved. sources = drugi
+    # kontroleri (sesija, replay) ciji se capture takodje moze tapovati.
+    def screenshot(self, mon, root, count=1, hz=SHOT_BURST_HZ, fmt="png", level=SHOT_PNG_LEVEL, backend=None,
+                   area=None, sources=()):
+        ok, msg = ensure_output_root(root)
+        if not ok:
+            self._emit_status(msg, "#FF4444")
+            return False
+        spec = RecordSpec.for_monitor(mon, 30, self.current_crf, "", backend=backend or default_backend())
+        spec = apply_area(spec, mon, area)
+        tap = None
+        for c in (self, *sources):
+            tap = c.find_tap(spec)
+            if tap is not None:
+                break
+        what = "screenshot" if count <= 1 else f"burst {count}x @ {hz:g} Hz"
+        self._emit_log(f"Screenshot: {what}, {fmt}, " + ("iz tekuceg capture-a" if tap else "zaseban grabber"))
+        return self.shots.shoot(spec, root, count, hz, fmt, level, tap=tap, tag=mon.index)
+
+    # Post-processing ide u red tek kad je fajl finalizovan
+    def _queue_post_jobs(self, code):
+        if self.jobs is None:
+            return
+        # Two-stage: ostali poslovi idu na finalni fajl, posle transcode-a
+        if self.two_stage is not None and self.rec.spec is not None:
+            for src, dst, params in transcode_jobs(self.rec.spec, self.rec.parts, self.two_stage):
+                self.jobs.submit("transcode", src, dst=dst, params=params, then=self.post_jobs)
+            self.two_stage = None
             return
-        self._emit_status("Zaustavljam...", "#FFCC00")
-        try:
-            if self.proc.stdin:
-                self.proc.stdin.write("q\n")
-                self.proc.stdin.flush()
-        except:
-            pass
-        
-        try:
-            self.proc.wait(timeout=STOP_TIMEOUT_SEC)
-        except:
-            self.proc.kill()
-        
-        self._stderr_stop.set()
-        self.is_recording = False
-        self.is_paused = False
-        
-        # Uzimanje exit koda
-        code = self.proc.poll() if self.proc else -1
-
-        # FIX: Sprecava overflow gresku na Windows-u
-        if code is not None and code > 2147483647:
-            code = -1
-
-        self.sig_process_ended.emit(code)
-        self.proc = None
-        self._emit_status("Sačuvano.", "#88FF88")
+        if not self.post_jobs:
+            return
+        for path in self.rec.output_files:
+            if not os.path.isfile(path) or os.path.getsize(path) == 0:
+                continue
+            for kind in self.post_jobs:
+                self.jobs.submit(kind, path)
+
+    # Dok enkoder radi, red poslova spusta konkurentnost
+    def _jobs_throttle(self, state):
+        if self.jobs is not None:
+            self.jobs.set_recording(self, self.rec.is_busy)
+
+    # Ne blokira: kraj stize preko sig_process_ended
+    def stop_recording(self):
+        self.rec.stop()
 
     def pause_toggle(self):
-        if not self.is_recording or not self.proc:
+        self.rec.pause_toggle()
+
+    def shutdown(self):
+        self.rec.close()
+        self.disarm()
+        self.shots.close()
+
+# Qt omotac oko RecordingSession (vise monitora odjednom)
+class SessionController(QtCore.QObject):
+    sig_log_batch = QtCore.Signal(list)
+    sig_status = QtCore.Signal(str, str)
+    sig_state = QtCore.Signal(str)
+    sig_usage = QtCore.Signal(list)  # List[SourceUsage]
+    sig_finished = QtCore.Signal(str)  # manifest
+
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, jobs=None):
+        super().__init__()
+        self.ffmpeg_path = ffmpeg_path
+        self.session = None
+        self.jobs = jobs
+        self.post_jobs = []
+        self.sig_finished.connect(self._queue_post_jobs)
+        self.sig_state.connect(self._jobs_throttle)
+
+    @property
+    def is_busy(self) -> bool:
+        return self.session is not None and self.session.is_busy
+
+    @property
+    def is_paused(self) -> bool:
+        return self.session is not None and self.session.is_paused
+
+    # sources: [(mon, dict sa RecordSpec parametrima za taj monitor)]
+    def start_session(self, sources, root, fps, crf, mode="process", max_encoders=None, **spec_kw):
+        if self.is_busy or not sources:
+            return False
+        ok, msg = ensure_output_root(root)
+        if not ok:
+            self.sig_status.emit(msg, "#FF4444")
+            return False
+
+        s = RecordingSession(self.ffmpeg_path, mode=mode, max_encoders=max_encoders)
+        s.on_log_batch.connect(self.sig_log_batch.emit)
+        s.on_status.connect(self.sig_status.emit)
+        s.on_state.connect(self.sig_state.emit)
+        s.on_usage.connect(self.sig_usage.emit)
+        s.on_finished.connect(self.sig_finished.emit)
+        if self.session is not None:
+            self.session.close()
+        self.session = s
+
+        specs = [
+            RecordSpec.for_monitor(mon, fps, crf, new_capture_path(root, mon.index), **{**spec_kw, **kw})
+            for mon, kw in sources
+        ]
+        return s.start(specs, [f"mon{mon.index}" for mon, _ in sources])
+
+    def _queue_post_jobs(self, manifest):
+        if self.jobs is None or not self.post_jobs or self.session is None:
             return
-        try:
-            self.proc.stdin.write("p\n")
-            self.proc.stdin.flush()
-            self.is_paused = not self.is_paused
-            self._emit_status(
-                "PAUZIRANO" if self.is_paused else "SNIMANJE",
-                "#FFCC00" if self.is_paused else "#88FF88",
-            )
-        except:
-            pass
\ No newline at end of file
+        for rec in self.session.recorders:
+            for path in rec.output_files:
+                if os.path.isfile(path) and os.path.getsize(path) > 0:
+                    for kind in self.post_jobs:
+                        self.jobs.submit(kind, path)
+
+    def _jobs_throttle(self, state):
+        if self.jobs is not None:
+            self.jobs.set_recording(self, self.is_busy)
+
+    def find_tap(self, spec):
+        if not self.is_busy:
+            return None
+        for rec in self.session.recorders:
+            if same_area(rec.spec, spec) and rec.frame_tap is not None:
+                return rec.frame_tap
+        return None
+
+    def stop_recording(self):
+        if self.session:
+            self.session.stop()
+
+    def pause_toggle(self):
+        if self.session:
+            self.session.pause_toggle()
+
+    def shutdown(self):
+        if self.session:
+            self.session.close()
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .constants import AUDIO_BITRATE, FFMPEG_PATH
+
+# Post-stop koraci nad gotovim fajlovima (stream copy, bez re-enkodovanja)
+
+def run_ffmpeg(args: List[str], timeout: Optional[float] = None) -> Tuple[int, str]:
+    cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    try:
+        p = subprocess.run(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            timeout=timeout, creationflags=cf,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return -1, str(e)
+    return p.returncode, p.stderr.decode("utf-8", "replace").strip()
+
+def read_concat_list(list_file: str) -> List[Path]:
+    base = Path(list_file).parent
+    files = []
+    for line in Path(list_file).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line.startswith("file "):
+            name = line[5:].strip().strip("'")
+            files.append(base / name)
+    return files
+
+def write_concat_list(list_file: str, files: List[Path]) -> None:
+    lines = ["ffconcat version 1.0"]
+    for f in files:
+        escaped = str(Path(f).resolve()).replace("\\", "/").replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    Path(list_file).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def faststart_remux(src: str, dst: Optional[str] = None, ffmpeg_path: str = FFMPEG_PATH) -> Tuple[bool, str]:
+    # Fragmentisan MP4 -> klasican MP4 sa moov atomom na pocetku
+    dst = dst or src
+    tmp = str(Path(dst).with_name(Path(dst).stem + ".remux.tmp.mp4"))
+    code, err = run_ffmpeg([
+        ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error",
+        "-i", src, "-map", "0", "-c", "copy", "-movflags", "+faststart", tmp,
+    ])
+    if code != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False, err or f"ffmpeg exit {code}"
+    os.replace(tmp, dst)
+    return True, dst
+
+def join_segments(list_file: str, dst: str, ffmpeg_path: str = FFMPEG_PATH, faststart: bool = True) -> Tuple[bool, str]:
+    args = [
+        ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_file, "-map", "0", "-c", "copy",
+    ]
+    if faststart:
+        args += ["-movflags", "+faststart"]
+    tmp = str(Path(dst).with_name(Path(dst).stem + ".join.tmp.mp4"))
+    code, err = run_ffmpeg(args + [tmp])
+    if code != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False, err or f"ffmpeg exit {code}"
+    os.replace(tmp, dst)
+    return True, dst
+
+def shift_start(src: str, offset_sec: float, ffmpeg_path: str = FFMPEG_PATH) -> Tuple[bool, str]:
+    # Pomeranje pocetka na zajednicku vremensku osu (edit lista, bez re-enkodovanja)
+    tmp = str(Path(src).with_name(Path(src).stem + ".shift.tmp.mp4"))
+    code, err = run_ffmpeg([
+        ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error",
+        "-i", src, "-map", "0", "-c", "copy", "-output_ts_offset", f"{offset_sec:.6f}",
+        "-movflags", "+faststart", tmp,
+    ])
+    if code != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False, err or f"ffmpeg exit {code}"
+    os.replace(tmp, src)
+    return True, src
+
+def mux_audio(video: str, tracks: List[Tuple[str, float]], ffmpeg_path: str = FFMPEG_PATH,
+              bitrate: str = AUDIO_BITRATE) -> Tuple[bool, str]:
+    # Lossless audio medjufajlovi -> AAC trake uz video (video se samo kopira).
+    # offset = pocetak audija - pocetak videa: pozitivan kasni trag, negativan
+    # odsece visak sa pocetka audija.
+    args = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error", "-i", video]
+    for path, offset in tracks:
+        args += ["-itsoffset", f"{offset:.6f}"] if offset >= 0 else ["-ss", f"{-offset:.6f}"]
+        args += ["-i", path]
+    args += ["-map", "0:v"]
+    for i in range(len(tracks)):
+        args += ["-map", f"{i + 1}:a"]
+    # Two-stage medjufajl (.mkv) zadrzava kontejner, audio tamo ostaje lossless
+    suffix = Path(video).suffix.lower()
+    args += ["-c:v", "copy"]
+    args += ["-c:a", "aac", "-b:a", bitrate, "-movflags", "+faststart"] if suffix == ".mp4" else ["-c:a", "flac"]
+    tmp = str(Path(video).with_name(Path(video).stem + ".mux.tmp" + suffix))
+    code, err = run_ffmpeg(args + [tmp])
+    if code != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False, err or f"ffmpeg exit {code}"
+    os.replace(tmp, video)
+    return True, video
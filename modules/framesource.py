@@ -0,0 +1,387 @@
+import argparse
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .capture import PIPE_PIX_FMT, RecordSpec, frame_bytes, output_size
+from .constants import FFMPEG_PATH, FRAME_MAX_LAG_SEC, FRAME_POOL_SIZE
+from .frametap import FrameTap
+
+# Python izvor frejmova umesto FFmpeg grabbera: izvor puni bafere iz
+# unapred alociranog pool-a (memoryview, opciono shared memory), writer ih
+# salje u rawvideo stdin enkodera. Spolja izgleda kao StandbyCapture, pa ga
+# Recorder.start(spec, standby=...) koristi bez izmena. Tempo drzi zidni sat:
+# kad izvor kasni, poslednji frejm se ponavlja (vremenska osa ostaje tacna).
+#   python -m modules.framesource --size 1920x1080 --fps 60 --seconds 10
+
+STAGES = ("pace", "acquire", "fill", "write")
+
+class FrameSource:
+    pix_fmt = PIPE_PIX_FMT
+    name = ""
+
+    def __init__(self, width: int, height: int, fps: int):
+        if width % 2 or height % 2:
+            raise ValueError(f"{PIPE_PIX_FMT} trazi parne dimenzije ({width}x{height}).")
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+    # Jednom, pre prvog frejma, nad svim baferima pool-a
+    def open(self, views: List[memoryview]) -> None:
+        pass
+
+    # Upisuje frejm n u bafer (bez alokacije); vreme frejma je n / fps
+    def fill(self, mv: memoryview, n: int) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+def _plane(w: int, rows: int, step: int) -> bytes:
+    # Dijagonalne pruge: svaki red je pomeren isecak iste periodicne niske
+    base = bytes(i & 0xFF for i in range(w + 256))
+    return b"".join(base[(r * step) & 0xFF:(r * step & 0xFF) + w] for r in range(rows))
+
+# Pokretna test slika: ravni dvostruke visine se prave jednom, a frejm je
+# jedan memcpy isecka po ravni (skrolovanje), pa enkoder ima stvarno kretanje
+class SyntheticSource(FrameSource):
+    name = "synthetic"
+    SPEED = 4  # piksela po frejmu
+
+    def __init__(self, width: int, height: int, fps: int):
+        super().__init__(width, height, fps)
+        cw, ch = width // 2, height // 2
+        self._y = memoryview(_plane(width, 2 * height, 3))
+        self._u = memoryview(_plane(cw, 2 * ch, 1))
+        self._v = memoryview(_plane(cw, 2 * ch, 5))
+
+    def fill(self, mv: memoryview, n: int) -> None:
+        w, h = self.width, self.height
+        cw, ch = w // 2, h // 2
+        off = (n * self.SPEED) % h
+        ysz, csz = w * h, cw * ch
+        mv[:ysz] = self._y[off * w:off * w + ysz]
+        off //= 2
+        mv[ysz:ysz + csz] = self._u[off * cw:off * cw + csz]
+        mv[ysz + csz:] = self._v[off * cw:off * cw + csz]
+
+# Staticne kolor trake: svi baferi se popune u open(), fill ne radi nista
+class PatternSource(FrameSource):
+    name = "pattern"
+    BARS = ((235, 128, 128), (210, 16, 146), (170, 166, 16), (145, 54, 34),
+            (106, 202, 222), (81, 90, 240), (41, 240, 110), (16, 128, 128))  # YUV (BT.601, limited)
+
+    def open(self, views: List[memoryview]) -> None:
+        w, h = self.width, self.height
+        cw, ch = w // 2, h // 2
+        rows = []
+        for comp, rw in ((0, w), (1, cw), (2, cw)):
+            rows.append(bytes(self.BARS[x * len(self.BARS) // rw][comp] for x in range(rw)))
+        frame = rows[0] * h + rows[1] * ch + rows[2] * ch
+        for mv in views:
+            mv[:] = frame
+
+    def fill(self, mv: memoryview, n: int) -> None:
+        pass
+
+FRAME_SOURCES: Dict[str, type] = {c.name: c for c in (SyntheticSource, PatternSource)}
+
+def make_source(name: str, width: int, height: int, fps: int) -> FrameSource:
+    try:
+        return FRAME_SOURCES[name](width, height, fps)
+    except KeyError:
+        raise ValueError(f"Nepoznat izvor frejmova '{name}' ({', '.join(FRAME_SOURCES)}).")
+
+# N bafera iz jedne alokacije; slobodni indeksi idu kroz red (blokira kad
+# enkoder ne stize - to je backpressure koji se meri kao "acquire")
+class BufferPool:
+    def __init__(self, size: int, count: int = FRAME_POOL_SIZE, shared: bool = False):
+        self.size = size
+        self.count = count
+        self._shm = None
+        if shared:
+            from multiprocessing import shared_memory
+            self._shm = shared_memory.SharedMemory(create=True, size=size * count)
+            base = self._shm.buf
+        else:
+            base = memoryview(bytearray(size * count))
+        self.views = [base[i * size:(i + 1) * size] for i in range(count)]
+        self._free = queue.Queue()
+        for i in range(count):
+            self._free.put(i)
+
+    @property
+    def shm_name(self) -> Optional[str]:
+        return self._shm.name if self._shm else None
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, i: int) -> None:
+        self._free.put(i)
+
+    def close(self) -> None:
+        for mv in self.views:
+            mv.release()
+        self.views = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+# Zbir i maksimum po fazi; svaku fazu menja samo jedan tred
+@dataclass
+class StageTimings:
+    total: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    peak: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    count: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(STAGES, 0))
+
+    def add(self, stage: str, sec: float) -> None:
+        self.total[stage] += sec
+        self.count[stage] += 1
+        if sec > self.peak[stage]:
+            self.peak[stage] = sec
+
+    def to_dict(self) -> dict:
+        return {
+            s: {"avg_ms": round(self.total[s] * 1000.0 / max(1, self.count[s]), 3),
+                "max_ms": round(self.peak[s] * 1000.0, 3)}
+            for s in STAGES
+        }
+
+class FramePipeline:
+    def __init__(self, source: FrameSource, log: Optional[Callable[[str], None]] = None,
+                 pool_size: int = FRAME_POOL_SIZE, shared: bool = False):
+        self.source = source
+        self.log = log or (lambda msg: None)
+        self.size = (source.width, source.height)
+        self.frame_size = frame_bytes(*self.size)
+        self.pool_size = pool_size
+        self.shared = shared
+        self.pool: Optional[BufferPool] = None
+        self.paused = False
+        self.frames_filled = 0
+        self.frames_written = 0
+        self.frames_repeated = 0  # izvor je kasnio - poslednji frejm poslat ponovo
+        self.frames_dropped = 0   # kasnjenje preko FRAME_MAX_LAG_SEC - vreme preskoceno
+        self.go_latency_ms: Optional[float] = None
+        self.timings = StageTimings()
+        self.tap = FrameTap()
+
+        self._cond = threading.Condition()
+        self._sink = None
+        self._running = False
+        self._t0 = 0.0
+        self._t_go = 0.0
+        self._n = 0
+        self._ready = queue.Queue()
+        self._repeat: List[int] = []
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def alive(self) -> bool:
+        return self._running and all(t.is_alive() for t in self._threads)
+
+    @property
+    def live(self) -> bool:
+        return self._sink is not None
+
+    def matches(self, spec: RecordSpec) -> bool:
+        return output_size(spec) == self.size and spec.fps == self.source.fps
+
+    def start(self) -> bool:
+        try:
+            self.pool = BufferPool(self.frame_size, self.pool_size, self.shared)
+            self.source.open(self.pool.views)
+        except (OSError, ValueError) as e:
+            self.log(f"Frame source error: {e}")
+            return False
+        self._repeat = [1] * self.pool.count
+        self._running = True
+        self.tap.open(self.source.fps)
+        self._threads = [
+            threading.Thread(target=self._produce, daemon=True),
+            threading.Thread(target=self._write, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def stop(self) -> None:
+        self.detach()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._ready.put(-1)
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+        if self.frames_written:
+            self.log(self.summary())
+        self.tap.close()
+        self.source.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    # START: sat izvora krece od prvog attach-a posle go()
+    def go(self) -> None:
+        with self._cond:
+            self._t_go = time.perf_counter()
+            self._t0 = 0.0
+            self.go_latency_ms = None
+            self.frames_filled = self.frames_written = self.frames_repeated = self.frames_dropped = 0
+            self.timings = StageTimings()
+            self.paused = False
+
+    def attach(self, sink) -> None:
+        with self._cond:
+            self._sink = sink
+            if not self._t0:
+                self._t0 = time.perf_counter()
+                self._n = 0
+            self._cond.notify_all()
+
+    def detach(self) -> None:
+        with self._cond:
+            self._sink = None
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source.name, "width": self.size[0], "height": self.size[1], "fps": self.source.fps,
+            "filled": self.frames_filled, "written": self.frames_written, "repeated": self.frames_repeated,
+            "dropped": self.frames_dropped, "budget_ms": round(1000.0 / self.source.fps, 3),
+            "stages": self.timings.to_dict(),
+        }
+
+    def summary(self) -> str:
+        t = self.timings.to_dict()
+        stages = ", ".join(f"{s} {t[s]['avg_ms']:.2f}/{t[s]['max_ms']:.1f}" for s in STAGES)
+        return (
+            f"Izvor frejmova ({self.source.name}): {self.frames_written} frejmova, ms avg/max: {stages} "
+            f"(budzet {1000.0 / self.source.fps:.1f} ms), ponovljeno {self.frames_repeated}, "
+            f"odbaceno {self.frames_dropped}"
+        )
+
+    def _produce(self) -> None:
+        fps = self.source.fps
+        period = 1.0 / fps
+        max_lag = max(1, int(fps * FRAME_MAX_LAG_SEC))
+        pool, timings, clock = self.pool, self.timings, time.perf_counter
+        while True:
+            with self._cond:
+                while self._running and self._sink is None:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                if timings is not self.timings:
+                    timings = self.timings
+                n, due = self._n, self._t0 + self._n * period
+
+            t = clock()
+            if due > t:
+                time.sleep(due - t)
+            t1 = clock()
+            timings.add("pace", t1 - t)
+            late = int((t1 - due) * fps)
+            if late > max_lag:
+                # Predugo kasnjenje: vreme se preskace, ne puni se enkoder duplikatima
+                self.frames_dropped += late
+                with self._cond:
+                    self._t0 += late * period
+                late = 0
+
+            i = pool.acquire(timeout=0.5)
+            t2 = clock()
+            timings.add("acquire", t2 - t1)
+            if i is None:
+                continue
+            self.source.fill(pool.views[i], n)
+            timings.add("fill", clock() - t2)
+            self.frames_filled += 1
+            self.frames_repeated += late
+            self._repeat[i] = 1 + late
+            with self._cond:
+                self._n = n + 1 + late
+            self._ready.put(i)
+
+    def _write(self) -> None:
+        w, h = self.size
+        pool, clock = self.pool, time.perf_counter
+        while True:
+            i = self._ready.get()
+            if i < 0:
+                break
+            mv = pool.views[i]
+            if self.tap.active:
+                self.tap.push(mv, w, h, PIPE_PIX_FMT)
+            sink = self._sink
+            if sink is not None and not self.paused:
+                t = clock()
+                try:
+                    for _ in range(self._repeat[i]):
+                        sink.write(mv)
+                        self.frames_written += 1
+                    self._mark_first()
+                except (OSError, ValueError):
+                    with self._cond:
+                        if self._sink is sink:
+                            self._sink = None
+                self.timings.add("write", clock() - t)
+            pool.release(i)
+
+    def _mark_first(self) -> None:
+        if self.go_latency_ms is None and self._t_go:
+            self.go_latency_ms = (time.perf_counter() - self._t_go) * 1000.0
+
+# Propusnost same pipeline: frejmovi idu u FFmpeg koji ih samo cita (-f null),
+# pa merenje pokazuje da li Python strana drzi fps, nezavisno od enkodera
+def bench(source: FrameSource, seconds: float, ffmpeg_path: str = FFMPEG_PATH, shared: bool = False) -> dict:
+    args = [
+        ffmpeg_path, "-hide_banner", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", source.pix_fmt, "-video_size", f"{source.width}x{source.height}",
+        "-framerate", str(source.fps), "-i", "pipe:0", "-f", "null", "-",
+    ]
+    proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    pipe = FramePipeline(source, shared=shared)
+    if not pipe.start():
+        proc.kill()
+        raise RuntimeError("izvor frejmova nije pokrenut")
+    pipe.go()
+    pipe.attach(proc.stdin)
+    time.sleep(seconds)
+    pipe.detach()
+    stats = pipe.stats()
+    pipe.stop()
+    proc.stdin.close()
+    proc.wait()
+    stats["seconds"] = seconds
+    stats["sustained"] = stats["dropped"] == 0 and stats["written"] >= int(seconds * source.fps * 0.98)
+    return stats
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.framesource",
+                                 description="Propusnost Python izvora frejmova ka rawvideo stdin-u.")
+    ap.add_argument("--source", default=SyntheticSource.name, choices=list(FRAME_SOURCES))
+    ap.add_argument("--size", default="1920x1080")
+    ap.add_argument("--fps", type=int, default=60)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--shared", action="store_true", help="pool u shared memory")
+    ap.add_argument("--ffmpeg", default=FFMPEG_PATH)
+    args = ap.parse_args(argv)
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    stats = bench(make_source(args.source, w, h, args.fps), args.seconds, args.ffmpeg, args.shared)
+    print(json.dumps(stats, indent=2))
+    return 0 if stats["sustained"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+# Zajednicki "tap" nad frejmovima koji vec teku kroz Python (standby pump,
+# tap izlaz Recorder-a). Dok niko ne ceka frejm, push() samo broji - nema
+# kopiranja, pa tap ne kosta nista kada se ne koristi.
+
+def read_full(stream, mv: memoryview) -> int:
+    got = 0
+    while got < len(mv):
+        n = stream.readinto(mv[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+@dataclass
+class Frame:
+    data: bytes
+    width: int
+    height: int
+    pix_fmt: str
+    t: float = field(default_factory=time.time)
+
+class FrameTap:
+    def __init__(self):
+        self.fps: Optional[float] = None  # brzina kojom producer puni tap (ako je poznata)
+        self.frames_seen = 0
+        self._cond = threading.Condition()
+        self._waiters = 0
+        self._latest: Optional[Frame] = None
+        self._seq = 0
+        self._closed = False
+
+    @property
+    def active(self) -> bool:
+        return self._waiters > 0
+
+    def open(self, fps: Optional[float] = None) -> None:
+        with self._cond:
+            self.fps = fps
+            self._closed = False
+            self._latest = None
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # t: vreme hvatanja frejma ako ga izvor zna (inace trenutak push-a)
+    def push(self, mv, width: int, height: int, pix_fmt: str, t: Optional[float] = None) -> None:
+        self.frames_seen += 1
+        if not self._waiters:
+            return
+        frame = Frame(bytes(mv), width, height, pix_fmt, time.time() if t is None else t)
+        with self._cond:
+            self._latest = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    # Uzima do n frejmova na mrezi od interval sekundi; svaki frejm odmah ide
+    # u on_frame (npr. u worker pool). Vraca broj uzetih frejmova. Tolerancija
+    # je pola koraka (intervala ili frejma izvora, sta je krace): jitter izvora
+    # kad je burst Hz == tap fps ne preskace frejmove.
+    def take(self, n: int, interval: float, timeout: float, on_frame: Callable[[Frame], None]) -> int:
+        got, next_t = 0, None
+        tol = min(interval, 1.0 / self.fps if self.fps else interval) / 2
+        with self._cond:
+            self._waiters += 1
+            seq = self._seq
+        try:
+            while got < n:
+                with self._cond:
+                    ok = self._cond.wait_for(lambda: self._seq != seq or self._closed, timeout)
+                    if not ok or self._closed:
+                        break
+                    seq, frame = self._seq, self._latest
+                if next_t is not None and frame.t < next_t - tol:
+                    continue
+                # Posle rupe u izvoru mreza krece od ovog frejma (bez nadoknade)
+                next_t = frame.t + interval if next_t is None or frame.t >= next_t + tol else next_t + interval
+                got += 1
+                on_frame(frame)
+        finally:
+            with self._cond:
+                self._waiters -= 1
+        return got
@@ -2,7 +2,6 @@ import sys
 import ctypes
 from dataclasses import dataclass
 from typing import Optional, List
-from PySide6 import QtCore
 from ctypes import wintypes
 
 @dataclass
@@ -67,33 +66,104 @@ def win32_list_monitors_with_dpi() -> List[WinMonitor]:
     user32.EnumDisplayMonitors(0, 0, MonitorEnumProc(_callback), 0)
     return monitors
 
+@dataclass
+class WinWindow:
+    hwnd: int
+    title: str
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    @property
+    def w(self) -> int: return self.right - self.left
+    @property
+    def h(self) -> int: return self.bottom - self.top
+    @property
+    def text(self) -> str:
+        return f"{self.title[:60]} - {self.w}x{self.h}"
+
+def win32_list_windows(min_size: int = 64) -> List[WinWindow]:
+    # Vidljivi top-level prozori sa naslovom (fizicki pikseli, DWM okvir bez senke)
+    if sys.platform != "win32": return []
+    user32 = ctypes.windll.user32
+    windows = []
+
+    class RECT(ctypes.Structure):
+        _fields_ = [("left", wintypes.LONG), ("top", wintypes.LONG), ("right", wintypes.LONG), ("bottom", wintypes.LONG)]
+
+    def _rect(hwnd):
+        r = RECT()
+        try:
+            # DWMWA_EXTENDED_FRAME_BOUNDS = 9
+            if ctypes.windll.dwmapi.DwmGetWindowAttribute(wintypes.HWND(hwnd), 9, ctypes.byref(r), ctypes.sizeof(r)) == 0:
+                return r
+        except: pass
+        return r if user32.GetWindowRect(hwnd, ctypes.byref(r)) else None
+
+    def _callback(hwnd, lparam):
+        if not user32.IsWindowVisible(hwnd) or user32.IsIconic(hwnd): return True
+        n = user32.GetWindowTextLengthW(hwnd)
+        if n <= 0: return True
+        buf = ctypes.create_unicode_buffer(n + 1)
+        user32.GetWindowTextW(hwnd, buf, n + 1)
+        r = _rect(hwnd)
+        if r is not None and r.right - r.left >= min_size and r.bottom - r.top >= min_size:
+            windows.append(WinWindow(int(hwnd), buf.value, int(r.left), int(r.top), int(r.right), int(r.bottom)))
+        return True
+
+    EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    user32.EnumWindows(EnumWindowsProc(_callback), 0)
+    return windows
+
+# wParam WM_HOTKEY poruke -> ime tastera (id-jevi iz GlobalHotkeys.register)
+HOTKEY_NAMES = {1: "HOME", 2: "END", 3: "INSERT", 4: "PAGE UP"}
+
+# Koliko je WM_HOTKEY poruka cekala u redu (MSG.time je GetTickCount u ms)
+def hotkey_age_ms(msg_time: int) -> float:
+    if sys.platform != "win32": return 0.0
+    try:
+        age = (ctypes.windll.kernel32.GetTickCount() - int(msg_time)) & 0xFFFFFFFF
+    except Exception: return 0.0
+    return float(age) if age < 60000 else 0.0
+
+# HOME/END su stalno registrovani; INSERT samo dok replay buffer radi,
+# PAGE UP samo ako je ukljucen u config-u (ScreenshotHotkey) - globalni
+# hotkey bez modifikatora oduzima taster svim ostalim aplikacijama
 class GlobalHotkeys:
-    def __init__(self): self.registered = False
-    def register(self) -> bool:
+    def __init__(self):
+        self.registered = False
+        self.replay_registered = False
+        self.shot_registered = False
+    def register(self, screenshot: bool = False) -> bool:
         if sys.platform != "win32": return False
         try:
             u32 = ctypes.windll.user32
             ok1 = u32.RegisterHotKey(None, 1, 0x4000, 0x24) # HOME
             ok2 = u32.RegisterHotKey(None, 2, 0x4000, 0x23) # END
+            if screenshot:
+                self.shot_registered = bool(u32.RegisterHotKey(None, 4, 0x4000, 0x21)) # PAGE UP (screenshot)
             self.registered = bool(ok1 and ok2)
             return self.registered
         except: return False
+    # INSERT (save replay)
+    def set_replay(self, on: bool) -> bool:
+        if sys.platform != "win32" or on == self.replay_registered: return self.replay_registered
+        try:
+            u32 = ctypes.windll.user32
+            if on:
+                self.replay_registered = bool(u32.RegisterHotKey(None, 3, 0x4000, 0x2D))
+            else:
+                u32.UnregisterHotKey(None, 3)
+                self.replay_registered = False
+        except: pass
+        return self.replay_registered
     def unregister(self):
-        if self.registered:
+        if self.registered or self.replay_registered or self.shot_registered:
             try:
                 ctypes.windll.user32.UnregisterHotKey(None, 1)
                 ctypes.windll.user32.UnregisterHotKey(None, 2)
+                if self.replay_registered: ctypes.windll.user32.UnregisterHotKey(None, 3)
+                if self.shot_registered: ctypes.windll.user32.UnregisterHotKey(None, 4)
             except: pass
-
-class GlobalHotkeyFilter(QtCore.QAbstractNativeEventFilter):
-    def __init__(self, on_home, on_end):
-        super().__init__()
-        self.on_home = on_home
-        self.on_end = on_end
-    def nativeEventFilter(self, eventType, message):
-        if sys.platform == "win32" and eventType in (b"windows_generic_MSG", b"windows_dispatcher_MSG"):
-            msg = ctypes.cast(int(message), ctypes.POINTER(wintypes.MSG)).contents
-            if msg.message == 0x0312: # WM_HOTKEY
-                if int(msg.wParam) == 1: self.on_home(); return True, 0
-                if int(msg.wParam) == 2: self.on_end(); return True, 0
-        return False, 0
+            self.registered = self.replay_registered = self.shot_registered = False
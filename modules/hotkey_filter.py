@@ -0,0 +1,30 @@
+import sys
+import ctypes
+from ctypes import wintypes
+import time
+from PySide6 import QtCore
+from .hardware import HOTKEY_NAMES, hotkey_age_ms
+from .spans import SPANS
+
+# Qt deo globalnih hotkey-a (WM_HOTKEY iz Qt event loop-a); registracija
+# je u hardware.py, koji ostaje bez Qt-a zbog headless CLI-ja.
+class GlobalHotkeyFilter(QtCore.QAbstractNativeEventFilter):
+    def __init__(self, on_home, on_end, on_replay=None, on_shot=None):
+        super().__init__()
+        self.on_home = on_home
+        self.on_end = on_end
+        self.on_replay = on_replay
+        self.on_shot = on_shot
+    def nativeEventFilter(self, eventType, message):
+        if sys.platform == "win32" and eventType in (b"windows_generic_MSG", b"windows_dispatcher_MSG"):
+            msg = ctypes.cast(int(message), ctypes.POINTER(wintypes.MSG)).contents
+            if msg.message == 0x0312: # WM_HOTKEY
+                if SPANS.enabled:
+                    # Span pocinje kad je Windows postavio poruku, ne kad je Qt isporuci
+                    t0 = time.perf_counter() - hotkey_age_ms(msg.time) / 1000.0
+                    SPANS.begin("hotkey", HOTKEY_NAMES.get(int(msg.wParam)), t0=t0)
+                if int(msg.wParam) == 1: self.on_home(); return True, 0
+                if int(msg.wParam) == 2: self.on_end(); return True, 0
+                if int(msg.wParam) == 3 and self.on_replay: self.on_replay(); return True, 0
+                if int(msg.wParam) == 4 and self.on_shot: self.on_shot(); return True, 0
+        return False, 0
@@ -0,0 +1,398 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict, field, fields
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .capture import build_video_codec_args
+from .constants import AUDIO_BITRATE, FFMPEG_PATH, JOB_KEEP_FINISHED, JOB_WORKERS, JOB_WORKERS_RECORDING, JOBS_FILE, ensure_dir
+from .library import probe_media
+from .procstats import cpu_count, set_background
+from .progress import ProgressParser
+from .recorder import Hook
+
+# Post-processing posle snimanja (faststart, thumbnail, proxy, checksum) kao
+# perzistentan red poslova. Svaki posao je jedan FFmpeg proces (ili hash u
+# tredu) sa niskim prioritetom; dok neki enkoder snima, broj istovremenih
+# poslova pada na JOB_WORKERS_RECORDING, a FFmpeg poslovi koji vec rade
+# (i oni pokrenuti tokom snimanja) prelaze na najnizi prioritet. Red se
+# cuva u jobs.json, pa se posao prekinut gasenjem aplikacije pokrece
+# ponovo od pocetka.
+
+class JobState:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+FINISHED = (JobState.DONE, JobState.FAILED, JobState.CANCELLED)
+
+@dataclass
+class Job:
+    kind: str
+    src: str
+    priority: int = 5  # manji broj = ranije
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    state: str = JobState.QUEUED
+    progress: float = 0.0
+    duration: float = 0.0  # sekunde ulaza (za progress); 0 = nepoznato
+    dst: str = ""
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    finished: float = 0.0
+    params: Dict[str, str] = field(default_factory=dict)  # dodatni argumenti builder-a (transcode)
+    then: List[str] = field(default_factory=list)  # poslovi nad dst-om posle uspeha
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Job":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in d.items() if k in names})
+
+    def label(self) -> str:
+        return f"{JOB_KINDS[self.kind].label} {Path(self.src).name}" if self.kind in JOB_KINDS else self.kind
+
+# --- Vrste poslova: builder FFmpeg argumenata (ili Python funkcija) + cilj
+@dataclass(frozen=True)
+class JobKind:
+    name: str
+    label: str
+    target: Callable[[str], str]
+    args: Optional[Callable[..., List[str]]] = None  # (src, tmp, **params) -> FFmpeg argumenti
+    run: Optional[Callable[[str, str, Callable[[float], None]], None]] = None  # (src, tmp, progress)
+    priority: int = 5
+    consume: bool = False  # izvor se brise posle uspeha (medjufajl)
+
+def _tmp_path(dst: str) -> str:
+    p = Path(dst)
+    return str(p.with_name(f"{p.stem}.job.tmp{p.suffix}"))
+
+def _faststart_args(src: str, tmp: str) -> List[str]:
+    return ["-i", src, "-map", "0", "-c", "copy", "-movflags", "+faststart", tmp]
+
+def _thumb_args(src: str, tmp: str) -> List[str]:
+    # thumbnail filter bira reprezentativan frejm iz prvih ~100
+    return ["-i", src, "-vf", "thumbnail,scale=320:-2", "-frames:v", "1", "-update", "1", tmp]
+
+def _proxy_args(src: str, tmp: str) -> List[str]:
+    return [
+        "-i", src, "-vf", "scale=-2:540", "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+        "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart", tmp,
+    ]
+
+# Two-stage: lossless medjufajl -> finalni fajl sporijim presetom; sve
+# audio trake idu u AAC
+def _transcode_args(src: str, tmp: str, encoder: str = "libx264", preset: str = "slow", crf: str = "23",
+                    threads: str = "0") -> List[str]:
+    return (
+        # passthrough: VFR medjufajl (dedup) ostaje VFR, CFR ostaje CFR
+        ["-i", src, "-map", "0", "-vsync", "passthrough"]
+        + build_video_codec_args(encoder, preset, int(crf), int(threads))
+        + ["-c:a", "aac", "-b:a", AUDIO_BITRATE, "-movflags", "+faststart", tmp]
+    )
+
+def _sha256(src: str, tmp: str, progress: Callable[[float], None]) -> None:
+    h = hashlib.sha256()
+    total = max(1, os.path.getsize(src))
+    done = 0
+    with open(src, "rb") as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            h.update(chunk)
+            done += len(chunk)
+            progress(done / total)
+    Path(tmp).write_text(f"{h.hexdigest()} *{Path(src).name}\n", encoding="utf-8")
+
+JOB_KINDS: Dict[str, JobKind] = {
+    k.name: k for k in (
+        # faststart zamenjuje sam izvor (tmp + os.replace)
+        JobKind("faststart", "Faststart", lambda s: s, _faststart_args, priority=2),
+        JobKind("thumbnail", "Thumbnail", lambda s: str(Path(s).with_suffix(".jpg")), _thumb_args, priority=1),
+        JobKind("checksum", "SHA-256", lambda s: s + ".sha256", run=_sha256, priority=5),
+        # dst zadaje pozivalac (output folder), izvor je u scratch-u
+        JobKind("transcode", "Transcode", lambda s: str(Path(s).with_suffix(".mp4")), _transcode_args, priority=3,
+                consume=True),
+        JobKind(
+            "proxy", "Proxy 540p", lambda s: str(Path(s).with_name(f"{Path(s).stem}_proxy.mp4")), _proxy_args,
+            priority=8,
+        ),
+    )
+}
+
+def probe_duration(src: str, ffmpeg_path: str = FFMPEG_PATH) -> float:
+    return float(probe_media(src, ffmpeg_path)["duration"])
+
+def _low_priority_popen(args: List[str]):
+    if sys.platform == "win32":
+        # BELOW_NORMAL_PRIORITY_CLASS | CREATE_NO_WINDOW
+        return subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=0x00004000 | subprocess.CREATE_NO_WINDOW,
+        )
+    return subprocess.Popen(
+        args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        preexec_fn=lambda: os.nice(10),
+    )
+
+class JobQueue:
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, path: Path = JOBS_FILE, workers: int = 0,
+                 workers_recording: int = JOB_WORKERS_RECORDING):
+        self.ffmpeg_path = ffmpeg_path
+        self.path = Path(path)
+        self.workers = workers or JOB_WORKERS or max(1, cpu_count() // 2)
+        self.workers_recording = workers_recording
+
+        self.on_job = Hook()  # (Job) - promena stanja ili progresa
+        self.on_log = Hook()  # (msg)
+
+        self.jobs: Dict[str, Job] = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._running = 0
+        self._busy = set()  # izvori koji trenutno snimaju
+        self._cond = threading.Condition()
+        self._save_lock = threading.Lock()  # jedan upis jobs.json u isto vreme
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Javni API
+    def start(self) -> None:
+        self._load()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        # Poslovi koji rade se prekidaju i ostaju "queued" za sledeci start
+        with self._cond:
+            self._closed = True
+            procs = list(self._procs.values())
+            self._cond.notify_all()
+        for p in procs:
+            try:
+                p.kill()
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._save()
+
+    def submit(self, kind: str, src: str, priority: Optional[int] = None, duration: float = 0.0,
+               dst: Optional[str] = None, params: Optional[Dict[str, str]] = None,
+               then: Optional[List[str]] = None) -> Optional[Job]:
+        if kind not in JOB_KINDS:
+            self.on_log.emit(f"Nepoznat posao: {kind}")
+            return None
+        k = JOB_KINDS[kind]
+        job = Job(
+            kind, str(src), k.priority if priority is None else priority, duration=duration,
+            dst=str(dst) if dst else k.target(str(src)), params=dict(params or {}), then=list(then or []),
+        )
+        with self._cond:
+            self.jobs[job.id] = job
+            heapq.heappush(self._heap, (job.priority, next(self._seq), job.id))
+            self._cond.notify_all()
+        self._save()
+        self.on_job.emit(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return False
+            job.state = JobState.CANCELLED
+            job.finished = time.time()
+            proc = self._procs.get(job_id)
+        if proc is not None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+        self._save()
+        self.on_job.emit(job)
+        return True
+
+    def cancel_all(self) -> int:
+        return sum(self.cancel(j.id) for j in self.pending())
+
+    def pending(self) -> List[Job]:
+        with self._cond:
+            return [j for j in self.jobs.values() if j.state not in FINISHED]
+
+    # Kontroleri (snimanje, sesija, replay) javljaju da li im enkoder radi
+    def set_recording(self, source, active: bool) -> None:
+        with self._cond:
+            was = bool(self._busy)
+            if active:
+                self._busy.add(source)
+            else:
+                self._busy.discard(source)
+            now = bool(self._busy)
+            procs = list(self._procs.values()) if was != now else []
+            self._cond.notify_all()
+        for p in procs:
+            set_background(p, now)
+
+    @property
+    def limit(self) -> int:
+        return self.workers_recording if self._busy else self.workers
+
+    # --- Perzistencija
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        resumed = 0
+        with self._cond:
+            for d in data.get("jobs", []):
+                try:
+                    job = Job.from_dict(d)
+                except TypeError:
+                    continue
+                if job.id in self.jobs:
+                    continue
+                if job.state == JobState.RUNNING:
+                    job.state, job.progress = JobState.QUEUED, 0.0
+                self.jobs[job.id] = job
+                if job.state == JobState.QUEUED:
+                    heapq.heappush(self._heap, (job.priority, next(self._seq), job.id))
+                    resumed += 1
+        if resumed:
+            self.on_log.emit(f"Poslovi: nastavljam {resumed} iz prethodnog pokretanja.")
+
+    def _save(self) -> None:
+        with self._cond:
+            finished = sorted((j for j in self.jobs.values() if j.state in FINISHED), key=lambda j: j.finished)
+            for j in finished[:-JOB_KEEP_FINISHED] if len(finished) > JOB_KEEP_FINISHED else []:
+                del self.jobs[j.id]
+            data = {"jobs": [j.to_dict() for j in self.jobs.values()]}
+        try:
+            with self._save_lock:
+                ensure_dir(self.path.parent)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+                os.replace(tmp, self.path)
+        except OSError as e:
+            self.on_log.emit(f"Poslovi: {self.path} nije upisan ({e})")
+
+    # --- Dispatcher: uzima najprioritetniji posao kad ima slobodnog mesta
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._heap or self._running >= self.limit):
+                    self._cond.wait(1.0)
+                if self._closed:
+                    return
+                _, _, job_id = heapq.heappop(self._heap)
+                job = self.jobs.get(job_id)
+                if job is None or job.state != JobState.QUEUED:
+                    continue
+                job.state = JobState.RUNNING
+                self._running += 1
+            threading.Thread(target=self._work, args=(job,), daemon=True).start()
+
+    def _work(self, job: Job) -> None:
+        self._save()
+        self.on_job.emit(job)
+        self.on_log.emit(f"Posao: {job.label()}...")
+        kind = JOB_KINDS[job.kind]
+        tmp = _tmp_path(job.dst)
+        error = ""
+        try:
+            if not os.path.exists(job.src):
+                raise FileNotFoundError(f"nema izvora {job.src}")
+            if kind.run is not None:
+                kind.run(job.src, tmp, lambda f: self._progress(job, f))
+            else:
+                error = self._run_ffmpeg(job, kind.args(job.src, tmp, **job.params))
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        with self._cond:
+            self._running -= 1
+            self._procs.pop(job.id, None)
+            closing = self._closed
+            self._cond.notify_all()
+        if not error and not closing and job.state == JobState.RUNNING:
+            # Cilj moze biti zakljucan (otvoren u plejeru) ili na drugom disku
+            try:
+                os.replace(tmp, job.dst)
+            except OSError as e:
+                error = f"ne mogu da upisem {job.dst}: {e}"
+        if job.state == JobState.CANCELLED or closing or error:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        if closing and job.state == JobState.RUNNING:
+            job.state, job.progress = JobState.QUEUED, 0.0  # nastavak posle restarta
+            return
+        if job.state == JobState.CANCELLED:
+            self.on_log.emit(f"Posao otkazan: {job.label()}")
+        elif error:
+            job.state, job.error = JobState.FAILED, error
+            self.on_log.emit(f"Posao nije uspeo: {job.label()} ({error})")
+        else:
+            job.state, job.progress = JobState.DONE, 1.0
+            self.on_log.emit(f"Posao gotov: {job.label()} -> {Path(job.dst).name}")
+            if kind.consume and job.src != job.dst:
+                try:
+                    os.remove(job.src)
+                except OSError:
+                    pass
+        job.finished = time.time()
+        self._save()
+        self.on_job.emit(job)
+        if job.state == JobState.DONE:
+            for k in job.then:
+                self.submit(k, job.dst)
+
+    def _progress(self, job: Job, frac: float) -> None:
+        if job.state == JobState.CANCELLED:
+            raise InterruptedError("otkazano")
+        # Ne emituje se svaki uzorak - 1% je dovoljno za GUI
+        frac = max(0.0, min(1.0, frac))
+        if frac - job.progress >= 0.01 or frac >= 1.0:
+            job.progress = frac
+            self.on_job.emit(job)
+
+    def _run_ffmpeg(self, job: Job, kind_args: List[str]) -> str:
+        if not job.duration:
+            job.duration = probe_duration(job.src, self.ffmpeg_path)
+        proc = _low_priority_popen([
+            self.ffmpeg_path, "-y", "-hide_banner", "-nostdin", "-loglevel", "error", "-progress", "pipe:1", "-nostats",
+            *kind_args,
+        ])
+        with self._cond:
+            self._procs[job.id] = proc
+            if job.state == JobState.CANCELLED or self._closed:
+                proc.kill()
+            elif self._busy:
+                set_background(proc, True)
+        err = []
+        t = threading.Thread(target=lambda: err.extend(proc.stderr.read().decode("utf-8", "replace").splitlines()))
+        t.daemon = True
+        t.start()
+        parser = ProgressParser()
+        for raw in iter(proc.stdout.readline, b""):
+            stats = parser.feed(raw.decode("utf-8", "replace"))
+            if stats and job.duration > 0 and job.state == JobState.RUNNING:
+                self._progress(job, stats.out_time_sec / job.duration)
+        code = proc.wait()
+        t.join(timeout=1.0)
+        if code != 0 and job.state != JobState.CANCELLED:
+            return (err[-1] if err else "") or f"ffmpeg exit {code}"
+        return ""
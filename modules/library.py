@@ -0,0 +1,297 @@
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .constants import FFMPEG_PATH, LIBRARY_DB, LIBRARY_EXTS, THUMB_CACHE_MB, THUMB_WIDTH, ensure_dir
+from .finalize import run_ffmpeg
+from .recorder import Hook
+
+# Biblioteka snimaka: SQLite indeks (trajanje, rezolucija, fps, kodek,
+# velicina, thumbnail) koji se osvezava inkrementalno po (size, mtime).
+# Rescan je samo scandir + jedan SELECT; FFmpeg probe i thumbnail rade na
+# pozadinskom tredu i samo za nove/promenjene fajlove.
+
+SCHEMA_VERSION = 1
+
+@dataclass
+class MediaInfo:
+    path: str
+    size: int
+    mtime_ns: int
+    duration: float = 0.0
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    codec: str = ""
+    thumb: str = ""  # kljuc u ThumbCache
+    probed_at: float = 0.0
+
+    @property
+    def probed(self) -> bool:
+        return self.probed_at > 0
+
+    def summary(self) -> str:
+        if not self.probed:
+            return f"{self.size / (1024 * 1024):.1f} MB | ..."
+        m, s = divmod(int(round(self.duration)), 60)
+        h, m = divmod(m, 60)
+        dur = f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+        return (
+            f"{self.width}x{self.height} {self.fps:g} fps {self.codec} | {dur} | "
+            f"{self.size / (1024 * 1024):.1f} MB"
+        )
+
+# --- Probe bez ffprobe-a: zaglavlje koje "ffmpeg -i" ispise na stderr
+_DURATION = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO = re.compile(r"Stream #\S+.*?Video:\s*(\w+).*?,\s*(\d{2,5})x(\d{2,5})")
+_FPS = re.compile(r"([\d.]+)\s*fps")
+
+def parse_probe(text: str) -> Dict[str, object]:
+    out = {"duration": 0.0, "width": 0, "height": 0, "fps": 0.0, "codec": ""}
+    m = _DURATION.search(text)
+    if m:
+        out["duration"] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    for line in text.splitlines():
+        v = _VIDEO.search(line)
+        if v:
+            out["codec"], out["width"], out["height"] = v.group(1), int(v.group(2)), int(v.group(3))
+            f = _FPS.search(line)
+            if f:
+                out["fps"] = float(f.group(1))
+            break
+    return out
+
+def probe_media(src: str, ffmpeg_path: str = FFMPEG_PATH) -> Dict[str, object]:
+    _, err = run_ffmpeg([ffmpeg_path, "-hide_banner", "-i", src], timeout=10)
+    return parse_probe(err)
+
+def make_thumbnail(src: str, dst: str, at_sec: float, ffmpeg_path: str = FFMPEG_PATH) -> bool:
+    code, _ = run_ffmpeg([
+        ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error", "-ss", f"{at_sec:.3f}", "-i", src,
+        "-frames:v", "1", "-vf", f"scale={THUMB_WIDTH}:-2", "-q:v", "5", "-update", "1", dst,
+    ], timeout=30)
+    return code == 0 and os.path.exists(dst)
+
+# --- Thumbnail kes ogranicen velicinom; LRU po vremenu poslednjeg pristupa
+class ThumbCache:
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock, folder: Path, max_bytes: int):
+        self.db = db
+        self.lock = lock
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key_for(info: MediaInfo) -> str:
+        return hashlib.sha1(f"{info.path}|{info.size}|{info.mtime_ns}".encode("utf-8")).hexdigest()[:20]
+
+    def path(self, key: str) -> Path:
+        return self.folder / f"{key}.jpg"
+
+    def has(self, key: str) -> bool:
+        return bool(key) and self.path(key).exists()
+
+    # Prikaz u biblioteci = pristup; jedan commit za ceo spisak
+    def touch(self, keys: List[str]) -> None:
+        now = time.time()
+        with self.lock:
+            self.db.executemany("UPDATE thumbs SET atime = ? WHERE key = ?", [(now, k) for k in keys if k])
+            self.db.commit()
+
+    def put(self, key: str) -> None:
+        p = self.path(key)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO thumbs(key, bytes, atime) VALUES (?, ?, ?)", (key, p.stat().st_size, time.time())
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self) -> None:
+        total = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, bytes FROM thumbs ORDER BY atime").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            self.db.execute("DELETE FROM thumbs WHERE key = ?", (key,))
+            total -= size
+
+class LibraryIndex:
+    def __init__(self, db_path: Path = LIBRARY_DB, thumb_dir: Optional[Path] = None,
+                 max_thumb_bytes: int = THUMB_CACHE_MB * 1024 * 1024, ffmpeg_path: str = FFMPEG_PATH):
+        self.ffmpeg_path = ffmpeg_path
+        self.on_entry = Hook()  # (MediaInfo) posle probe-a ili novog thumbnail-a
+        self.on_log = Hook()    # (msg)
+        self.on_idle = Hook()   # () pozadinski red je prazan
+
+        db_path = Path(db_path)
+        ensure_dir(db_path.parent)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._migrate()
+        thumb_dir = Path(thumb_dir) if thumb_dir else db_path.parent / "thumbs"
+        ensure_dir(thumb_dir)
+        self.thumbs = ThumbCache(self.db, self._lock, thumb_dir, max_thumb_bytes)
+
+        self._todo: "queue.Queue[Tuple[MediaInfo, bool]]" = queue.Queue()
+        self._queued = set()  # putanje u redu ili u obradi (pod _lock-om)
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _migrate(self) -> None:
+        with self._lock:
+            if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self.db.executescript(f"""
+                    DROP TABLE IF EXISTS media;
+                    CREATE TABLE media(
+                        path TEXT PRIMARY KEY, folder TEXT, size INTEGER, mtime_ns INTEGER, duration REAL,
+                        width INTEGER, height INTEGER, fps REAL, codec TEXT, thumb TEXT, probed_at REAL
+                    );
+                    CREATE INDEX media_folder ON media(folder);
+                    CREATE TABLE IF NOT EXISTS thumbs(key TEXT PRIMARY KEY, bytes INTEGER, atime REAL);
+                    PRAGMA user_version = {SCHEMA_VERSION};
+                """)
+            self.db.commit()
+
+    # Red se prazni, tekuci fajl se zavrsava (worker se ceka), pa tek onda
+    # se zatvara baza - worker ne pise u zatvorenu konekciju
+    def close(self, timeout: float = 30.0) -> None:
+        while True:
+            try:
+                self._todo.get_nowait()
+            except queue.Empty:
+                break
+        self._todo.put(None)
+        worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+        with self._lock:
+            self._closed = True
+            self._queued.clear()
+            self.db.close()
+
+    # --- Inkrementalni scan: stat iz scandir-a protiv (size, mtime) u bazi
+    def scan(self, folder: str) -> Tuple[List[MediaInfo], int]:
+        folder = str(Path(folder))
+        with self._lock:
+            rows = self.db.execute("SELECT * FROM media WHERE folder = ?", (folder,)).fetchall()
+        known = {r[0]: _row_info(r) for r in rows}
+        entries, seen, changed = [], set(), []
+        try:
+            it = list(os.scandir(folder))
+        except OSError:
+            it = []
+        for de in it:
+            if not de.name.lower().endswith(LIBRARY_EXTS) or not de.is_file():
+                continue
+            st = de.stat()
+            seen.add(de.path)
+            old = known.get(de.path)
+            if old and old.size == st.st_size and old.mtime_ns == st.st_mtime_ns:
+                entries.append(old)
+                continue
+            info = MediaInfo(de.path, st.st_size, st.st_mtime_ns)
+            entries.append(info)
+            changed.append(info)
+        gone = [p for p in known if p not in seen]
+        with self._lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO media(path, folder, size, mtime_ns, probed_at) VALUES (?, ?, ?, ?, 0)",
+                [(i.path, folder, i.size, i.mtime_ns) for i in changed],
+            )
+            self.db.executemany("DELETE FROM media WHERE path = ?", [(p,) for p in gone])
+            self.db.commit()
+        entries.sort(key=lambda i: i.mtime_ns, reverse=True)
+        return entries, len(changed)
+
+    # scan + pozadinski probe promenjenih i thumbnail-i koji su ispali iz kesa
+    def refresh(self, folder: str) -> List[MediaInfo]:
+        t0 = time.perf_counter()
+        entries, changed = self.scan(folder)
+        for info in entries:
+            if not info.probed:
+                self._enqueue(info, True)
+            elif info.width and not self.thumbs.has(info.thumb):
+                # Thumbnail je ispao iz kesa - metadata ostaje, pravi se samo slika
+                self._enqueue(info, False)
+        self.on_log.emit(
+            f"Biblioteka: {len(entries)} fajlova, {changed} novih/promenjenih "
+            f"({(time.perf_counter() - t0) * 1000:.0f} ms)"
+        )
+        with self._lock:
+            idle = self._todo.empty() and not self._queued
+        if idle:
+            self.on_idle.emit()
+        return entries
+
+    def thumb_path(self, info: MediaInfo) -> Optional[str]:
+        return str(self.thumbs.path(info.thumb)) if self.thumbs.has(info.thumb) else None
+
+    def _enqueue(self, info: MediaInfo, probe: bool) -> None:
+        with self._lock:
+            if self._closed or info.path in self._queued:
+                return
+            self._queued.add(info.path)
+        self._todo.put((info, probe))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+    def _work(self) -> None:
+        while True:
+            try:
+                item = self._todo.get(timeout=5.0)
+            except queue.Empty:
+                return
+            if item is None:
+                return
+            info, probe = item
+            try:
+                self._process(info, probe)
+            except Exception as e:
+                self.on_log.emit(f"Biblioteka: {Path(info.path).name} nije obradjen ({e})")
+            finally:
+                with self._lock:
+                    self._queued.discard(info.path)
+            if self._todo.empty():
+                self.on_idle.emit()
+
+    def _process(self, info: MediaInfo, probe: bool) -> None:
+        if self._closed:
+            return
+        if probe:
+            meta = probe_media(info.path, self.ffmpeg_path)
+            info.duration, info.width, info.height = meta["duration"], meta["width"], meta["height"]
+            info.fps, info.codec = meta["fps"], meta["codec"]
+            info.probed_at = time.time()
+        key = ThumbCache.key_for(info)
+        if make_thumbnail(info.path, str(self.thumbs.path(key)), min(10.0, info.duration * 0.1), self.ffmpeg_path):
+            self.thumbs.put(key)
+            info.thumb = key
+        with self._lock:
+            if self._closed:
+                return
+            self.db.execute(
+                "UPDATE media SET duration = ?, width = ?, height = ?, fps = ?, codec = ?, thumb = ?, probed_at = ? "
+                "WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (info.duration, info.width, info.height, info.fps, info.codec, info.thumb, info.probed_at,
+                 info.path, info.size, info.mtime_ns),
+            )
+            self.db.commit()
+        self.on_entry.emit(info)
+
+def _row_info(r) -> MediaInfo:
+    path, _folder, size, mtime_ns, duration, w, h, fps, codec, thumb, probed_at = r
+    return MediaInfo(path, size, mtime_ns, duration or 0.0, w or 0, h or 0, fps or 0.0, codec or "", thumb or "",
+                     probed_at or 0.0)
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from PySide6 import QtWidgets, QtCore, QtGui
+
+from .constants import VIDEO_SUBDIR
+from .library import LibraryIndex, MediaInfo
+
+# Prikaz biblioteke: ikonice iz thumbnail kesa + metadata iz indeksa.
+# Probe i thumbnail-i stizu sa pozadinskog treda preko sig_entry.
+class LibraryDialog(QtWidgets.QDialog):
+    sig_entry = QtCore.Signal(object)  # MediaInfo
+    sig_idle = QtCore.Signal()
+
+    def __init__(self, index: LibraryIndex, root: str, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Biblioteka snimaka")
+        self.resize(900, 600)
+        self.index = index
+        self.folder = str(Path(root) / VIDEO_SUBDIR)
+        self._items = {}  # path -> QListWidgetItem
+
+        vl = QtWidgets.QVBoxLayout(self)
+        row = QtWidgets.QHBoxLayout()
+        self.ed_filter = QtWidgets.QLineEdit()
+        self.ed_filter.setPlaceholderText("Filter (ime fajla)...")
+        self.ed_filter.textChanged.connect(self._apply_filter)
+        self.btn_refresh = QtWidgets.QPushButton("↻")
+        self.btn_refresh.setFixedWidth(34)
+        self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_folder = QtWidgets.QPushButton("Otvori folder")
+        self.btn_folder.clicked.connect(
+            lambda: QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(self.folder))
+        )
+        row.addWidget(self.ed_filter, 1)
+        row.addWidget(self.btn_refresh)
+        row.addWidget(self.btn_folder)
+
+        self.list = QtWidgets.QListWidget()
+        self.list.setViewMode(QtWidgets.QListView.IconMode)
+        self.list.setIconSize(QtCore.QSize(240, 135))
+        self.list.setGridSize(QtCore.QSize(270, 200))
+        self.list.setResizeMode(QtWidgets.QListView.Adjust)
+        self.list.setMovement(QtWidgets.QListView.Static)
+        self.list.setWordWrap(True)
+        self.list.itemDoubleClicked.connect(self._open)
+        self.lbl = QtWidgets.QLabel("")
+
+        vl.addLayout(row)
+        vl.addWidget(self.list, 1)
+        vl.addWidget(self.lbl)
+
+        self.sig_entry.connect(self._on_entry)
+        self.sig_idle.connect(lambda: self.lbl.setText(f"{len(self._items)} snimaka | {self.folder}"))
+        index.on_entry.connect(self.sig_entry.emit)
+        index.on_idle.connect(self.sig_idle.emit)
+        self.refresh()
+
+    def done(self, r):
+        self.index.on_entry.disconnect(self.sig_entry.emit)
+        self.index.on_idle.disconnect(self.sig_idle.emit)
+        super().done(r)
+
+    def refresh(self):
+        entries = self.index.refresh(self.folder)
+        self.list.clear()
+        self._items = {}
+        for info in entries:
+            item = QtWidgets.QListWidgetItem()
+            item.setData(QtCore.Qt.UserRole, info.path)
+            self._items[info.path] = item
+            self._fill(item, info)
+            self.list.addItem(item)
+        self.index.thumbs.touch([i.thumb for i in entries])
+        self._apply_filter(self.ed_filter.text())
+        self.lbl.setText(f"{len(entries)} snimaka | obrađujem nove...")
+
+    def _fill(self, item: QtWidgets.QListWidgetItem, info: MediaInfo):
+        item.setText(f"{Path(info.path).name}\n{info.summary()}")
+        thumb = self.index.thumb_path(info)
+        if thumb:
+            item.setIcon(QtGui.QIcon(thumb))
+
+    def _on_entry(self, info):
+        item = self._items.get(info.path)
+        if item is not None:
+            self._fill(item, info)
+
+    def _apply_filter(self, text):
+        t = text.strip().lower()
+        for path, item in self._items.items():
+            item.setHidden(bool(t) and t not in Path(path).name.lower())
+
+    def _open(self, item):
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(item.data(QtCore.Qt.UserRole)))
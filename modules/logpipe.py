@@ -0,0 +1,105 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Callable, Deque, List, Optional
+
+# Log linije se skupljaju u tredu koji ih proizvodi (stderr reader, GUI...)
+# i salju dalje u paketima na tajmer, umesto jedan emit po liniji.
+class LogBatcher:
+    def __init__(self, max_pending: int, flush_interval: float):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.dropped_total = 0
+        self._pending: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._last: Optional[str] = None
+        self._repeat = 0
+        self._sink: Optional[Callable[[List[str]], None]] = None
+        self._file_log: Optional[logging.Logger] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, sink: Callable[[List[str]], None]) -> None:
+        self._sink = sink
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.flush()
+        self.detach_file()
+
+    def attach_file(self, path: Path, max_bytes: int, backups: int) -> None:
+        self.detach_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        log = logging.getLogger(f"scenerec.session.{id(self)}")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        self._file_log = log
+
+    def detach_file(self) -> None:
+        if self._file_log:
+            for h in list(self._file_log.handlers):
+                self._file_log.removeHandler(h)
+                h.close()
+            self._file_log = None
+
+    def push(self, line: str) -> None:
+        with self._lock:
+            # Uzastopne identicne linije se sazimaju u jednu
+            if line == self._last:
+                self._repeat += 1
+                return
+            self._close_repeat()
+            self._last = line
+            self._append(f"[{datetime.now().strftime('%H:%M:%S')}] {line}")
+
+    def _close_repeat(self) -> None:
+        if self._repeat:
+            self._append(f"    ... (ponovljeno jos {self._repeat}x)")
+            self._repeat = 0
+
+    def _append(self, line: str) -> None:
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self._dropped += 1
+            self.dropped_total += 1
+        self._pending.append(line)
+
+    def drain(self) -> List[str]:
+        with self._lock:
+            self._close_repeat()
+            self._last = None
+            lines = list(self._pending)
+            self._pending.clear()
+            if self._dropped:
+                lines.append(f"[log] {self._dropped} linija odbaceno (backpressure), ukupno {self.dropped_total}")
+                self._dropped = 0
+        return lines
+
+    def flush(self) -> None:
+        lines = self.drain()
+        if not lines:
+            return
+        if self._file_log:
+            self._file_log.info("\n".join(lines))
+        if self._sink:
+            self._sink(lines)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
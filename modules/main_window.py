@@ -1,35 +1,103 @@
 from PySide6 import QtWidgets, QtCore, QtGui
-from .constants import APP_TITLE, APP_VERSION, DEFAULT_OUTPUT_ROOT, PRESETS, load_config, save_config, ensure_output_root, suggest_preset_for_monitor
+from .constants import (
+    APP_TITLE, APP_VERSION, CONTROL_PORT, DEDUP_MAX_SEC, DEDUP_THRESHOLD, DEFAULT_OUTPUT_ROOT, DEFAULT_SCRATCH_ROOT,
+    PRESETS, LOG_DIR, LOG_LINE_CAP, REPLAY_DEFAULT_SEC, REPLAY_SUBDIR, SESSION_LOG_MAX_BYTES, SESSION_LOG_BACKUPS, SHOT_BURST_HZ, SHOT_PNG_LEVEL,
+    SHOT_TAP_FPS, SPANS_FILE, THUMB_SUBDIR, AUDIO_DEFAULT_DEVICE, VIDEO_SUBDIR, ensure_dir,
+    load_config, save_config, ensure_output_root, suggest_preset_for_monitor,
+)
 from .styling import CRIMSON, TERMINAL, build_qss
-from .hardware import win32_list_monitors_with_dpi, GlobalHotkeys, GlobalHotkeyFilter
-from .ffmpeg_ctrl import FfmpegController
-from datetime import datetime
+from .hardware import win32_list_monitors_with_dpi, win32_list_windows, GlobalHotkeys
+from .hotkey_filter import GlobalHotkeyFilter
+from .ffmpeg_ctrl import FfmpegController, SessionController
+from .recorder import RecState
+from .replay import ReplayBuffer
+from pathlib import Path
+from .capture import OUTPUT_MODES, RecordSpec, available_backends, default_backend, get_backend, suggest_backend
+from .adaptive import AdaptiveConfig
+from .twostage import TwoStageConfig
+from .storage import StorageConfig, throughput_cache
+from .audio import device_cache
+from .region import Region, apply_area, clamp_region, delete_region_preset, region_presets, store_region_preset
+from .region_overlay import RegionSelector, screen_for_monitor
+from .encoder_bench import benchmark, get_profile, profile_key, store_profile
+from .screenshot import SHOT_FORMATS
+from .jobs import JobQueue, JobState
+from .library import LibraryIndex
+from .library_view import LibraryDialog
+from .spans import SPANS
+from .control import ControlServer
+from .streaming import parse_targets
+import threading
 
 class MainWindow(QtWidgets.QMainWindow):
+    sig_bench_done = QtCore.Signal(object, object)  # (w, h, fps), EncoderProfile ili None
+    sig_job = QtCore.Signal(object)  # Job (stanje/progres iz worker treda)
+    sig_audio_devices = QtCore.Signal(object)  # List[AudioDevice] posle enumeracije
+    sig_control = QtCore.Signal(str, object)  # (komanda, JSON) iz kontrolnog API-ja -> GUI tred
+
     def __init__(self, app):
         super().__init__()
         self.app = app
-        self.controller = FfmpegController()
-        self.controller.sig_log.connect(self._log)
+        # Post-processing red je zajednicki za sve kontrolere
+        self.jobs = JobQueue()
+        self.controller = FfmpegController(jobs=self.jobs)
+        self.controller.sig_log_batch.connect(self._log_batch)
         self.controller.sig_status.connect(self._status)
         self.controller.sig_process_ended.connect(self._on_end)
+        self.controller.sig_state.connect(self._on_state)
+        self.controller.sig_failed.connect(self._on_failed)
+        self.controller.sig_stream.connect(self._on_stream)
+
+        # Instant replay ima svoj kontroler (svoj FFmpeg proces), log ide u isti panel
+        self.replay_ctrl = FfmpegController(jobs=self.jobs)
+        self.replay_ctrl.sig_log_batch.connect(self._log_batch)
+        self.replay_ctrl.sig_state.connect(self._on_replay_state)
+        self.replay = None
+        self.controller.sig_stats.connect(self._on_stats)
+        self.controller.sig_shots_saved.connect(self._on_shots)
+
+        # Multi-monitor sesija (svi monitori odjednom), deli log i dugmad
+        self.session_ctrl = SessionController(jobs=self.jobs)
+        self.session_ctrl.sig_log_batch.connect(self._log_batch)
+        self.session_ctrl.sig_status.connect(self._status)
+        self.session_ctrl.sig_state.connect(self._on_session_state)
+        self.session_ctrl.sig_usage.connect(self._on_usage)
+        self.session_ctrl.sig_finished.connect(lambda m: self._refresh_spans())
+        self.sig_bench_done.connect(self._on_bench_done)
+        self.jobs.on_log.connect(self.controller.logs.push)
+        self.jobs.on_job.connect(self.sig_job.emit)
+        self.sig_job.connect(self._on_job)
+        # Audio uredjaji: odmah iz kesa, enumeracija u pozadini
+        self.audio_devices = device_cache()
+        self.audio_devices.on_changed.connect(self.sig_audio_devices.emit)
+        self.sig_audio_devices.connect(lambda devs: self._fill_mics())
         
         self.monitors = []
+        self.cfg = {}
         self.current_theme = CRIMSON
         self.hotkeys = GlobalHotkeys()
-        self.hk_filter = GlobalHotkeyFilter(self._hk_home, self._hk_end)
+        self.hk_filter = GlobalHotkeyFilter(self._hk_home, self._hk_end, self._hk_replay, self._shoot)
         self.app.installNativeEventFilter(self.hk_filter)
 
         self.tray = None  # da ne puca u closeEvent ako tray ne postoji
+        self.library = None  # LibraryIndex, otvara se na prvi klik
+        self.control = None  # ControlServer (ControlAPI u config-u)
+        self.sig_control.connect(self._on_control)
         
         self._init_ui()
         self._load_cfg()
         self._refresh_monitors()
-        self.hotkeys.register()
+        self._refresh_areas()
+        self.hotkeys.register(screenshot=bool(self.cfg.get("ScreenshotHotkey", False)))
+        self.jobs.start()
+        self._start_control()
 
         # Log startup
         self._log("GUI inicijalizovan.")
-        self._log("Global hotkeys: HOME=pause/resume, END=stop.")
+        self._log(
+            "Global hotkeys: HOME=pause/resume, END=stop, INSERT=save replay (dok replay radi)"
+            + (", PAGE UP=screenshot." if self.hotkeys.shot_registered else ".")
+        )
 
     def _init_ui(self):
         self.setWindowTitle(f"{APP_TITLE} - {APP_VERSION}")
@@ -97,12 +165,20 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ed_out = QtWidgets.QLineEdit()
         self.btn_browse = QtWidgets.QPushButton("Browse...")
         self.btn_browse.clicked.connect(self._browse)
+        self.btn_library = QtWidgets.QPushButton("Biblioteka...")
+        self.btn_library.clicked.connect(self._open_library)
         
         self.sb_fps = QtWidgets.QSpinBox()
         self.sb_fps.setRange(1, 240)
         self.sb_fps.setValue(30)
         self.sb_fps.setFixedWidth(110)
         self.sb_fps.setFixedHeight(30)
+
+        # Capture backend (grabber) - pamti se po monitoru
+        self.cb_backend = QtWidgets.QComboBox()
+        for b in available_backends():
+            self.cb_backend.addItem(b.label, b.name)
+        self.cb_backend.currentIndexChanged.connect(self._backend_change)
         
         self.chk_delay = QtWidgets.QCheckBox("Delay start (2s)")
         self.chk_delay.setChecked(True)
@@ -112,6 +188,60 @@ class MainWindow(QtWidgets.QMainWindow):
         # NOVO: checkbox za sistemski zvuk (Stereo Mix)
         self.chk_sys_audio = QtWidgets.QCheckBox("Snimaj sistemski zvuk (Stereo Mix)")
         self.chk_sys_audio.setChecked(False)
+        # Mikrofon kao dodatni audio trag (lista iz kesa uredjaja)
+        self.cb_mic = QtWidgets.QComboBox()
+        self.btn_mics = QtWidgets.QPushButton("↻")
+        self.btn_mics.setFixedWidth(30)
+        self.btn_mics.clicked.connect(lambda: self.audio_devices.refresh_async(force=True))
+
+        # Izlaz: klasican MP4 ili crash-safe (fragmentisan / segmenti)
+        self.cb_output = QtWidgets.QComboBox()
+        for key, label in OUTPUT_MODES.items():
+            self.cb_output.addItem(label, key)
+        self.chk_faststart = QtWidgets.QCheckBox("Faststart remux posle stopa")
+        self.chk_faststart.setChecked(False)
+
+        # Adaptivni kvalitet: preset/fps/skala se spustaju kad enkoder kasni
+        self.chk_adaptive = QtWidgets.QCheckBox("Adaptivni kvalitet")
+        self.chk_adaptive.setChecked(False)
+        # Two-stage: lossless u scratch tokom snimanja, finalni enkod kao posao
+        self.chk_two_stage = QtWidgets.QCheckBox("Lossless snimanje + transcode posle")
+        self.chk_two_stage.setChecked(False)
+        self.chk_dedup = QtWidgets.QCheckBox("VFR (preskoči statične frejmove)")
+        self.chk_dedup.setChecked(False)
+        # Stream: isti enkod ide i na StreamTargets iz config-a (tee)
+        self.chk_stream = QtWidgets.QCheckBox("Stream (StreamTargets)")
+        self.chk_stream.setChecked(False)
+        self.chk_multi = QtWidgets.QCheckBox("Svi monitori (multi)")
+        self.chk_multi.setChecked(False)
+
+        # Oblast: ceo monitor, sacuvan region ili prozor (crop u grabberu)
+        self.cb_area = QtWidgets.QComboBox()
+        self.btn_region = QtWidgets.QPushButton("Označi...")
+        self.btn_region.clicked.connect(self._select_region)
+        self.btn_region_xy = QtWidgets.QPushButton("x,y,w,h...")
+        self.btn_region_xy.clicked.connect(self._enter_region)
+        self.btn_region_del = QtWidgets.QPushButton("Obriši")
+        self.btn_region_del.clicked.connect(self._delete_region)
+        self.btn_areas = QtWidgets.QPushButton("↻")
+        self.btn_areas.setFixedWidth(30)
+        self.btn_areas.clicked.connect(self._refresh_areas)
+        self.windows = []
+        self._region_selector = None
+
+        # Armed: standby grabber vec radi, START samo preusmerava frejmove
+        self.chk_armed = QtWidgets.QCheckBox("Armed (standby grabber)")
+        self.chk_armed.setChecked(False)
+        self._arm_timer = QtCore.QTimer(self)
+        self._arm_timer.setSingleShot(True)
+        self._arm_timer.setInterval(300)
+        self._arm_timer.timeout.connect(self._rearm)
+        for sig in (
+            self.chk_armed.toggled, self.cb_mon.currentIndexChanged, self.cb_res.currentIndexChanged,
+            self.cb_backend.currentIndexChanged, self.sb_fps.valueChanged,
+            self.ed_w.editingFinished, self.ed_h.editingFinished, self.cb_area.currentIndexChanged,
+        ):
+            sig.connect(self._arm_timer.start)
         
         gl.addWidget(QtWidgets.QLabel("Monitor:"), 0, 0)
         gl.addWidget(self.cb_mon, 1, 0)
@@ -119,6 +249,7 @@ class MainWindow(QtWidgets.QMainWindow):
         row_out = QtWidgets.QHBoxLayout()
         row_out.addWidget(self.ed_out, 1)
         row_out.addWidget(self.btn_browse)
+        row_out.addWidget(self.btn_library)
         gl.addLayout(row_out, 1, 1)
         
         gl.addWidget(QtWidgets.QLabel("Rezolucija:"), 2, 0)
@@ -132,10 +263,34 @@ class MainWindow(QtWidgets.QMainWindow):
         row_wh.addWidget(QtWidgets.QLabel("H:"))
         row_wh.addWidget(self.ed_h)
         gl.addLayout(row_wh, 4, 0)
+        gl.addWidget(QtWidgets.QLabel("Grabber:"), 5, 0)
+        gl.addWidget(self.cb_backend, 6, 0)
         
         gl.addWidget(self.chk_delay, 4, 1)
         gl.addWidget(self.chk_tray, 5, 1)
         gl.addWidget(self.chk_sys_audio, 6, 1)  # audio checkbox
+        gl.addWidget(self.chk_armed, 7, 1)
+        gl.addWidget(QtWidgets.QLabel("Izlaz:"), 7, 0)
+        gl.addWidget(self.cb_output, 8, 0)
+        gl.addWidget(self.chk_faststart, 8, 1)
+        gl.addWidget(self.chk_multi, 9, 0)
+        gl.addWidget(self.chk_adaptive, 9, 1)
+        row_area = QtWidgets.QHBoxLayout()
+        row_area.addWidget(QtWidgets.QLabel("Oblast:"))
+        row_area.addWidget(self.cb_area, 1)
+        row_area.addWidget(self.btn_region)
+        row_area.addWidget(self.btn_region_xy)
+        row_area.addWidget(self.btn_region_del)
+        row_area.addWidget(self.btn_areas)
+        gl.addLayout(row_area, 10, 0, 1, 2)
+        row_mic = QtWidgets.QHBoxLayout()
+        row_mic.addWidget(QtWidgets.QLabel("Mikrofon:"))
+        row_mic.addWidget(self.cb_mic, 1)
+        row_mic.addWidget(self.btn_mics)
+        gl.addLayout(row_mic, 11, 0, 1, 2)
+        gl.addWidget(self.chk_two_stage, 12, 0)
+        gl.addWidget(self.chk_dedup, 12, 1)
+        gl.addWidget(self.chk_stream, 13, 0)
         
         # Info text
         inf = QtWidgets.QLabel(
@@ -143,7 +298,7 @@ class MainWindow(QtWidgets.QMainWindow):
             "SpinBox arrows are manually drawn."
         )
         inf.setWordWrap(True)
-        gl.addWidget(inf, 0, 2, 7, 1)
+        gl.addWidget(inf, 0, 2, 11, 1)
         
         layout.addWidget(gb_set)
         
@@ -157,6 +312,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cb_preset.currentIndexChanged.connect(self._preset_change)
         row_preset.addWidget(QtWidgets.QLabel("Preset:"))
         row_preset.addWidget(self.cb_preset, 1)
+        # Auto-benchmark: meri enkodere za trenutnu geometriju/fps i pamti profil
+        self.btn_bench = QtWidgets.QPushButton("Benchmark enkodera")
+        self.btn_bench.clicked.connect(self._bench)
+        row_preset.addWidget(self.btn_bench)
         
         row_btn = QtWidgets.QHBoxLayout()
         row_btn.setSpacing(12)
@@ -165,16 +324,55 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_start.setFixedWidth(190)
         self.btn_stop = QtWidgets.QPushButton("STOP")
         self.btn_stop.setEnabled(False)
-        self.btn_stop.clicked.connect(self.controller.stop_recording)
+        self.btn_stop.clicked.connect(self._stop)
         self.btn_stop.setFixedWidth(190)
         
+        self.btn_replay = QtWidgets.QPushButton("REPLAY Buffer")
+        self.btn_replay.setCheckable(True)
+        self.btn_replay.setFixedWidth(150)
+        self.btn_replay.toggled.connect(self._replay_toggle)
+        self.sb_replay = QtWidgets.QSpinBox()
+        self.sb_replay.setRange(5, 1800)
+        self.sb_replay.setValue(REPLAY_DEFAULT_SEC)
+        self.sb_replay.setSuffix(" s")
+        self.sb_replay.setFixedWidth(110)
+        self.sb_replay.setFixedHeight(30)
+
         row_btn.addStretch(1)
         row_btn.addWidget(self.btn_start)
         row_btn.addWidget(self.btn_stop)
+        row_btn.addSpacing(20)
+        row_btn.addWidget(self.btn_replay)
+        row_btn.addWidget(self.sb_replay)
         row_btn.addStretch(1)
-        
+
+        # Screenshot / burst (N frejmova na X Hz)
+        row_shot = QtWidgets.QHBoxLayout()
+        self.btn_shot = QtWidgets.QPushButton("SCREENSHOT")
+        self.btn_shot.setFixedWidth(150)
+        self.btn_shot.clicked.connect(lambda: self._screenshot({}))
+        self.sb_burst = QtWidgets.QSpinBox()
+        self.sb_burst.setRange(1, 500)
+        self.sb_burst.setSuffix(" x")
+        self.sb_burst.setToolTip("Broj frejmova (1 = jedan screenshot)")
+        self.sb_hz = QtWidgets.QDoubleSpinBox()
+        self.sb_hz.setRange(0.1, 60.0)
+        self.sb_hz.setDecimals(1)
+        self.sb_hz.setValue(SHOT_BURST_HZ)
+        self.sb_hz.setSuffix(" Hz")
+        self.cb_shot_fmt = QtWidgets.QComboBox()
+        for key, label in SHOT_FORMATS.items():
+            self.cb_shot_fmt.addItem(label, key)
+        row_shot.addStretch(1)
+        row_shot.addWidget(self.btn_shot)
+        row_shot.addWidget(self.sb_burst)
+        row_shot.addWidget(self.sb_hz)
+        row_shot.addWidget(self.cb_shot_fmt)
+        row_shot.addStretch(1)
+
         vl.addLayout(row_preset)
         vl.addLayout(row_btn)
+        vl.addLayout(row_shot)
         layout.addWidget(gb_ctrl)
         
         # Log
@@ -184,8 +382,24 @@ class MainWindow(QtWidgets.QMainWindow):
         self.txt_log.setReadOnly(True)
         self.status = QtWidgets.QLabel("Spremno.")
         self.status.setObjectName("StatusLabel")
+        self.lbl_stats = QtWidgets.QLabel("Enkoder: -")
+        self.lbl_stats.setObjectName("StatsLabel")
+        self.lbl_spans = QtWidgets.QLabel("Latencije (p50/p95): -")
+        self.lbl_spans.setObjectName("StatsLabel")
+        self.lbl_spans.setVisible(False)
+        row_jobs = QtWidgets.QHBoxLayout()
+        self.lbl_jobs = QtWidgets.QLabel("Poslovi: -")
+        self.lbl_jobs.setObjectName("StatsLabel")
+        self.btn_jobs_cancel = QtWidgets.QPushButton("Otkaži poslove")
+        self.btn_jobs_cancel.setEnabled(False)
+        self.btn_jobs_cancel.clicked.connect(self.jobs.cancel_all)
+        row_jobs.addWidget(self.lbl_jobs, 1)
+        row_jobs.addWidget(self.btn_jobs_cancel)
         l_log.addWidget(self.txt_log)
         l_log.addWidget(self.status)
+        l_log.addWidget(self.lbl_stats)
+        l_log.addWidget(self.lbl_spans)
+        l_log.addLayout(row_jobs)
         layout.addWidget(gb_log)
         
         # Tray
@@ -225,7 +439,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.tray.show()
 
     def _log(self, t):
-        self.txt_log.appendPlainText(f"[{datetime.now().strftime('%H:%M:%S')}] {t}")
+        self.controller.logs.push(t)
+
+    def _log_batch(self, lines):
+        self.txt_log.appendPlainText("\n".join(lines))
 
     def _status(self, t, c):
         self.status.setText(t)
@@ -245,6 +462,11 @@ class MainWindow(QtWidgets.QMainWindow):
             "border: 1px solid rgba(0,0,0,0.55);"
         )
 
+    def _on_stats(self, stats):
+        self.lbl_stats.setText(f"Enkoder: {stats.summary()}")
+        col = self.current_theme.recording if stats.behind else self.current_theme.text_secondary
+        self.lbl_stats.setStyleSheet(f"QLabel#StatsLabel{{ color: {col}; }}")
+
     def _apply_styles(self, theme):
         self.setStyleSheet(build_qss(theme))
         self.current_theme = theme
@@ -257,6 +479,39 @@ class MainWindow(QtWidgets.QMainWindow):
         if d:
             self.ed_out.setText(d)
             self._save_cfg()
+            self._probe_disk()
+
+    # Brzina upisa output (i staging) diska se meri unapred, u pozadini, da
+    # start ne bi cekao; rezultat je u kesu po volumenu
+    def _probe_disk(self):
+        cache = throughput_cache()
+        folders = [Path(self.ed_out.text()) / VIDEO_SUBDIR]
+        staging = StorageConfig.from_cfg(self.cfg.get("Storage")).staging_dir
+        if staging:
+            folders.append(Path(staging) / VIDEO_SUBDIR)
+            ensure_dir(folders[-1])  # staging je zadat rucno u config-u
+        for folder in folders:
+            if folder.is_dir() and cache.get(str(folder)) is None:
+                cache.measure_async(str(folder), lambda mbps, f=folder: self._on_disk_measured(f, mbps))
+
+    # Diskovi koje je plan() zatekao neizmerene - tek kad nista ne snima
+    def _measure_deferred_disks(self):
+        if self.controller.rec.is_busy or self.session_ctrl.is_busy:
+            return
+        cache = throughput_cache()
+        for folder in cache.take_pending():
+            cache.measure_async(folder, lambda mbps, f=folder: self._on_disk_measured(f, mbps))
+
+    def _on_disk_measured(self, folder, mbps):
+        if mbps:
+            self.controller.logs.push(f"Disk: {folder} {mbps:.0f} MB/s")
+
+    def _open_library(self):
+        if self.library is None:
+            thumbs = Path(self.cfg.get("ScratchDir", DEFAULT_SCRATCH_ROOT)) / THUMB_SUBDIR
+            self.library = LibraryIndex(thumb_dir=thumbs)
+            self.library.on_log.connect(self.controller.logs.push)
+        LibraryDialog(self.library, self.ed_out.text().strip() or DEFAULT_OUTPUT_ROOT, self).exec()
 
     def _refresh_monitors(self):
         self.monitors = win32_list_monitors_with_dpi()
@@ -270,6 +525,33 @@ class MainWindow(QtWidgets.QMainWindow):
             idx = suggest_preset_for_monitor(m.w, m.h)
             if idx < self.cb_preset.count():
                 self.cb_preset.setCurrentIndex(idx)
+            name = self.cfg.get("CaptureBackends", {}).get(m.device, default_backend())
+            i = self.cb_backend.findData(name)
+            self.cb_backend.blockSignals(True)
+            self.cb_backend.setCurrentIndex(i if i >= 0 else 0)
+            self.cb_backend.blockSignals(False)
+            self._check_backend_speed()
+            self._refresh_areas()
+
+    def _backend_change(self):
+        if self.cb_mon.currentIndex() < 0 or self.cb_backend.currentIndex() < 0:
+            return
+        m = self.monitors[self.cb_mon.currentIndex()]
+        self.cfg.setdefault("CaptureBackends", {})[m.device] = self.cb_backend.currentData()
+        self._save_cfg()
+        self._check_backend_speed()
+
+    def _check_backend_speed(self):
+        if self.cb_mon.currentIndex() < 0 or self.cb_backend.currentIndex() < 0:
+            return
+        m = self.monitors[self.cb_mon.currentIndex()]
+        b = get_backend(self.cb_backend.currentData())
+        fps = self.sb_fps.value()
+        if b.max_fps(m.w, m.h) < fps:
+            self._log(
+                f"{b.name}: procena ~{b.max_fps(m.w, m.h):.0f} fps na {m.w}x{m.h} (cilj {fps}). "
+                f"Predlog: {suggest_backend(m.w, m.h, fps)}"
+            )
 
     def _preset_change(self):
         p = PRESETS[self.cb_preset.currentIndex()]
@@ -280,41 +562,513 @@ class MainWindow(QtWidgets.QMainWindow):
             self.ed_w.setText(str(p.width))
             self.ed_h.setText(str(p.height))
 
+    def _active(self):
+        return self.session_ctrl if self.session_ctrl.is_busy else self.controller
+
+    def _stop(self):
+        self._active().stop_recording()
+
     def _start(self):
-        if self.cb_mon.currentIndex() < 0:
+        if self.chk_multi.isChecked() and len(self.monitors) > 1:
+            self._start_multi()
             return
-        mon = self.monitors[self.cb_mon.currentIndex()]
+        self._start_single(2000 if self.chk_delay.isChecked() else 150)
+
+    # mon/area/backend i preset mogu doci spolja (kontrolni API) - tada se
+    # widget-i ne diraju; None = izbor iz GUI-ja
+    def _start_single(self, ms, mon=None, area=None, backend=None, preset=None):
+        if mon is None:
+            if self.cb_mon.currentIndex() < 0:
+                return
+            mon = self.monitors[self.cb_mon.currentIndex()]
+            area = self._current_area(mon)
+            backend = self.cb_backend.currentData()
         root = self.ed_out.text()
         
-        mode = "Custom" if self.cb_res.currentIndex() == 1 else "Native"
-        cwh = (int(self.ed_w.text()), int(self.ed_h.text())) if mode == "Custom" else None
+        if preset is None:
+            fps, crf = self.sb_fps.value(), self.controller.current_crf
+            mode = "Custom" if self.cb_res.currentIndex() == 1 else "Native"
+            cwh = (int(self.ed_w.text()), int(self.ed_h.text())) if mode == "Custom" else None
+        else:
+            fps, crf, mode = preset.fps, preset.crf, preset.mode
+            cwh = (preset.width, preset.height) if mode == "Custom" else None
 
-        record_sys_audio = self.chk_sys_audio.isChecked()
+        audio_kw = self._audio_kw()
+        out_kw = self._output_kw(preset)
+        out_kw.update(self._encoder_kw(cwh or self._area_size(mon, area), fps))
+        if self.chk_adaptive.isChecked():
+            out_kw["adaptive"] = AdaptiveConfig.from_cfg(self.cfg.get("Adaptive"))
+        if self.chk_two_stage.isChecked():
+            out_kw["two_stage"] = TwoStageConfig.from_cfg(self.cfg.get("TwoStage"))
+            out_kw["scratch"] = self.cfg.get("ScratchDir", DEFAULT_SCRATCH_ROOT)
+        out_kw["storage"] = StorageConfig.from_cfg(self.cfg.get("Storage"))
         
         if self.chk_tray.isChecked():
             self.hide()
         
         def run():
-            if self.controller.start_recording(
-                mon, mode, cwh, root, self.sb_fps.value(), self.controller.current_crf,
-                record_audio=record_sys_audio
+            if not self.controller.start_recording(
+                mon, mode, cwh, root, fps, crf,
+                backend=backend, area=area, **audio_kw, **out_kw
             ):
-                self.btn_stop.setEnabled(True)
-            else:
                 self.show()
         
-        ms = 2000 if self.chk_delay.isChecked() else 150
         QtCore.QTimer.singleShot(ms, run)
         
+    # Sistemski zvuk + mikrofon, svaki kao svoj trag. AudioMode "separate" =
+    # zaseban FFmpeg proces po uredjaju, mux sa videom posle stopa.
+    def _audio_kw(self):
+        devices = []
+        if self.chk_sys_audio.isChecked():
+            devices.append(self.cfg.get("AudioSystemDevice") or self.audio_devices.loopback() or AUDIO_DEFAULT_DEVICE)
+        if self.cb_mic.currentData():
+            devices.append(self.cb_mic.currentData())
+        return {
+            "record_audio": bool(devices), "audio_devices": tuple(devices),
+            "audio_mode": self.cfg.get("AudioMode", "inline"),
+        }
+
+    def _fill_mics(self):
+        current = self.cb_mic.currentData() or self.cfg.get("AudioMic", "")
+        self.cb_mic.blockSignals(True)
+        self.cb_mic.clear()
+        self.cb_mic.addItem("(bez mikrofona)", "")
+        for d in self.audio_devices.devices() or []:
+            if not d.loopback:
+                self.cb_mic.addItem(d.text, d.name)
+        if current and self.cb_mic.findData(current) < 0:
+            self.cb_mic.addItem(f"{current} (nije pronađen)", current)
+        self.cb_mic.setCurrentIndex(max(0, self.cb_mic.findData(current)))
+        self.cb_mic.blockSignals(False)
+
+    def _output_kw(self, preset=None):
+        return {
+            "output_mode": self.cb_output.currentData(),
+            "faststart": self.chk_faststart.isChecked(),
+            "frag_sec": float(self.cfg.get("FragmentSeconds", 2.0)),
+            "frag_size_mb": int(self.cfg.get("FragmentSizeMB", 0)),
+            "segment_sec": int(self.cfg.get("SegmentSeconds", 300)),
+            "tap_fps": self._tap_fps(),
+            "dedup": self.chk_dedup.isChecked(),
+            "dedup_threshold": int(self.cfg.get("DedupThreshold", DEDUP_THRESHOLD)),
+            "dedup_max_sec": float(self.cfg.get("DedupMaxSeconds", DEDUP_MAX_SEC)),
+            "streams": self._stream_targets() if self.chk_stream.isChecked() else (),
+            # Dodatne verzije (npr. proxy) iz istog capture-a dolaze sa preseta
+            "renditions": (preset or PRESETS[max(0, self.cb_preset.currentIndex())]).renditions,
+        }
+
+    def _stream_targets(self):
+        try:
+            targets = parse_targets(self.cfg.get("StreamTargets"))
+        except (ValueError, TypeError) as e:
+            self._log(f"StreamTargets: {e}")
+            return ()
+        if not targets:
+            self._log("Stream je uključen, ali StreamTargets u config-u je prazan.")
+        return targets
+
+    # Tap izlaz za screenshot-ove tokom snimanja (0 = iskljucen). Podrazumevano
+    # iskljucen: drugi rgb24 izlaz pune rezolucije (~30 MB/s na 1080p, ~124 MB/s
+    # na 4K kroz pipe + konverzija boja u enkoderu) stalno, a screenshot tokom
+    # snimanja i bez njega radi preko kratkog zasebnog grabbera
+    def _tap_fps(self):
+        if not self.cfg.get("ScreenshotTap", False):
+            return 0.0
+        return float(self.cfg.get("ScreenshotTapFps", SHOT_TAP_FPS))
+
+    # --- Oblast snimanja
+    def _refresh_areas(self):
+        cur = self.cb_area.currentData()
+        idx = self.cb_mon.currentIndex()
+        device = self.monitors[idx].device if idx >= 0 else None
+        self.windows = win32_list_windows()
+        self.cb_area.blockSignals(True)
+        self.cb_area.clear()
+        self.cb_area.addItem("Ceo monitor", None)
+        for name, (dev, r) in region_presets(self.cfg).items():
+            if dev in (None, device):
+                self.cb_area.addItem(f"Region: {name} ({r.label()})", f"region:{name}")
+        for w in self.windows:
+            self.cb_area.addItem(f"Prozor: {w.text}", f"window:{w.hwnd}")
+        i = self.cb_area.findData(cur)
+        self.cb_area.setCurrentIndex(max(0, i))
+        self.cb_area.blockSignals(False)
+
+    def _current_area(self, mon):
+        data = self.cb_area.currentData()
+        if not data:
+            return None
+        kind, _, key = data.partition(":")
+        if kind == "region":
+            preset = region_presets(self.cfg).get(key)
+            return preset[1] if preset else None
+        # Prozor: sveza pozicija i velicina u trenutku starta
+        for w in win32_list_windows():
+            if str(w.hwnd) == key:
+                return w
+        self._log("Izabrani prozor više ne postoji - snimam ceo monitor.")
+        return None
+
+    def _area_size(self, mon, area):
+        if isinstance(area, Region):
+            r = clamp_region(area, mon.w, mon.h)
+            return r.w, r.h
+        if area is not None:
+            return area.w // 2 * 2, area.h // 2 * 2
+        return mon.w, mon.h
+
+    def _select_region(self):
+        idx = self.cb_mon.currentIndex()
+        if idx < 0:
+            return
+        mon = self.monitors[idx]
+        sel = RegionSelector(screen_for_monitor(mon))
+        sel.sig_selected.connect(lambda r: self._save_region(mon, r))
+        sel.show()
+        sel.activateWindow()
+        self._region_selector = sel
+
+    def _enter_region(self):
+        idx = self.cb_mon.currentIndex()
+        if idx < 0:
+            return
+        mon = self.monitors[idx]
+        text, ok = QtWidgets.QInputDialog.getText(
+            self, "Region", f"x,y,w,h u pikselima monitora ({mon.w}x{mon.h}):", text="0,0,1280,720"
+        )
+        if not ok:
+            return
+        try:
+            self._save_region(mon, Region.parse(text))
+        except ValueError as e:
+            self._log(str(e))
+
+    def _save_region(self, mon, region):
+        self._region_selector = None
+        if region is None:
+            return
+        region = clamp_region(region, mon.w, mon.h)
+        name, ok = QtWidgets.QInputDialog.getText(self, "Region preset", "Ime:", text=f"{region.w}x{region.h}")
+        if not ok or not name.strip():
+            return
+        store_region_preset(self.cfg, name.strip(), mon.device, region)
+        self._save_cfg()
+        self._refresh_areas()
+        self.cb_area.setCurrentIndex(max(0, self.cb_area.findData(f"region:{name.strip()}")))
+        self._log(f"Region '{name.strip()}' sačuvan: {region.label()} na monitoru {mon.index}")
+
+    def _delete_region(self):
+        data = self.cb_area.currentData()
+        if not data or not data.startswith("region:"):
+            return
+        delete_region_preset(self.cfg, data.partition(":")[2])
+        self._save_cfg()
+        self._refresh_areas()
+
+    def _start_multi(self):
+        # Svaki monitor u nativnoj rezoluciji, sa svojim grabberom i profilom enkodera
+        fps = self.sb_fps.value()
+        sources = []
+        for m in self.monitors:
+            kw = {"backend": self.cfg.get("CaptureBackends", {}).get(m.device, default_backend())}
+            kw.update(self._encoder_kw((m.w, m.h), fps))
+            sources.append((m, kw))
+        # Audio samo uz prvi izvor (isti uredjaji ne mogu dva puta)
+        sources[0][1].update(self._audio_kw())
+        out_kw = self._output_kw()
+        # Stream takodje samo iz prvog izvora (jedan cilj = jedan enkod)
+        sources[0][1]["streams"] = out_kw.pop("streams")
+        root = self.ed_out.text()
+        mode = self.cfg.get("MultiMode", "process")
+        cap = self.cfg.get("MaxEncoders")
+        self.controller.disarm()
+
+        if self.chk_tray.isChecked():
+            self.hide()
+
+        def run():
+            if not self.session_ctrl.start_session(
+                sources, root, fps, self.controller.current_crf, mode=mode,
+                max_encoders=int(cap) if cap else None, **out_kw
+            ):
+                self.show()
+
+        ms = 2000 if self.chk_delay.isChecked() else 150
+        QtCore.QTimer.singleShot(ms, run)
+
+    def _on_session_state(self, state):
+        self._on_state(state)
+        if state in (RecState.IDLE, RecState.FAILED):
+            self._on_end(0)
+
+    def _on_usage(self, usage):
+        self.lbl_stats.setText(" | ".join(u.summary() for u in usage))
+        col = self.current_theme.text_secondary
+        self.lbl_stats.setStyleSheet(f"QLabel#StatsLabel{{ color: {col}; }}")
+
+    # Preset -> izmeren profil enkodera za (WxH, fps), ako postoji
+    def _encoder_kw(self, wh, fps):
+        prof = get_profile(self.cfg, wh[0], wh[1], fps)
+        if prof is None:
+            return {}
+        self._log(f"Enkoder profil {profile_key(wh[0], wh[1], fps)}: {prof.label()}")
+        return prof.spec_kwargs()
+
+    def _bench(self):
+        if self.cb_mon.currentIndex() < 0:
+            return
+        mon = self.monitors[self.cb_mon.currentIndex()]
+        try:
+            w, h = (int(self.ed_w.text()), int(self.ed_h.text())) if self.cb_res.currentIndex() == 1 else self._area_size(mon, self._current_area(mon))
+        except ValueError:
+            return
+        fps = self.sb_fps.value()
+        self.btn_bench.setEnabled(False)
+        self._log(f"Benchmark enkodera za {profile_key(w, h, fps)}...")
+        log = self.controller.logs.push
+
+        def run():
+            prof = benchmark(w, h, fps, self.controller.rec.ffmpeg_path, log=log)
+            self.sig_bench_done.emit((w, h, fps), prof)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_bench_done(self, geo, prof):
+        self.btn_bench.setEnabled(True)
+        key = profile_key(*geo)
+        if prof is None:
+            self._log(f"Benchmark {key}: nijedan enkoder nije uspeo.")
+            return
+        store_profile(self.cfg, *geo, prof)
+        self._save_cfg()
+        if not prof.sustains:
+            self._log(f"Benchmark {key}: nijedan enkoder ne drzi realno vreme, najbrzi: {prof.label()}")
+        else:
+            self._log(f"Benchmark {key}: izabran {prof.label()}")
+
+    def _on_job(self, job):
+        pending = self.jobs.pending()
+        running = [j for j in pending if j.state == JobState.RUNNING]
+        self.btn_jobs_cancel.setEnabled(bool(pending))
+        if not pending:
+            self.lbl_jobs.setText("Poslovi: nema aktivnih")
+            return
+        txt = f"Poslovi: {len(pending) - len(running)} u redu, {len(running)} radi"
+        if running:
+            txt += " | " + ", ".join(f"{j.label()} {j.progress:.0%}" for j in running)
+        self.lbl_jobs.setText(txt)
+
     def _on_end(self, code):
-        self.btn_stop.setEnabled(False)
+        self.show()
+        self._arm_timer.start()
+        self._refresh_spans()
+
+    def _refresh_spans(self):
+        if not SPANS.enabled:
+            return
+        parts = [s.label() for s in SPANS.summary()]
+        self.lbl_spans.setText("Latencije (p50/p95): " + (" | ".join(parts) if parts else "-"))
+
+    def _rearm(self):
+        # Svaka promena podesavanja gasi stari standby; novi se dize samo ako je armed ukljucen
+        if self.controller.is_busy or self.session_ctrl.is_busy:
+            return
+        idx = self.cb_mon.currentIndex()
+        if not self.chk_armed.isChecked() or idx < 0:
+            self.controller.disarm()
+            return
+        mon = self.monitors[idx]
+        for i in list(self.controller.standbys):
+            if i != mon.index:
+                self.controller.disarm(i)
+        mode = "Custom" if self.cb_res.currentIndex() == 1 else "Native"
+        try:
+            cwh = (int(self.ed_w.text()), int(self.ed_h.text())) if mode == "Custom" else None
+        except ValueError:
+            return
+        if not self.controller.arm(mon, mode, cwh, self.sb_fps.value(), self.cb_backend.currentData(), self._current_area(mon)):
+            self._log("Armed: standby grabber nije pokrenut.")
+
+    def _on_state(self, state):
+        self.btn_start.setEnabled(state in (RecState.IDLE, RecState.FAILED))
+        self.btn_stop.setEnabled(state in (RecState.STARTING, RecState.RECORDING))
+        if state in (RecState.IDLE, RecState.FAILED):
+            self._measure_deferred_disks()
+
+    def _on_stream(self, target, kind, msg):
+        self._status(msg, "#FFCC00" if kind == "retry" else "#FF8800")
+
+    def _on_failed(self, reason):
+        self._log(f"Start nije uspeo: {reason}")
         self.show()
 
     def _hk_home(self):
-        self.controller.pause_toggle()
+        SPANS.end("hotkey", "HOME")
+        self._active().pause_toggle()
 
     def _hk_end(self):
-        self.controller.stop_recording()
+        SPANS.end("hotkey", "END")
+        self._active().stop_recording()
+
+    def _hk_replay(self):
+        SPANS.end("hotkey", "INSERT")
+        if not self.replay or not self.replay.running:
+            self._log("Replay buffer nije aktivan.")
+            return
+        self.replay.save(self.ed_out.text())
+
+    def _shoot(self):
+        SPANS.end("hotkey", "PAGE UP")
+        self._screenshot({})
+
+    # Bez monitora/regiona u komandi (hotkey, dugme) = izbor u GUI-ju;
+    # count/hz/format iz komande imaju prednost nad widget-ima
+    def _screenshot(self, cmd):
+        target = self._control_target(cmd)
+        if not target:
+            idx = self.cb_mon.currentIndex()
+            if idx < 0:
+                return
+            mon = self.monitors[idx]
+            target = {"mon": mon, "area": self._current_area(mon), "backend": self.cb_backend.currentData()}
+        self.controller.screenshot(
+            target["mon"], cmd.get("output") or self.ed_out.text(), int(cmd.get("count") or self.sb_burst.value()),
+            float(cmd.get("hz") or self.sb_hz.value()), cmd.get("format") or self.cb_shot_fmt.currentData(),
+            int(self.cfg.get("ScreenshotPngLevel", SHOT_PNG_LEVEL)), target["backend"], target["area"],
+            sources=(self.session_ctrl, self.replay_ctrl),
+        )
+
+    # --- Kontrolni API: potvrda ide iz treda klijenta. stop/pause/marker/status
+    # idu pravo na Recorder, a start/screenshot (stanje widgeta) na GUI tred.
+    def _start_control(self):
+        if not self.cfg.get("ControlAPI", False):
+            return
+        handlers = {
+            "start": self._control_start,
+            "stop": lambda cmd: self._active().stop_recording(),
+            "pause": lambda cmd: self._active().pause_toggle(),
+            "marker": self._control_marker,
+            "screenshot": self._control_screenshot,
+            "status": self._control_status,
+        }
+        rec = self.controller.rec
+        self.control = ControlServer(
+            handlers, int(self.cfg.get("ControlPort", CONTROL_PORT)), str(self.cfg.get("ControlToken", "")),
+            log=rec.log,
+        )
+        if self.control.start():
+            self.control.attach(rec, self.controller.shots)
+        else:
+            self.control = None
+
+    def _control_queue(self, name, cmd):
+        self.sig_control.emit(name, cmd)
+        return {"queued": True}
+
+    # Provera parametara odmah (greska ide u odgovor), izbor i start na GUI tredu
+    def _control_start(self, cmd):
+        if self._active().is_busy:
+            raise ValueError("Snimanje je vec u toku.")
+        if cmd.get("preset") is not None and not 0 <= int(cmd["preset"]) < len(PRESETS):
+            raise ValueError(f"Preset {cmd['preset']} ne postoji (0..{len(PRESETS) - 1}).")
+        self._control_check_target(cmd)
+        return self._control_queue("start", cmd)
+
+    def _control_screenshot(self, cmd):
+        if cmd.get("format") and cmd["format"] not in SHOT_FORMATS:
+            raise ValueError(f"Format '{cmd['format']}' nije podrzan ({', '.join(SHOT_FORMATS)}).")
+        self._control_check_target(cmd)
+        return self._control_queue("screenshot", cmd)
+
+    def _control_check_target(self, cmd):
+        if cmd.get("monitor") is not None and not any(m.index == int(cmd["monitor"]) for m in self.monitors):
+            raise ValueError(f"Monitor {cmd['monitor']} ne postoji.")
+        if cmd.get("region") and cmd["region"] not in region_presets(self.cfg):
+            raise ValueError(f"Region preset '{cmd['region']}' ne postoji.")
+
+    def _control_marker(self, cmd):
+        pos = self.controller.rec.marker(cmd.get("label") or "")
+        if pos is None:
+            raise ValueError("Marker: snimanje nije u toku.")
+        return {"t": round(pos, 3), "index": len(self.controller.rec.markers)}
+
+    def _control_status(self, cmd):
+        s = self.controller.latest_stats
+        rec = self.controller.rec
+        return {
+            "state": rec.state, "paused": rec.is_paused, "session": self.session_ctrl.is_busy,
+            "outfile": rec.spec.outfile if rec.spec else None, "files": list(rec.parts),
+            "stats": s.to_dict() if s else None,
+        }
+
+    def _on_control(self, name, cmd):
+        if name == "start":
+            kw = self._control_target(cmd)
+            if cmd.get("preset") is not None:
+                kw["preset"] = PRESETS[int(cmd["preset"])]
+            self._start_single(0 if not cmd.get("delay") else 2000, **kw)
+        elif name == "screenshot":
+            self._screenshot(cmd)
+
+    # Monitor/oblast/backend iz komande; izbor u GUI-ju ostaje kakav jeste.
+    # Drugi monitor bez regiona = ceo monitor, backend iz config-a za taj uredjaj.
+    def _control_target(self, cmd):
+        if cmd.get("monitor") is None and not cmd.get("region"):
+            return {}
+        cur = self.monitors[self.cb_mon.currentIndex()] if self.cb_mon.currentIndex() >= 0 else None
+        mon = cur
+        if cmd.get("monitor") is not None:
+            mon = next((m for m in self.monitors if m.index == int(cmd["monitor"])), None)
+        if mon is None:
+            return {}
+        if cmd.get("region"):
+            area = region_presets(self.cfg)[cmd["region"]][1]
+        else:
+            area = self._current_area(mon) if mon is cur else None
+        if mon is cur:
+            backend = self.cb_backend.currentData()
+        else:
+            backend = self.cfg.get("CaptureBackends", {}).get(mon.device, default_backend())
+        return {"mon": mon, "area": area, "backend": backend}
+
+    def _on_shots(self, paths):
+        where = Path(paths[0]).parent
+        self._log(f"Screenshot: {Path(paths[0]).name} -> {where}" if len(paths) == 1 else f"Burst: {len(paths)} slika -> {where}")
+
+    def _replay_toggle(self, on):
+        if not on:
+            if self.replay:
+                self.replay.stop()
+            return
+        idx = self.cb_mon.currentIndex()
+        ok, msg = ensure_output_root(self.ed_out.text())
+        if idx < 0 or not ok:
+            self._log(msg if not ok else "Nema izabranog monitora.")
+            self.btn_replay.setChecked(False)
+            return
+        mon = self.monitors[idx]
+        mode = "Custom" if self.cb_res.currentIndex() == 1 else "Native"
+        cwh = (int(self.ed_w.text()), int(self.ed_h.text())) if mode == "Custom" else None
+        scratch = Path(self.cfg.get("ScratchDir", DEFAULT_SCRATCH_ROOT)) / REPLAY_SUBDIR / str(mon.index)
+        self.replay = ReplayBuffer(self.replay_ctrl.rec, str(scratch))
+        area = self._current_area(mon)
+        spec = RecordSpec.for_monitor(
+            mon, self.sb_fps.value(), self.controller.current_crf, "",
+            backend=self.cb_backend.currentData(), res_mode=mode, custom_wh=cwh,
+            replay_sec=self.sb_replay.value(), **self._audio_kw(),
+            tap_fps=self._tap_fps(),
+            **self._encoder_kw(cwh or self._area_size(mon, area), self.sb_fps.value()),
+        )
+        spec = apply_area(spec, mon, area)
+        if not self.replay.start(spec):
+            self.btn_replay.setChecked(False)
+
+    def _on_replay_state(self, state):
+        self.sb_replay.setEnabled(state in (RecState.IDLE, RecState.FAILED))
+        self.hotkeys.set_replay(state in (RecState.STARTING, RecState.RECORDING))
+        if state in (RecState.IDLE, RecState.FAILED) and self.btn_replay.isChecked():
+            self.btn_replay.blockSignals(True)
+            self.btn_replay.setChecked(False)
+            self.btn_replay.blockSignals(False)
     
     def _tray_toggle(self):
         if self.isVisible():
@@ -324,20 +1078,68 @@ class MainWindow(QtWidgets.QMainWindow):
             self.activateWindow()
 
     def _tray_stop(self):
-        self.controller.stop_recording()
+        self._active().stop_recording()
 
     def _load_cfg(self):
-        cfg = load_config()
-        self.ed_out.setText(cfg.get("OutputFolder", DEFAULT_OUTPUT_ROOT))
+        self.cfg = load_config()
+        self.ed_out.setText(self.cfg.get("OutputFolder", DEFAULT_OUTPUT_ROOT))
+        i = self.cb_output.findData(self.cfg.get("OutputMode", "mp4"))
+        self.cb_output.setCurrentIndex(max(0, i))
+        self.chk_faststart.setChecked(bool(self.cfg.get("Faststart", False)))
+        self.chk_adaptive.setChecked(bool(self.cfg.get("AdaptiveQuality", False)))
+        self.chk_two_stage.setChecked(bool(self.cfg.get("TwoStageCapture", False)))
+        self.chk_dedup.setChecked(bool(self.cfg.get("DedupVFR", False)))
+        self.chk_stream.setChecked(bool(self.cfg.get("Streaming", False)))
+        self.sb_replay.setValue(int(self.cfg.get("ReplaySeconds", REPLAY_DEFAULT_SEC)))
+        self.sb_burst.setValue(int(self.cfg.get("ScreenshotBurst", 1)))
+        self.sb_hz.setValue(float(self.cfg.get("ScreenshotHz", SHOT_BURST_HZ)))
+        self.cb_shot_fmt.setCurrentIndex(max(0, self.cb_shot_fmt.findData(self.cfg.get("ScreenshotFormat", "png"))))
+        self.txt_log.setMaximumBlockCount(int(self.cfg.get("LogLineCap", LOG_LINE_CAP)))
+        self._fill_mics()
+        self.audio_devices.refresh_async()
+        self._probe_disk()
+        # Post-processing posle svakog snimanja (faststart/thumbnail/proxy/checksum)
+        post = list(self.cfg.get("PostJobs", ["thumbnail"]))
+        self.controller.post_jobs = self.session_ctrl.post_jobs = post
+        if self.cfg.get("LatencySpans", False):
+            SPANS.enable(SPANS_FILE)
+            self.lbl_spans.setVisible(True)
+        if self.cfg.get("SessionLog", False):
+            self.controller.logs.attach_file(LOG_DIR / "session.log", SESSION_LOG_MAX_BYTES, SESSION_LOG_BACKUPS)
         
     def _save_cfg(self):
-        save_config({"OutputFolder": self.ed_out.text(), "Theme": self.current_theme.name})
+        self.cfg.update({
+            "OutputFolder": self.ed_out.text(),
+            "Theme": self.current_theme.name,
+            "OutputMode": self.cb_output.currentData(),
+            "Faststart": self.chk_faststart.isChecked(),
+            "AdaptiveQuality": self.chk_adaptive.isChecked(),
+            "TwoStageCapture": self.chk_two_stage.isChecked(),
+            "DedupVFR": self.chk_dedup.isChecked(),
+            "Streaming": self.chk_stream.isChecked(),
+            "ReplaySeconds": self.sb_replay.value(),
+            "ScreenshotBurst": self.sb_burst.value(),
+            "ScreenshotHz": self.sb_hz.value(),
+            "ScreenshotFormat": self.cb_shot_fmt.currentData(),
+            "AudioMic": self.cb_mic.currentData() or "",
+        })
+        save_config(self.cfg)
         
     def closeEvent(self, e):
         self.hotkeys.unregister()
-        if self.controller.is_recording:
-            self.controller.stop_recording()
+        if self.control:
+            self.control.stop()
         self._save_cfg()
+        if self.replay:
+            self.replay.close()
+        self.replay_ctrl.shutdown()
+        self.session_ctrl.shutdown()
+        self.controller.shutdown()
+        self.jobs.close()
+        SPANS.disable()
+        self.audio_devices.on_changed.disconnect(self.sig_audio_devices.emit)
+        if self.library:
+            self.library.close()
         if self.tray:
             self.tray.hide()
         super().closeEvent(e)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import ctypes
+import os
+import sys
+from typing import Optional
+
+# CPU vreme (user + kernel, u sekundama) child procesa dok radi.
+# Windows: GetProcessTimes nad handle-om iz Popen-a; Linux: /proc/<pid>/stat.
+
+def _win_cpu_seconds(proc) -> Optional[float]:
+    from ctypes import wintypes
+    handle = getattr(proc, "_handle", None)
+    if handle is None:
+        return None
+    c, e, k, u = (wintypes.FILETIME() for _ in range(4))
+    ok = ctypes.windll.kernel32.GetProcessTimes(
+        wintypes.HANDLE(int(handle)), ctypes.byref(c), ctypes.byref(e), ctypes.byref(k), ctypes.byref(u)
+    )
+    if not ok:
+        return None
+    ticks = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+    return (ticks(k) + ticks(u)) / 10_000_000.0
+
+def _proc_cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read().decode("ascii", "replace")
+    except OSError:
+        return None
+    # polje 2 (comm) moze da sadrzi razmake, zato se sece posle ")"
+    fields = data[data.rindex(")") + 2:].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / os.sysconf("SC_CLK_TCK")
+
+def cpu_seconds(proc) -> Optional[float]:
+    try:
+        if sys.platform == "win32":
+            return _win_cpu_seconds(proc)
+        if sys.platform.startswith("linux"):
+            return _proc_cpu_seconds(proc.pid)
+    except Exception:
+        return None
+    return None
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+# Prioritet vec pokrenutog child procesa (posao iz reda dok enkoder snima).
+# Windows: IDLE <-> BELOW_NORMAL klasa; POSIX: nice 19 (povratak na nizi
+# nice trazi privilegije, pa posao ostaje na 19 do kraja).
+def set_background(proc, background: bool) -> bool:
+    try:
+        if sys.platform == "win32":
+            handle = getattr(proc, "_handle", None)
+            if handle is None:
+                return False
+            # IDLE_PRIORITY_CLASS / BELOW_NORMAL_PRIORITY_CLASS
+            return bool(ctypes.windll.kernel32.SetPriorityClass(int(handle), 0x40 if background else 0x4000))
+        if background:
+            os.setpriority(os.PRIO_PROCESS, proc.pid, 19)
+            return True
+    except (OSError, AttributeError):
+        return False
+    return False
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Deque, List, Optional
+
+# Jedan uzorak iz FFmpeg "-progress" toka (key=value blokovi koji se
+# zavrsavaju sa progress=continue / progress=end).
+@dataclass
+class EncoderStats:
+    frame: int = 0
+    fps: float = 0.0
+    bitrate_kbps: Optional[float] = None
+    total_size: int = 0
+    out_time_sec: float = 0.0
+    dup_frames: int = 0
+    drop_frames: int = 0
+    speed: Optional[float] = None
+    ended: bool = False
+    wall_time: float = 0.0
+
+    @property
+    def behind(self) -> bool:
+        return self.speed is not None and self.speed < 1.0
+
+    # VFR (dedup): frejmova do out_time po nominalnom fps-u, i koliko ih
+    # enkoder nije dobio; CFR snimak daje ~0
+    def expected_frames(self, fps: float) -> int:
+        return int(round(self.out_time_sec * fps))
+
+    def skipped_frames(self, fps: float) -> int:
+        return max(0, self.expected_frames(fps) - self.frame)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        speed = f"{self.speed:.2f}x" if self.speed is not None else "N/A"
+        rate = f"{self.bitrate_kbps:.0f} kbit/s" if self.bitrate_kbps is not None else "N/A"
+        return (
+            f"{self.fps:.1f} fps | speed {speed} | drop {self.drop_frames} / dup {self.dup_frames} | "
+            f"{rate} | {self.total_size / (1024 * 1024):.1f} MB"
+        )
+
+def _num(v: str, cast=float, default=None):
+    v = v.strip()
+    for suffix in ("kbits/s", "x"):
+        if v.endswith(suffix):
+            v = v[: -len(suffix)]
+    try:
+        return cast(v)
+    except ValueError:
+        return default
+
+class ProgressParser:
+    def __init__(self):
+        self._cur = {}
+
+    def feed(self, line: str) -> Optional[EncoderStats]:
+        line = line.strip()
+        if "=" not in line:
+            return None
+        key, _, value = line.partition("=")
+        if key != "progress":
+            self._cur[key] = value
+            return None
+
+        c, self._cur = self._cur, {}
+        out_us = _num(c.get("out_time_us", "N/A"), int)
+        return EncoderStats(
+            frame=_num(c.get("frame", "0"), int, 0),
+            fps=_num(c.get("fps", "0"), float, 0.0),
+            bitrate_kbps=_num(c.get("bitrate", "N/A")),
+            total_size=_num(c.get("total_size", "0"), int, 0),
+            out_time_sec=max(0, out_us) / 1_000_000.0 if out_us is not None else 0.0,
+            dup_frames=_num(c.get("dup_frames", "0"), int, 0),
+            drop_frames=_num(c.get("drop_frames", "0"), int, 0),
+            speed=_num(c.get("speed", "N/A")),
+            ended=value.strip() == "end",
+            wall_time=time.time(),
+        )
+
+# Ograniceni ring buffer poslednjih N uzoraka
+class StatsHistory:
+    def __init__(self, maxlen: int):
+        self._buf: Deque[EncoderStats] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def append(self, s: EncoderStats) -> None:
+        with self._lock:
+            self._buf.append(s)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buf.clear()
+
+    @property
+    def latest(self) -> Optional[EncoderStats]:
+        with self._lock:
+            return self._buf[-1] if self._buf else None
+
+    def snapshot(self) -> List[EncoderStats]:
+        with self._lock:
+            return list(self._buf)
+
+    def __len__(self) -> int:
+        return len(self._buf)
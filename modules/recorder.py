@@ -0,0 +1,807 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .adaptive import AdaptiveConfig, AdaptiveController
+from .audio import AudioCapture, audio_part_path, resolve_audio, separate_audio
+from .capture import (
+    TAP_PIX_FMT, RecordSpec, build_multi_record_args, build_record_args, frame_bytes, part_path, pipe_spec,
+    rendition_spec, rendition_specs, segment_list_path,
+)
+from .constants import (
+    FFMPEG_PATH, START_TIMEOUT_SEC, STOP_TIMEOUT_SEC, STATS_INTERVAL_SEC, STATS_HISTORY, STATS_WARMUP_SEC, LOG_FLUSH_SEC,
+    LOG_MAX_PENDING, VIDEO_SUBDIR, ensure_dir,
+)
+from .finalize import faststart_remux, join_segments, mux_audio, read_concat_list
+from .frametap import FrameTap, read_full
+from .logpipe import LogBatcher
+from .procstats import cpu_seconds
+from .progress import ProgressParser, StatsHistory
+from .spans import SPANS
+from .streaming import StreamMonitor
+
+# Stanja zivotnog ciklusa snimanja
+class RecState:
+    IDLE = "idle"
+    STARTING = "starting"
+    RECORDING = "recording"
+    STOPPING = "stopping"
+    FINALIZING = "finalizing"
+    FAILED = "failed"
+
+# Minimalni "signal" bez Qt-a. FfmpegController ga prosledjuje na Qt
+# signale, a headless kod direktno kaci callback-ove.
+class Hook:
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, fn) -> None:
+        if fn not in self._slots:
+            self._slots.append(fn)
+
+    def disconnect(self, fn) -> None:
+        if fn in self._slots:
+            self._slots.remove(fn)
+
+    def emit(self, *args) -> None:
+        for fn in list(self._slots):
+            try:
+                fn(*args)
+            except Exception:
+                traceback.print_exc()
+
+def new_capture_path(root: str, tag, ext: str = "mp4", prefix: str = "capture") -> Path:
+    out_path = Path(root) / VIDEO_SUBDIR
+    ensure_dir(out_path)
+    return out_path / f"{prefix}_{tag}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+
+# Sa tap izlazom stdout nosi frejmove, a -progress ide na stderr zajedno sa logom
+PROGRESS_LINE = re.compile(r"^[a-z][a-z0-9_]*=")
+
+def progress_url(spec: RecordSpec) -> str:
+    return "pipe:2" if spec.tap_fps > 0 else "pipe:1"
+
+def _exit_code(proc) -> int:
+    code = proc.poll() if proc else -1
+    if code is None:
+        return -1
+    # FIX: Sprecava overflow gresku na Windows-u
+    if code > 2147483647:
+        code = -1
+    return code
+
+# Jedan FFmpeg proces od starta do finalnog fajla. Sve sto moze da blokira
+# (Popen, cekanje na prvi frejm, wait na izlaz) radi session tred, tako da
+# start()/stop() odmah vracaju kontrolu pozivaocu (GUI, hotkey, tray).
+class Recorder:
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH):
+        self.ffmpeg_path = ffmpeg_path
+
+        self.on_state = Hook()          # (state)
+        self.on_status = Hook()         # (msg, color)
+        self.on_log_batch = Hook()      # (lines)
+        self.on_stats = Hook()          # (EncoderStats)
+        self.on_started = Hook()        # (outfile)
+        self.on_failed = Hook()         # (reason)
+        self.on_process_ended = Hook()  # (exit code)
+        self.on_stream = Hook()         # (stream label, "retry"/"lost", msg)
+
+        self.logs = LogBatcher(LOG_MAX_PENDING, LOG_FLUSH_SEC)
+        self.logs.start(self.on_log_batch.emit)
+        self.history = StatsHistory(STATS_HISTORY)
+
+        self.state = RecState.IDLE
+        self.spec: Optional[RecordSpec] = None
+        self.proc = None
+        self.is_paused = False
+        self.last_exit_code: Optional[int] = None
+        self.start_latency_ms: Optional[float] = None
+        self.first_frame_wall: Optional[float] = None  # time.time() prvog frejma (poravnanje vise izvora)
+        self.extra: List[RecordSpec] = []  # dodatni izvori u istom procesu
+        self.adaptive: Optional[AdaptiveController] = None
+        self.parts: List[str] = []  # izlazni fajlovi; vise od jednog posle adaptivnih promena
+        self.rendition_files: List[str] = []  # dodatne verzije (spec.renditions) svih delova
+        self.extra_files: List[str] = []  # izlazi dodatnih izvora (extra), po jedan po izvoru
+        self.tap = FrameTap()  # frejmovi tap izlaza (spec.tap_fps > 0)
+        self.audio: List[AudioCapture] = []  # zasebni audio procesi (audio_mode "separate")
+        self._dedup_done = (0, 0)  # VFR: (preskoceno, ocekivano) iz zavrsenih delova
+        self.markers: List[dict] = []  # oznake tokom snimanja (marker komanda), idu u <ime>.markers.json
+        self.streams: Optional[StreamMonitor] = None  # stanje stream izlaza (spec.streams)
+
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop_req = threading.Event()
+        self._ready = threading.Event()
+        self._io_stop = threading.Event()
+        self._progress_thread = None
+        self._standby = None
+        self._killed = False
+        self._stats_seq = 0
+        self._published_seq = 0
+        self._behind = False
+        self._adjust = None  # (level, spec, reason, t_request, segs pri zahtevu)
+        self._retiring: List[threading.Thread] = []
+
+    # --- Stanje
+    @property
+    def is_recording(self) -> bool:
+        return self.state in (RecState.STARTING, RecState.RECORDING)
+
+    @property
+    def is_busy(self) -> bool:
+        return self.state not in (RecState.IDLE, RecState.FAILED)
+
+    def _set_state(self, state: str) -> None:
+        with self._lock:
+            if self.state == state:
+                return
+            self.state = state
+        if state in (RecState.IDLE, RecState.FAILED):
+            self._idle.set()
+        self.on_state.emit(state)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._idle.wait(timeout)
+
+    def log(self, msg: str) -> None:
+        self.logs.push(msg)
+
+    def _status(self, msg: str, col: str) -> None:
+        self.on_status.emit(msg, col)
+
+    # --- Javni API
+    # extra: dodatni izvori koje isti FFmpeg proces snima u svoje fajlove
+    def start(self, spec: RecordSpec, standby=None, adaptive: Optional[AdaptiveConfig] = None,
+              extra: Sequence[RecordSpec] = ()) -> bool:
+        if extra:
+            standby = adaptive = None
+            spec = replace(spec, tap_fps=0.0, streams=(), renditions=())
+        # Lossless prvi korak nema preset koji bi adaptivni kvalitet spustao
+        if spec.capture_codec:
+            adaptive = None
+        # Uredjaji koji ne postoje se izbacuju pre starta (ne obaraju snimanje)
+        spec = resolve_audio(spec, self.log)
+        # Armed standby je samo video; audio moze samo iz zasebnog procesa
+        if standby is not None and spec.record_audio and not separate_audio(spec):
+            self.log("Armed rezim ne podrzava audio u video procesu - hladan start.")
+            standby = None
+        if standby is not None and not (standby.alive and standby.matches(spec)):
+            standby = None
+        try:
+            if extra:
+                args = build_multi_record_args([spec, *extra], self.ffmpeg_path, progress="pipe:1")
+            else:
+                enc_spec = pipe_spec(spec) if standby else spec
+                args = build_record_args(enc_spec, self.ffmpeg_path, progress=progress_url(enc_spec))
+        except ValueError as e:
+            self._status(str(e), "#FF4444")
+            return False
+
+        with self._lock:
+            if self.is_busy:
+                return False
+            self.state = RecState.STARTING
+            self._idle.clear()
+        self.on_state.emit(RecState.STARTING)
+
+        self.spec = spec
+        self.is_paused = False
+        self.start_latency_ms = None
+        self.first_frame_wall = None
+        self.extra = list(extra)
+        self._stop_req.clear()
+        self._killed = False
+        self._ready.clear()
+        self._io_stop.clear()
+        self.history.clear()
+        self._stats_seq = self._published_seq = 0
+        self._behind = False
+        self._dedup_done = (0, 0)
+        self.markers = []
+        self.streams = StreamMonitor(spec.streams) if spec.streams else None
+        if spec.streams and separate_audio(spec):
+            self.log("Stream izlazi su bez zvuka: zasebni audio tragovi se spajaju tek posle stopa.")
+
+        self._standby = standby
+        if standby:
+            standby.go()
+
+        # Replay ring zavisi od imena segmenata, pa tamo nema promena u letu
+        self.adaptive = None
+        self._adjust = None
+        self._retiring = []
+        self.audio = [
+            AudioCapture(dev, audio_part_path(spec.outfile, i + 1), self.ffmpeg_path, self.log)
+            for i, dev in enumerate(separate_audio(spec))
+        ]
+        self.parts = [str(spec.outfile)]
+        self.extra_files = [str(s.outfile) for s in extra]
+        self.rendition_files = [str(rs.outfile) for rs in rendition_specs(spec)]
+        for r in () if spec.capture_codec else spec.renditions:
+            rs = rendition_spec(spec, r)
+            if rs is None:
+                self.log(f"Verzija '{r.name}' ({r.height}p) je veća od snimka - preskačem.")
+                continue
+            self.log(f"Verzija '{r.name}': {rs.custom_wh[0]}x{rs.custom_wh[1]}, {rs.encoder} {rs.x264_preset}, CRF {rs.crf}")
+        if adaptive is not None and spec.output_mode != "replay":
+            # Standby grabber ima fiksnu velicinu i fps - menja se samo preset
+            ctl = AdaptiveController(spec, adaptive, allow_geometry=standby is None)
+            if ctl.enabled:
+                self.adaptive = ctl
+                self.log(f"Adaptivni kvalitet: {len(ctl.ladder)} nivoa, start na {ctl.current.describe()}")
+
+        self.log(self._mask(f"CMD: {' '.join(args)}"))
+        self._status("Pokrećem...", "#FFCC00")
+        threading.Thread(target=self._run, args=(spec, args), daemon=True).start()
+        return True
+
+    def stop(self) -> None:
+        if self.is_recording and not self._stop_req.is_set():
+            SPANS.begin("stop", id(self))
+            self._stop_req.set()
+
+    def pause_toggle(self) -> None:
+        if self.state != RecState.RECORDING or not self.proc:
+            return
+        try:
+            if self._standby:
+                # Frejmovi se ne prosledjuju enkoderu dok traje pauza
+                self._standby.paused = not self._standby.paused
+            else:
+                self.proc.stdin.write(b"p\n")
+                self.proc.stdin.flush()
+            self.is_paused = not self.is_paused
+            self._status(
+                "PAUZIRANO" if self.is_paused else "SNIMANJE",
+                "#FFCC00" if self.is_paused else "#88FF88",
+            )
+        except:
+            pass
+
+    # Pozicija u tekucem delu = poslednji out_time + vreme od tog uzorka
+    # (tokom pauze stoji). None = ne snima se.
+    def marker(self, label: str = "") -> Optional[float]:
+        if self.state != RecState.RECORDING:
+            return None
+        now = time.time()
+        last = self.history.latest
+        pos = 0.0
+        if last is not None:
+            pos = last.out_time_sec + (0.0 if self.is_paused else max(0.0, now - last.wall_time))
+        with self._lock:
+            self.markers.append({"t": round(pos, 3), "label": str(label), "file": Path(self.parts[-1]).name,
+                                 "wall": round(now, 3)})
+        self.log(f"Marker {len(self.markers)} @ {pos:.2f}s" + (f": {label}" if label else ""))
+        return pos
+
+    # Two-stage: pored finalnog fajla, ne medjufajla u scratch-u
+    def _save_markers(self, spec: RecordSpec) -> None:
+        path = Path(spec.transcode_to or self.parts[0]).with_suffix(".markers.json")
+        try:
+            path.write_text(json.dumps({"markers": self.markers}, indent=2, ensure_ascii=False), encoding="utf-8")
+        except OSError as e:
+            self.log(f"Markeri nisu upisani: {e}")
+            return
+        self.log(f"Markeri ({len(self.markers)}) -> {path.name}")
+
+    def close(self, timeout: float = STOP_TIMEOUT_SEC + 5.0) -> None:
+        self.stop()
+        self.wait(timeout)
+        self.logs.close()
+
+    # Svi video izlazi snimanja: delovi, dodatne verzije i dodatni izvori
+    @property
+    def output_files(self) -> List[str]:
+        return self.parts + self.rendition_files + self.extra_files
+
+    # Tap tekuceg snimanja: standby pump (armed) ili tap izlaz FFmpeg-a
+    @property
+    def frame_tap(self) -> Optional[FrameTap]:
+        if not self.is_recording or self.spec is None:
+            return None
+        if self._standby is not None:
+            return self._standby.tap
+        return self.tap if self.spec.tap_fps > 0 and not self.extra else None
+
+    # --- Telemetrija
+    def add_stats_listener(self, cb) -> None:
+        self.on_stats.connect(cb)
+
+    def remove_stats_listener(self, cb) -> None:
+        self.on_stats.disconnect(cb)
+
+    @property
+    def latest_stats(self):
+        return self.history.latest
+
+    # VFR: (preskoceno, ocekivano) frejmova za celo snimanje, ukljucujuci tekuci deo
+    @property
+    def dedup_counts(self) -> Tuple[int, int]:
+        spec, last = self.spec, self.history.latest
+        skipped, expected = self._dedup_done
+        if spec is not None and spec.dedup and last is not None:
+            skipped += last.skipped_frames(spec.fps)
+            expected += last.expected_frames(spec.fps)
+        return skipped, expected
+
+    def stats_history(self):
+        return self.history.snapshot()
+
+    # --- Session tred
+    def _spawn(self, args: List[str]):
+        cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        return subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=cf,
+        )
+
+    def _run(self, spec: RecordSpec, args: List[str]) -> None:
+        try:
+            t_spawn = time.perf_counter()
+            proc = self._spawn(args)
+        except Exception as e:
+            self.log(f"Error: {e}")
+            self._fail("Greška pri startu")
+            return
+
+        self.proc = proc
+        # Audio procesi tek posle videa: njihov Popen ne odlaze prvi frejm
+        for a in self.audio:
+            a.start()
+        if self._standby:
+            self._standby.attach(proc.stdin)
+        else:
+            self.tap.open(spec.tap_fps or None)
+        self._progress_thread = self._start_io(proc, self._ready, spec)
+        publisher = threading.Thread(target=self._publish_stats, daemon=True)
+        publisher.start()
+
+        # Spreman = prvi -progress blok (prvi enkodovan frejm), ne fiksni sleep
+        deadline = t_spawn + START_TIMEOUT_SEC
+        while not self._ready.wait(0.02):
+            if proc.poll() is not None:
+                self._io_stop.set()
+                self._fail("FFmpeg fail (start)")
+                return
+            if self._stop_req.is_set():
+                break
+            if time.perf_counter() > deadline:
+                proc.kill()
+                self._io_stop.set()
+                self._fail(f"FFmpeg nije krenuo za {START_TIMEOUT_SEC:.0f}s")
+                return
+
+        if self._ready.is_set():
+            self.start_latency_ms = (time.perf_counter() - t_spawn) * 1000.0
+            first = self.history.latest
+            self.first_frame_wall = time.time() - (first.out_time_sec if first else 0.0)
+            self.log(f"Prvi frejm posle {self.start_latency_ms:.0f} ms")
+            if self._standby and self._standby.go_latency_ms is not None:
+                self.start_latency_ms = self._standby.go_latency_ms
+                self.log(f"Armed start: prvi uhvaćen frejm {self.start_latency_ms:.0f} ms posle START")
+            SPANS.record(
+                "first_frame", self.start_latency_ms, outfile=Path(spec.outfile).name, backend=spec.backend,
+                armed=self._standby is not None,
+            )
+            self._set_state(RecState.RECORDING)
+            self._status("Snimanje u toku", "#88FF88")
+            self.on_started.emit(str(spec.outfile))
+
+        while not self._stop_req.wait(0.2):
+            if proc.poll() is not None:
+                break
+            if self._adjust and self._adjust_due(spec):
+                proc, spec = self._rollover(proc, spec)
+        requested = self._stop_req.is_set()
+
+        for a in self.audio:
+            a.request_stop()
+        code = self._shutdown(proc)
+        for a in self.audio:
+            a.wait()
+        SPANS.end("stop", id(self), outfile=Path(spec.outfile).name, exit_code=code, killed=self._killed)
+        SPANS.begin("finalize", id(self))
+        publisher.join(timeout=STATS_INTERVAL_SEC + 1.0)
+
+        self._set_state(RecState.FINALIZING)
+        for t in self._retiring:
+            t.join()
+        for s in [spec] + rendition_specs(spec) + self.extra:
+            self._finalize(s, code, self._killed)
+        if self.audio:
+            self._mux_audio(spec)
+        if spec.stage_to:
+            self._unstage(spec)
+        if self.markers:
+            self._save_markers(spec)
+        SPANS.end("finalize", id(self), outfile=Path(spec.outfile).name, output_mode=spec.output_mode,
+                  faststart=spec.faststart)
+        if len(self.parts) > 1:
+            self.log(f"Snimak je u {len(self.parts)} dela (adaptivni kvalitet): " + ", ".join(Path(p).name for p in self.parts))
+        if spec.dedup:
+            skipped, expected = self.dedup_counts
+            self.log(
+                f"VFR: preskočeno {skipped} od {expected} frejmova ({100.0 * skipped / max(1, expected):.0f}%) "
+                "- statični delovi nisu enkodovani."
+            )
+        if self.streams:
+            for line in self.streams.summary():
+                self.log(line)
+
+        self.proc = None
+        self._standby = None
+        self.tap.close()
+        self.is_paused = False
+        self.last_exit_code = code
+        self.on_process_ended.emit(code)
+        if requested or code == 0:
+            self._status("Sačuvano.", "#88FF88")
+            self._set_state(RecState.IDLE)
+        else:
+            self._status(f"FFmpeg se neočekivano ugasio ({code})", "#FF4444")
+            self._set_state(RecState.FAILED)
+
+    def _close_proc(self, proc, eof: bool, timeout: float = STOP_TIMEOUT_SEC):
+        try:
+            if eof:
+                # Rawvideo ulaz: EOF na stdin-u je uredan kraj
+                proc.stdin.close()
+            elif proc.stdin:
+                proc.stdin.write(b"q\n")
+                proc.stdin.flush()
+        except:
+            pass
+
+        try:
+            proc.wait(timeout=timeout)
+        except:
+            proc.kill()
+            return _exit_code(proc), True
+        return _exit_code(proc), False
+
+    def _shutdown(self, proc) -> int:
+        self._set_state(RecState.STOPPING)
+        self._status("Zaustavljam...", "#FFCC00")
+        if self._standby:
+            self._standby.detach()
+        code, self._killed = self._close_proc(proc, eof=self._standby is not None)
+
+        # Poslednji (progress=end) uzorak pre gasenja publishera
+        if self._progress_thread:
+            self._progress_thread.join(timeout=1.0)
+        self._io_stop.set()
+        return code
+
+    # --- Adaptivni kvalitet: promena parametara = novi FFmpeg proces u novi
+    # deo fajla. Novi proces se podize dok stari jos snima, pa se prebacuje
+    # tek kad novi ima prvi frejm (bez rupe u snimku).
+    def _feed_adaptive(self, stats) -> None:
+        ctl = self.adaptive
+        if ctl is None or self.state != RecState.RECORDING or self._adjust:
+            return
+        if self.is_paused:
+            ctl.hold()
+            return
+        now = time.perf_counter()
+        d = ctl.feed(stats, cpu_seconds(self.proc), now)
+        if d is None:
+            return
+        level, reason = d
+        spec = self.spec
+        segs = self._segment_count(spec) if spec.output_mode == "segment" else 0
+        self._adjust = (level, ctl.spec_for(level), reason, now, segs)
+        self.log(f"Adaptivni kvalitet: {ctl.current.describe()} -> {ctl.ladder[level].describe()} zakazano, {reason}")
+
+    def _segment_count(self, spec: RecordSpec) -> int:
+        try:
+            return len(read_concat_list(segment_list_path(spec.outfile)))
+        except OSError:
+            return 0
+
+    def _adjust_due(self, spec: RecordSpec) -> bool:
+        # Bezbedna granica: u segment modu prelaz segmenta, inace odmah (novi deo)
+        level, _, _, t_req, segs = self._adjust
+        if self.is_paused:
+            return False
+        if spec.output_mode != "segment" or self._segment_count(spec) > segs:
+            return True
+        # Spustanje ne ceka ceo segment
+        return level > self.adaptive.level and time.perf_counter() - t_req >= self.adaptive.cfg.max_defer_sec
+
+    def _rollover(self, proc, spec: RecordSpec):
+        ctl = self.adaptive
+        level, new_spec, reason, _, _ = self._adjust
+        self._adjust = None
+        new_spec = replace(new_spec, outfile=part_path(self.parts[0], len(self.parts) + 1))
+        try:
+            enc_spec = pipe_spec(new_spec) if self._standby else new_spec
+            args = build_record_args(enc_spec, self.ffmpeg_path, progress=progress_url(enc_spec))
+            new = self._spawn(args)
+        except (ValueError, OSError) as e:
+            self.log(f"Adaptivni kvalitet: novi proces nije pokrenut ({e})")
+            ctl.rejected(time.perf_counter())
+            return proc, spec
+        self.log(self._mask(f"CMD: {' '.join(args)}"))
+
+        ready = threading.Event()
+        prog = self._start_io(new, ready, new_spec)
+        if self._standby:
+            self._standby.attach(new.stdin)
+        deadline = time.perf_counter() + START_TIMEOUT_SEC
+        while not ready.wait(0.02):
+            if new.poll() is not None or time.perf_counter() > deadline:
+                break
+        if not ready.is_set():
+            new.kill()
+            if self._standby:
+                self._standby.attach(proc.stdin)
+            self.log("Adaptivni kvalitet: novi proces nije dao frejm, ostaje postojeće podešavanje.")
+            ctl.rejected(time.perf_counter())
+            return proc, spec
+
+        old_level = ctl.current
+        self._dedup_done = self.dedup_counts
+        self.proc, self.spec, self._progress_thread = new, new_spec, prog
+        self.history.clear()
+        self.parts.append(str(new_spec.outfile))
+        self.rendition_files += [str(rs.outfile) for rs in rendition_specs(new_spec)]
+        if self.streams:
+            self.streams.reopen()
+        ctl.applied(time.perf_counter())
+        self.log(
+            f"Adaptivni kvalitet: {old_level.describe()} -> {ctl.current.describe()} ({reason}); "
+            f"nastavak u {Path(new_spec.outfile).name}"
+        )
+        t = threading.Thread(target=self._retire, args=(proc, spec), daemon=True)
+        t.start()
+        self._retiring.append(t)
+        return new, new_spec
+
+    def _retire(self, proc, spec: RecordSpec) -> None:
+        # Stari enkoder koji kasni prazni red frejmova - ne blokira snimanje, pa ima vise vremena
+        code, killed = self._close_proc(proc, eof=self._standby is not None, timeout=STOP_TIMEOUT_SEC * 4)
+        for s in [spec] + rendition_specs(spec):
+            self._finalize(s, code, killed)
+
+    def _finalize(self, spec: RecordSpec, code: int, killed: bool = False) -> None:
+        mode = spec.output_mode
+        if killed:
+            if mode == "mp4" and not spec.capture_codec:
+                self.log("UPOZORENJE: FFmpeg je ubijen - klasičan MP4 bez moov atoma verovatno nije čitljiv.")
+            else:
+                self.log("FFmpeg je ubijen - fragmentisan izlaz ostaje čitljiv (gubi se najviše poslednji fragment).")
+        if not spec.faststart or mode == "mp4":
+            return
+
+        self._status("Finalizujem (faststart)...", "#FFCC00")
+        if mode == "fmp4":
+            ok, msg = faststart_remux(str(spec.outfile), ffmpeg_path=self.ffmpeg_path)
+        else:
+            lst = segment_list_path(spec.outfile)
+            if not os.path.exists(lst):
+                return
+            parts = read_concat_list(lst)
+            ok, msg = join_segments(lst, str(spec.outfile), self.ffmpeg_path)
+            if ok:
+                for f in parts + [lst]:
+                    try:
+                        os.remove(f)
+                    except OSError:
+                        pass
+        self.log(f"Faststart: {msg}" if ok else f"Faststart nije uspeo, ostaje fragmentisan izlaz: {msg}")
+
+    # Audio medjufajlovi -> trake u finalnom MP4. Pomeraj je razlika prvog
+    # audio uzorka i prvog video frejma (oba iz -progress, isti sat).
+    def _mux_audio(self, spec: RecordSpec) -> None:
+        done = [a for a in self.audio if a.ok]
+        for a in self.audio:
+            if a not in done:
+                self.log(f"Audio '{a.device}' nije snimljen (izlaz {a.exit_code}).")
+        outfile = str(self.parts[0])
+        if not done:
+            return
+        if len(self.parts) > 1 or not os.path.isfile(outfile):
+            self.log("Audio nije spojen (snimak u vise delova) - ostaje u: " + ", ".join(Path(a.outfile).name for a in done))
+            return
+        tracks = []
+        for a in done:
+            offset = 0.0
+            if a.first_wall is not None and self.first_frame_wall is not None:
+                offset = a.first_wall - self.first_frame_wall
+            self.log(f"Audio '{a.device}': A/V pomeraj {offset * 1000.0:+.0f} ms")
+            tracks.append((a.outfile, offset))
+        # Dodatne verzije (proxy) dobijaju iste trake kao glavni snimak
+        self._status("Spajam audio...", "#FFCC00")
+        failed = False
+        for target in [outfile] + [f for f in self.rendition_files if os.path.isfile(f)]:
+            ok, msg = mux_audio(target, tracks, self.ffmpeg_path)
+            if ok:
+                self.log(f"Audio: {len(done)} trag(a) spojeno u {Path(target).name}")
+            else:
+                failed = True
+                self.log(f"Spajanje audija u {Path(target).name} nije uspelo: {msg}")
+        if failed:
+            self.log("Audio ostaje i u .mka fajlovima: " + ", ".join(Path(a.outfile).name for a in done))
+            return
+        for a in done:
+            try:
+                os.remove(a.outfile)
+            except OSError:
+                pass
+
+    # Staging -> output folder. parts dobija konacne putanje (post poslovi,
+    # CLI "done"); nespojen audio ide zajedno sa videom.
+    def _unstage(self, spec: RecordSpec) -> None:
+        dest = Path(spec.stage_to).parent
+        moved = []
+        leftovers = [a.outfile for a in self.audio if os.path.isfile(a.outfile)]
+        for src in self.output_files + leftovers:
+            if not os.path.isfile(src):
+                moved.append(src)
+                continue
+            dst = str(dest / Path(src).name)
+            self._status("Premeštam iz staging-a...", "#FFCC00")
+            try:
+                shutil.move(src, dst)
+            except OSError as e:
+                self.log(f"Staging: {Path(src).name} nije premešten ({e}) - ostaje u {Path(src).parent}")
+                moved.append(src)
+                continue
+            moved.append(dst)
+        n, r, x = len(self.parts), len(self.rendition_files), len(self.extra_files)
+        self.parts, self.rendition_files = moved[:n], moved[n:n + r]
+        self.extra_files = moved[n + r:n + r + x]
+        self.log(f"Staging: snimak premešten u {dest}")
+
+    def _fail(self, reason: str) -> None:
+        for a in self.audio:
+            a.kill()
+        if self._standby:
+            self._standby.detach()
+            self._standby = None
+        self.tap.close()
+        self.proc = None
+        self._status(reason, "#FF4444")
+        self.on_failed.emit(reason)
+        self._set_state(RecState.FAILED)
+
+    # --- I/O tredovi
+    def _start_io(self, proc, ready: threading.Event, spec: RecordSpec) -> threading.Thread:
+        if spec.tap_fps > 0 and self._standby is None:
+            threading.Thread(target=self._read_tap, args=(proc, spec), daemon=True).start()
+            t = threading.Thread(target=self._read_progress, args=(proc, ready, proc.stderr, True), daemon=True)
+        else:
+            threading.Thread(target=self._read_stderr, args=(proc,), daemon=True).start()
+            t = threading.Thread(target=self._read_progress, args=(proc, ready), daemon=True)
+        t.start()
+        return t
+
+    def _read_tap(self, proc, spec: RecordSpec):
+        # Uvek se prazni (inace FFmpeg staje na punom pipe-u); kopija samo kad neko ceka
+        w, h = spec.width, spec.height
+        buf = bytearray(frame_bytes(w, h, TAP_PIX_FMT))
+        mv = memoryview(buf)
+        while True:
+            try:
+                if read_full(proc.stdout, mv) < len(buf):
+                    break
+            except:
+                break
+            if proc is self.proc:
+                self.tap.push(mv, w, h, TAP_PIX_FMT)
+
+    def _read_stderr(self, proc):
+        while not self._io_stop.is_set():
+            try:
+                line = proc.stderr.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", "replace").strip()
+                if line:
+                    self._ffmpeg_line(line)
+            except:
+                break
+
+    # Log linija FFmpeg-a; stream izlazi: stanje veze + bez stream key-a u logu
+    def _ffmpeg_line(self, line: str) -> None:
+        mon = self.streams
+        if mon is not None:
+            ev = mon.feed(line)
+            line = mon.mask(line)
+            if ev:
+                i, kind, msg = ev
+                self.log(msg)
+                self.on_stream.emit(mon.targets[i].label, kind, msg)
+        self.logs.push(f"ffmpeg: {line}")
+
+    def _mask(self, text: str) -> str:
+        return self.streams.mask(text) if self.streams else text
+
+    def _read_progress(self, proc, ready: threading.Event, stream=None, mixed: bool = False):
+        parser = ProgressParser()
+        stream = stream or proc.stdout
+        while True:
+            try:
+                line = stream.readline()
+            except:
+                break
+            if not line:
+                break
+            text = line.decode("utf-8", "replace")
+            if mixed and not PROGRESS_LINE.match(text):
+                if text.strip():
+                    self._ffmpeg_line(text.strip())
+                continue
+            stats = parser.feed(text)
+            if stats:
+                # Tokom preklapanja statistiku daje samo aktivni proces
+                if proc is self.proc:
+                    self.history.append(stats)
+                    self._stats_seq += 1
+                if stats.frame > 0:
+                    ready.set()
+
+    def _publish_stats(self):
+        while not self._io_stop.wait(STATS_INTERVAL_SEC):
+            self._publish_latest()
+        self._publish_latest()
+
+    def _publish_latest(self):
+        if self._stats_seq == self._published_seq:
+            return
+        self._published_seq = self._stats_seq
+        stats = self.history.latest
+        if stats is None:
+            return
+        # speed je kumulativan prosek, prvih par sekundi je nepouzdan
+        if stats.behind != self._behind and not stats.ended and stats.out_time_sec >= STATS_WARMUP_SEC:
+            self._behind = stats.behind
+            if stats.behind:
+                self.log(f"UPOZORENJE: enkoder kasni (speed {stats.speed:.2f}x, drop {stats.drop_frames})")
+            else:
+                self.log("Enkoder ponovo u realnom vremenu.")
+        self.on_stats.emit(stats)
+        self._feed_adaptive(stats)
+        self._check_space(stats)
+
+    # Izlaz je dostigao dozvoljenu velicinu (npr. scratch limit) ili disk
+    # ostaje bez mesta - uredan stop dok jos ima mesta za kraj fajla
+    def _check_space(self, stats) -> None:
+        spec = self.spec
+        if spec is None or self._stop_req.is_set():
+            return
+        reason = None
+        if spec.max_bytes > 0:
+            # Matroska drzi klaster u memoriji, pa total_size kasni za fajlom na disku
+            try:
+                size = max(stats.total_size, os.path.getsize(spec.outfile))
+            except OSError:
+                size = stats.total_size
+            if size >= spec.max_bytes:
+                reason = f"izlaz je dostigao {spec.max_bytes / 1024 ** 2:.0f} MB"
+        if reason is None and spec.min_free_mb > 0:
+            try:
+                free = shutil.disk_usage(os.path.dirname(os.path.abspath(spec.outfile))).free
+            except OSError:
+                free = None
+            if free is not None and free < spec.min_free_mb * 1024 * 1024:
+                reason = f"na disku je ostalo {free / 1024 ** 2:.0f} MB"
+        if reason is None:
+            return
+        self.log(f"UPOZORENJE: {reason} - zaustavljam snimanje.")
+        self._status("Limit prostora - zaustavljam", "#FF4444")
+        self.stop()
@@ -0,0 +1,79 @@
+import sys
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+from .capture import RecordSpec
+
+# Oblast snimanja: region monitora (koordinate relativne u odnosu na
+# monitor, da preset prezivi promenu rasporeda) ili prozor koji se prati.
+
+MIN_REGION = 16
+
+@dataclass
+class Region:
+    x: int
+    y: int
+    w: int
+    h: int
+
+    def to_list(self):
+        return [self.x, self.y, self.w, self.h]
+
+    @classmethod
+    def parse(cls, text: str) -> "Region":
+        # "x,y,w,h" ili "x y w h"
+        parts = text.replace(",", " ").split()
+        if len(parts) != 4:
+            raise ValueError("Region mora biti x,y,w,h")
+        try:
+            return cls(*(int(p) for p in parts))
+        except ValueError:
+            raise ValueError("Region mora biti x,y,w,h (celi brojevi)") from None
+
+    def label(self) -> str:
+        return f"{self.w}x{self.h} @ {self.x},{self.y}"
+
+def clamp_region(r: Region, mon_w: int, mon_h: int) -> Region:
+    # Unutar monitora i parne dimenzije (yuv420p)
+    x = min(max(0, r.x), mon_w - MIN_REGION)
+    y = min(max(0, r.y), mon_h - MIN_REGION)
+    w = max(MIN_REGION, min(r.w, mon_w - x)) // 2 * 2
+    h = max(MIN_REGION, min(r.h, mon_h - y)) // 2 * 2
+    return Region(x, y, w, h)
+
+def apply_region(spec: RecordSpec, mon, region: Region) -> RecordSpec:
+    r = clamp_region(region, mon.w, mon.h)
+    return replace(spec, left=mon.left + r.x, top=mon.top + r.y, width=r.w, height=r.h, origin=(mon.left, mon.top))
+
+def apply_window(spec: RecordSpec, win) -> RecordSpec:
+    # gdigrab trazi naslov, x11grab id prozora
+    ident = win.title if sys.platform == "win32" else hex(win.hwnd)
+    return replace(
+        spec, left=win.left, top=win.top, width=win.w // 2 * 2, height=win.h // 2 * 2, window=ident,
+    )
+
+def apply_area(spec: RecordSpec, mon, area) -> RecordSpec:
+    if area is None:
+        return spec
+    if isinstance(area, Region):
+        return apply_region(spec, mon, area)
+    return apply_window(spec, area)
+
+# --- Preseti u config-u: {"ime": {"monitor": device, "rect": [x, y, w, h]}}
+def region_presets(cfg: dict) -> Dict[str, Tuple[Optional[str], Region]]:
+    out = {}
+    for name, d in (cfg.get("RegionPresets") or {}).items():
+        try:
+            out[name] = (d.get("monitor"), Region(*(int(v) for v in d["rect"])))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    return out
+
+def store_region_preset(cfg: dict, name: str, device: Optional[str], region: Region) -> None:
+    presets = cfg.get("RegionPresets")
+    if not isinstance(presets, dict):
+        presets = cfg["RegionPresets"] = {}
+    presets[name] = {"monitor": device, "rect": region.to_list()}
+
+def delete_region_preset(cfg: dict, name: str) -> None:
+    (cfg.get("RegionPresets") or {}).pop(name, None)
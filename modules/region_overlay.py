@@ -0,0 +1,86 @@
+from PySide6 import QtWidgets, QtCore, QtGui
+from .region import MIN_REGION, Region
+
+def screen_for_monitor(mon) -> QtGui.QScreen:
+    # QScreen.name() je na Windows-u isti device string (\\.\DISPLAYn)
+    screens = QtGui.QGuiApplication.screens()
+    for s in screens:
+        if s.name() == mon.device:
+            return s
+    if 0 < mon.index <= len(screens):
+        return screens[mon.index - 1]
+    return QtGui.QGuiApplication.primaryScreen()
+
+# Drag-to-select preko celog monitora. Rezultat je u fizickim pikselima,
+# relativno na monitor (isto kao Region preset).
+class RegionSelector(QtWidgets.QWidget):
+    sig_selected = QtCore.Signal(object)  # Region ili None (Esc)
+
+    def __init__(self, screen: QtGui.QScreen):
+        super().__init__(None, QtCore.Qt.FramelessWindowHint | QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.Tool)
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        self.setCursor(QtCore.Qt.CrossCursor)
+        self.setGeometry(screen.geometry())
+        self._dpr = screen.devicePixelRatio()
+        self._origin = None
+        self._rect = QtCore.QRect()
+        self._done = False
+
+    def _physical(self) -> Region:
+        r = self._rect
+        d = self._dpr
+        return Region(round(r.x() * d), round(r.y() * d), round(r.width() * d), round(r.height() * d))
+
+    def paintEvent(self, e):
+        p = QtGui.QPainter(self)
+        p.fillRect(self.rect(), QtGui.QColor(0, 0, 0, 110))
+        if not self._rect.isNull():
+            p.setCompositionMode(QtGui.QPainter.CompositionMode_Clear)
+            p.fillRect(self._rect, QtCore.Qt.transparent)
+            p.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+            p.setPen(QtGui.QPen(QtGui.QColor("#FF4444"), 1))
+            p.drawRect(self._rect.adjusted(0, 0, -1, -1))
+            p.setPen(QtGui.QColor("#FFFFFF"))
+            p.drawText(self._rect.topLeft() + QtCore.QPoint(4, -6), self._physical().label())
+        else:
+            p.setPen(QtGui.QColor("#FFFFFF"))
+            p.drawText(self.rect(), QtCore.Qt.AlignCenter, "Prevuci mišem oblast za snimanje (Esc = odustani)")
+
+    def mousePressEvent(self, e):
+        if e.button() == QtCore.Qt.LeftButton:
+            self._origin = e.position().toPoint()
+            self._rect = QtCore.QRect(self._origin, self._origin)
+            self.update()
+
+    def mouseMoveEvent(self, e):
+        if self._origin is not None:
+            self._rect = QtCore.QRect(self._origin, e.position().toPoint()).normalized()
+            self.update()
+
+    def mouseReleaseEvent(self, e):
+        if self._origin is None or e.button() != QtCore.Qt.LeftButton:
+            return
+        self._origin = None
+        r = self._physical()
+        if r.w < MIN_REGION or r.h < MIN_REGION:
+            self._rect = QtCore.QRect()
+            self.update()
+            return
+        self._finish(r)
+
+    def keyPressEvent(self, e):
+        if e.key() == QtCore.Qt.Key_Escape:
+            self._finish(None)
+
+    def closeEvent(self, e):
+        self._finish(None, close=False)
+        super().closeEvent(e)
+
+    def _finish(self, region, close=True):
+        if self._done:
+            return
+        self._done = True
+        self.sig_selected.emit(region)
+        if close:
+            self.close()
@@ -0,0 +1,153 @@
+import csv
+import os
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .capture import RecordSpec, replay_list_path, replay_ring_size
+from .constants import REPLAY_SEGMENT_SEC, ensure_dir
+from .finalize import join_segments, write_concat_list
+from .recorder import Hook, Recorder, new_capture_path
+
+# Instant replay: Recorder stalno pise kratke segmente u scratch
+# folder, stari segmenti se brisu, a "save" spaja poslednjih N sekundi
+# stream copy-jem (bez re-enkodovanja) u VIDEO_SUBDIR.
+class ReplayBuffer:
+    def __init__(self, rec: Recorder, scratch_dir: str):
+        self.rec = rec
+        self.scratch = Path(scratch_dir)
+        self.spec: Optional[RecordSpec] = None
+        self.on_saved = Hook()        # (path)
+        self.on_save_failed = Hook()  # (reason)
+
+        self._pinned: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._evict_thread = None
+        self._saving = False
+
+    @property
+    def running(self) -> bool:
+        return self.rec.is_busy and self.spec is not None
+
+    def start(self, spec: RecordSpec) -> bool:
+        if self.rec.is_busy:
+            return False
+        ensure_dir(self.scratch)
+        self._clear_scratch()
+        self.spec = replace(
+            spec,
+            outfile=str(self.scratch / "replay.mp4"),
+            output_mode="replay",
+            frag_sec=REPLAY_SEGMENT_SEC,
+            faststart=False,
+        )
+        if not self.rec.start(self.spec):
+            self.spec = None
+            return False
+        self._stop.clear()
+        self._evict_thread = threading.Thread(target=self._evict_loop, daemon=True)
+        self._evict_thread.start()
+        self.rec.log(f"Replay buffer: poslednjih {self.spec.replay_sec}s u {self.scratch}")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.rec.stop()
+
+    def close(self) -> None:
+        self.stop()
+        self.rec.wait()
+        self._clear_scratch()
+        self.spec = None
+
+    # --- Ring
+    def _segments(self) -> List[Path]:
+        return sorted(self.scratch.glob("replay_*.mp4"))
+
+    def _completed(self) -> Dict[str, Tuple[float, float]]:
+        out = {}
+        try:
+            with open(replay_list_path(self.spec.outfile), newline="", encoding="utf-8") as f:
+                for row in csv.reader(f):
+                    if len(row) >= 3:
+                        out[row[0]] = (float(row[1]), float(row[2]))
+        except (OSError, ValueError):
+            pass
+        return out
+
+    def _evict_loop(self) -> None:
+        keep = replay_ring_size(self.spec)
+        while not self._stop.wait(1.0):
+            with self._lock:
+                pinned = set(self._pinned)
+            for seg in self._segments()[:-keep]:
+                if seg in pinned:
+                    continue
+                try:
+                    os.remove(seg)
+                except OSError:
+                    pass  # Windows: fajl je jos otvoren, proba u sledecem krugu
+
+    def _clear_scratch(self) -> None:
+        for f in list(self.scratch.glob("replay_*.mp4")) + list(self.scratch.glob("replay*.csv")):
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+
+    # --- Save
+    def pick_segments(self, seconds: float) -> List[Path]:
+        # Od najnovijeg unazad dok se ne skupi trazeno trajanje; segment
+        # koji se trenutno pise (nije u csv listi) ulazi kao poslednji
+        done = self._completed()
+        picked, total = [], 0.0
+        for seg in reversed(self._segments()):
+            if seg.name in done:
+                start, end = done[seg.name]
+                total += max(0.0, end - start)
+            else:
+                total += self.spec.frag_sec / 2
+            picked.append(seg)
+            if total >= seconds:
+                break
+        picked.reverse()
+        return picked
+
+    def save(self, root: str, seconds: Optional[float] = None) -> bool:
+        if not self.running or self._saving:
+            return False
+        seconds = seconds or self.spec.replay_sec
+        segs = self.pick_segments(seconds)
+        if not segs:
+            self.on_save_failed.emit("Replay buffer je prazan.")
+            return False
+        with self._lock:
+            self._pinned.update(segs)
+        self._saving = True
+        dst = new_capture_path(root, self.spec.monitor_index, prefix="replay")
+        threading.Thread(target=self._save, args=(segs, dst), daemon=True).start()
+        return True
+
+    def _save(self, segs: List[Path], dst: Path) -> None:
+        t0 = time.perf_counter()
+        lst = str(self.scratch / f"save_{int(time.time() * 1000)}.ffconcat")
+        try:
+            write_concat_list(lst, segs)
+            ok, msg = join_segments(lst, str(dst), self.rec.ffmpeg_path, faststart=False)
+        finally:
+            with self._lock:
+                self._pinned.difference_update(segs)
+            self._saving = False
+            try:
+                os.remove(lst)
+            except OSError:
+                pass
+        if ok:
+            self.rec.log(f"Replay sačuvan ({len(segs)} seg., {(time.perf_counter() - t0) * 1000:.0f} ms): {dst}")
+            self.on_saved.emit(str(dst))
+        else:
+            self.rec.log(f"Replay save nije uspeo: {msg}")
+            self.on_save_failed.emit(msg)
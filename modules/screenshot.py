@@ -0,0 +1,185 @@
+import struct
+import subprocess
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .capture import TAP_PIX_FMT, RecordSpec, build_input_args, frame_bytes, get_backend
+from .constants import (
+    FFMPEG_PATH, SCREENSHOT_SUBDIR, SHOT_BURST_HZ, SHOT_MAX_WORKERS, SHOT_PNG_LEVEL, SHOT_TIMEOUT_SEC, ensure_dir,
+)
+from .frametap import Frame, FrameTap, read_full
+from .procstats import cpu_count
+from .recorder import Hook
+
+# Screenshot-ovi (jedan ili burst od N frejmova na X Hz). Tokom snimanja se
+# frejmovi uzimaju iz vec pokrenutog capture-a (FrameTap), inace se podize
+# kratak grabber samo za te frejmove. Enkodovanje i upis rade na worker
+# pool-u, pa ni GUI ni snimanje nikad ne cekaju na disk.
+
+SHOT_FORMATS = {
+    "png": "PNG",
+    "webp": "WebP (lossless)",
+    "raw": "Raw",
+}
+
+def same_area(a: Optional[RecordSpec], b: RecordSpec) -> bool:
+    return a is not None and (
+        (a.backend, a.monitor_index, a.left, a.top, a.width, a.height, a.window)
+        == (b.backend, b.monitor_index, b.left, b.top, b.width, b.height, b.window)
+    )
+
+def shot_path(root: str, tag, n: int, ext: str) -> Path:
+    out = Path(root) / SCREENSHOT_SUBDIR
+    ensure_dir(out)
+    return out / f"shot_{tag}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}_{n:03d}.{ext}"
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+# RGB24 -> PNG bez dodatnih paketa; zlib otpusta GIL pa workeri rade paralelno
+def encode_png(frame: Frame, level: int = SHOT_PNG_LEVEL) -> bytes:
+    stride = frame.width * 3
+    mv = memoryview(frame.data)
+    rows = bytearray()
+    for y in range(frame.height):
+        rows += b"\x00"  # filter: None
+        rows += mv[y * stride:(y + 1) * stride]
+    ihdr = struct.pack(">IIBBBBB", frame.width, frame.height, 8, 2, 0, 0, 0)
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", ihdr),
+        _png_chunk(b"IDAT", zlib.compress(rows, max(0, min(9, level)))),
+        _png_chunk(b"IEND", b""),
+    ))
+
+def build_image_args(frame: Frame, fmt: str, level: int, outfile: str, ffmpeg_path: str = FFMPEG_PATH) -> List[str]:
+    args = [
+        ffmpeg_path, "-y", "-hide_banner", "-nostdin", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", frame.pix_fmt, "-video_size", f"{frame.width}x{frame.height}", "-i", "pipe:0",
+        "-frames:v", "1",
+    ]
+    if fmt == "png":
+        args += ["-c:v", "png", "-pix_fmt", "rgb24", "-compression_level", str(max(0, min(9, level)))]
+    elif fmt == "webp":
+        args += ["-c:v", "libwebp", "-lossless", "1", "-compression_level", str(max(0, min(6, level)))]
+    else:
+        raise ValueError(f"Nepoznat format screenshot-a: {fmt}")
+    return args + ["-update", "1", outfile]
+
+def write_frame(frame: Frame, path: Path, fmt: str, level: int = SHOT_PNG_LEVEL,
+                ffmpeg_path: str = FFMPEG_PATH) -> Path:
+    if fmt == "raw":
+        # Velicina i format u imenu - bez njih raw nije citljiv
+        path = path.with_suffix(f".{frame.width}x{frame.height}.{frame.pix_fmt}")
+        path.write_bytes(frame.data)
+        return path
+    if fmt == "png" and frame.pix_fmt == "rgb24":
+        path.write_bytes(encode_png(frame, level))
+        return path
+    # yuv420p iz standby-a i WebP idu kroz FFmpeg
+    cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    p = subprocess.run(
+        build_image_args(frame, fmt, level, str(path), ffmpeg_path),
+        input=frame.data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=cf,
+    )
+    if p.returncode != 0:
+        raise RuntimeError(p.stderr.decode("utf-8", "replace").strip() or f"ffmpeg exit {p.returncode}")
+    return path
+
+# Kratak grabber za N frejmova kad nista ne snima izabranu oblast
+def build_grab_args(spec: RecordSpec, count: int, hz: float, ffmpeg_path: str = FFMPEG_PATH) -> List[str]:
+    grab = replace(spec, fps=max(1, int(-(-hz // 1))), record_audio=False)
+    filters = list(get_backend(spec.backend).vf_prefix) + [f"fps={hz:g}"]
+    args = [ffmpeg_path, "-hide_banner", "-nostdin", "-loglevel", "error"]
+    args += build_input_args(grab)
+    args += ["-vf", ",".join(filters), "-frames:v", str(count), "-pix_fmt", TAP_PIX_FMT, "-f", "rawvideo", "pipe:1"]
+    return args
+
+def grab_frames(spec: RecordSpec, count: int, hz: float, on_frame: Callable[[Frame], None],
+                ffmpeg_path: str = FFMPEG_PATH) -> int:
+    w, h = spec.width, spec.height
+    cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    proc = subprocess.Popen(
+        build_grab_args(spec, count, hz, ffmpeg_path),
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=cf,
+    )
+    got = 0
+    timer = threading.Timer(SHOT_TIMEOUT_SEC + count / hz, proc.kill)
+    timer.start()
+    try:
+        while got < count:
+            buf = bytearray(frame_bytes(w, h, TAP_PIX_FMT))
+            if read_full(proc.stdout, memoryview(buf)) < len(buf):
+                break
+            got += 1
+            on_frame(Frame(bytes(buf), w, h, TAP_PIX_FMT))
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        err = proc.stderr.read().decode("utf-8", "replace").strip()
+        proc.wait()
+    if got < count and err:
+        raise RuntimeError(err)
+    return got
+
+class Screenshotter:
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, workers: int = 0):
+        self.ffmpeg_path = ffmpeg_path
+        self.on_saved = Hook()   # (List[str] putanje)
+        self.on_failed = Hook()  # (reason)
+        self.on_log = Hook()     # (msg)
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers or max(1, min(SHOT_MAX_WORKERS, cpu_count())), thread_name_prefix="shot",
+        )
+
+    # Ne blokira: frejmovi se skupljaju na zasebnom tredu, a svaki odmah ide u pool
+    def shoot(self, spec: RecordSpec, root: str, count: int = 1, hz: float = SHOT_BURST_HZ, fmt: str = "png",
+              level: int = SHOT_PNG_LEVEL, tap: Optional[FrameTap] = None, tag=None) -> bool:
+        if fmt not in SHOT_FORMATS:
+            self.on_failed.emit(f"Nepoznat format screenshot-a: {fmt}")
+            return False
+        count, hz = max(1, int(count)), max(0.1, float(hz))
+        tag = spec.monitor_index if tag is None else tag
+        threading.Thread(target=self._collect, args=(spec, root, count, hz, fmt, level, tap, tag), daemon=True).start()
+        return True
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, spec, root, count, hz, fmt, level, tap, tag) -> None:
+        futures = []
+
+        def submit(frame: Frame) -> None:
+            path = shot_path(root, tag, len(futures) + 1, fmt)
+            futures.append(self.pool.submit(write_frame, frame, path, fmt, level, self.ffmpeg_path))
+
+        try:
+            got = 0
+            if tap is not None:
+                if tap.fps and hz > tap.fps:
+                    self.on_log.emit(f"Screenshot: {hz:g} Hz > tap {tap.fps:g} fps - burst ide brzinom tap-a.")
+                got = tap.take(count, 1.0 / hz, SHOT_TIMEOUT_SEC, submit)
+                if got < count:
+                    self.on_log.emit(f"Screenshot: tap je dao {got}/{count} frejmova (snimanje stalo?).")
+            if got == 0:
+                got = grab_frames(spec, count, hz, submit, self.ffmpeg_path)
+        except Exception as e:
+            self.on_failed.emit(f"Screenshot nije uspeo: {e}")
+            return
+
+        paths, errors = [], []
+        for f in futures:
+            try:
+                paths.append(str(f.result()))
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            self.on_failed.emit(f"Screenshot: {len(errors)} frejmova nije upisano ({errors[0]})")
+        if paths:
+            self.on_saved.emit(paths)
@@ -0,0 +1,311 @@
+import json
+import threading
+import time
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from .audio import separate_audio
+from .capture import RecordSpec, rendition_specs
+from .constants import ALIGN_MIN_OFFSET_MS, CORES_PER_ENCODER, FFMPEG_PATH, STATS_INTERVAL_SEC
+from .finalize import shift_start
+from .procstats import cpu_count, cpu_seconds
+from .recorder import Hook, RecState, Recorder
+
+# Multi-monitor sesija: vise izvora (monitora/regiona) sa zajednickim
+# start/stop/pause. "process" = jedan Recorder po izvoru (zasebni procesi,
+# posle stopa se pocetci poravnaju na zajednicku osu), "single" = jedan
+# FFmpeg proces sa vise ulaza i izlaza (poravnanje je prirodno).
+
+MULTI_MODES = {
+    "process": "Proces po izvoru",
+    "single": "Jedan proces, više ulaza",
+}
+
+def max_concurrent_encoders(cores: Optional[int] = None) -> int:
+    return max(1, (cores or cpu_count()) // CORES_PER_ENCODER)
+
+@dataclass
+class SourceUsage:
+    tag: str
+    state: str
+    fps: float = 0.0
+    speed: Optional[float] = None
+    drop_frames: int = 0
+    dup_frames: int = 0
+    cpu_pct: Optional[float] = None  # % jednog jezgra
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        speed = f"{self.speed:.2f}x" if self.speed is not None else "N/A"
+        cpu = f"{self.cpu_pct:.0f}%" if self.cpu_pct is not None else "N/A"
+        return f"{self.tag}: {self.fps:.1f} fps, {speed}, drop {self.drop_frames}, CPU {cpu}"
+
+class RecordingSession:
+    def __init__(self, ffmpeg_path: str = FFMPEG_PATH, mode: str = "process", max_encoders: Optional[int] = None):
+        self.ffmpeg_path = ffmpeg_path
+        self.mode = mode
+        self.max_encoders = max_encoders or max_concurrent_encoders()
+
+        self.on_state = Hook()       # (state)
+        self.on_status = Hook()      # (msg, color)
+        self.on_log_batch = Hook()   # (lines)
+        self.on_usage = Hook()       # (List[SourceUsage])
+        self.on_finished = Hook()    # (manifest path ili "")
+
+        self.state = RecState.IDLE
+        self.specs: List[RecordSpec] = []
+        self.tags: List[str] = []
+        self.recorders: List[Recorder] = []
+        self.t0 = 0.0
+        self.manifest_path: Optional[str] = None
+        self.is_paused = False
+
+        self._lock = threading.Lock()
+        self._stop_req = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._cpu_prev = {}
+
+    @property
+    def is_busy(self) -> bool:
+        return self.state not in (RecState.IDLE, RecState.FAILED)
+
+    @property
+    def is_recording(self) -> bool:
+        return self.state in (RecState.STARTING, RecState.RECORDING)
+
+    def _set_state(self, state: str) -> None:
+        with self._lock:
+            if self.state == state:
+                return
+            self.state = state
+        if state in (RecState.IDLE, RecState.FAILED):
+            self._idle.set()
+        self.on_state.emit(state)
+
+    def _status(self, msg: str, col: str) -> None:
+        self.on_status.emit(msg, col)
+
+    def log(self, msg: str) -> None:
+        self.on_log_batch.emit([f"[{datetime.now().strftime('%H:%M:%S')}] {msg}"])
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._idle.wait(timeout)
+
+    # --- Javni API
+    def start(self, specs: List[RecordSpec], tags: Optional[List[str]] = None) -> bool:
+        if self.is_busy or not specs:
+            return False
+        if self.mode not in MULTI_MODES:
+            self._status(f"Nepoznat multi mod: {self.mode}", "#FF4444")
+            return False
+        # Svaka dodatna verzija (proxy) je jos jedan enkoder; "single" ih ne snima
+        single = self.mode == "single"
+        encoders = sum(1 + (0 if single else len(rendition_specs(s))) for s in specs)
+        if encoders > self.max_encoders:
+            self._status(
+                f"Previše izvora: {encoders} enkodera > limit {self.max_encoders} ({cpu_count()} jezgara)", "#FF4444"
+            )
+            return False
+        if single and any(rendition_specs(s) for s in specs):
+            self.log("Jedan proces sa više ulaza snima samo glavne verzije - dodatne verzije (proxy) isključene.")
+
+        # Zajednicki pocetak upisan u svaki izlaz
+        self.t0 = time.time()
+        stamp = datetime.fromtimestamp(self.t0, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        self.tags = list(tags or [f"src{i + 1}" for i in range(len(specs))])
+        self.specs = [
+            replace(s, metadata=s.metadata + (("creation_time", stamp), ("comment", f"session {self.t0:.3f} {tag}")))
+            for s, tag in zip(specs, self.tags)
+        ]
+        if self.mode == "single" and any(s.record_audio for s in self.specs):
+            if separate_audio(self.specs[0]):
+                self.log("Jedan proces sa više ulaza: zasebni audio se spaja samo u prvi izvor.")
+            else:
+                self.log("Jedan proces sa više ulaza snima samo video - audio isključen.")
+
+        self.recorders = []
+        groups = [(self.specs[0], self.specs[1:])] if self.mode == "single" else [(s, ()) for s in self.specs]
+        for i, (spec, extra) in enumerate(groups):
+            rec = Recorder(self.ffmpeg_path)
+            tag = "multi" if extra else self.tags[i]
+            rec.on_log_batch.connect(lambda lines, tag=tag: self.on_log_batch.emit([f"[{tag}] {l}" for l in lines]))
+            self.recorders.append(rec)
+
+        with self._lock:
+            if self.is_busy:
+                return False
+            self.state = RecState.STARTING
+            self._idle.clear()
+        self.on_state.emit(RecState.STARTING)
+        self._stop_req.clear()
+        self.is_paused = False
+        self.manifest_path = None
+        self._cpu_prev = {}
+
+        # Svi procesi se podizu odmah jedan za drugim (start() ne blokira)
+        for rec, (spec, extra) in zip(self.recorders, groups):
+            if not rec.start(spec, extra=extra):
+                self.log(f"Izvor {spec.outfile} nije pokrenut.")
+                self._stop_req.set()
+                break
+        self._status(f"Pokrećem {len(self.specs)} izvora...", "#FFCC00")
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def stop(self) -> None:
+        if self.is_recording:
+            self._stop_req.set()
+
+    def pause_toggle(self) -> None:
+        if self.state != RecState.RECORDING:
+            return
+        for rec in self.recorders:
+            rec.pause_toggle()
+        self.is_paused = not self.is_paused
+        self._status("PAUZIRANO" if self.is_paused else "SNIMANJE", "#FFCC00" if self.is_paused else "#88FF88")
+
+    def close(self, timeout: float = 30.0) -> None:
+        self.stop()
+        self.wait(timeout)
+        for rec in self.recorders:
+            rec.close()
+
+    # --- Session tred
+    def _run(self) -> None:
+        recs = self.recorders
+        while not self._stop_req.wait(0.05):
+            states = [r.state for r in recs]
+            if all(s == RecState.RECORDING for s in states):
+                break
+            if any(s in (RecState.IDLE, RecState.FAILED) for s in states):
+                self.log("Jedan od izvora nije krenuo - zaustavljam sve.")
+                self._stop_req.set()
+
+        started = not self._stop_req.is_set()
+        if started:
+            offs = self.offsets()
+            self.log("Svi izvori snimaju. Pomak prvog frejma: " + ", ".join(
+                f"{t} {o:.0f} ms" for t, o in zip(self._rec_tags(), offs)
+            ))
+            self._set_state(RecState.RECORDING)
+            self._status(f"Snimanje u toku ({len(self.specs)} izvora)", "#88FF88")
+
+        last_usage = 0.0
+        while not self._stop_req.wait(0.2):
+            if any(not r.is_busy for r in recs):
+                # Izvor se ugasio sam - gasi se cela sesija da izlazi ostanu uskladjeni
+                self.log("Izvor se neočekivano ugasio - zaustavljam sve izvore.")
+                break
+            if time.perf_counter() - last_usage >= STATS_INTERVAL_SEC:
+                last_usage = time.perf_counter()
+                self.on_usage.emit(self.usage())
+
+        self._set_state(RecState.STOPPING)
+        self._status("Zaustavljam sve izvore...", "#FFCC00")
+        for r in recs:
+            r.stop()
+        for r in recs:
+            r.wait()
+
+        self._set_state(RecState.FINALIZING)
+        if started:
+            self._align()
+        self.manifest_path = self._write_manifest(started)
+        self.on_finished.emit(self.manifest_path or "")
+        ok = started and all(r.state == RecState.IDLE for r in recs)
+        self.is_paused = False
+        if ok:
+            self._status("Sačuvano.", "#88FF88")
+            self._set_state(RecState.IDLE)
+        else:
+            self._status("Multi snimanje nije uspelo.", "#FF4444")
+            self._set_state(RecState.FAILED)
+
+    def _rec_tags(self) -> List[str]:
+        return ["multi"] if self.mode == "single" else self.tags
+
+    # Pomak prvog frejma svakog procesa u odnosu na najraniji (ms)
+    def offsets(self) -> List[float]:
+        walls = [r.first_frame_wall for r in self.recorders]
+        known = [w for w in walls if w is not None]
+        if not known:
+            return [0.0] * len(walls)
+        base = min(known)
+        return [(w - base) * 1000.0 if w is not None else 0.0 for w in walls]
+
+    def _align(self) -> None:
+        if self.mode == "single":
+            return
+        for rec, tag, off in zip(self.recorders, self.tags, self.offsets()):
+            spec = rec.spec
+            if off < ALIGN_MIN_OFFSET_MS:
+                continue
+            if spec.output_mode == "segment" or (spec.output_mode == "fmp4" and not spec.faststart):
+                self.log(f"[{tag}] pomak {off:.0f} ms upisan samo u manifest ({spec.output_mode}).")
+                continue
+            ok, msg = shift_start(str(spec.outfile), off / 1000.0, self.ffmpeg_path)
+            self.log(f"[{tag}] poravnat početak (+{off:.0f} ms)" if ok else f"[{tag}] poravnanje nije uspelo: {msg}")
+
+    def usage(self) -> List[SourceUsage]:
+        out = []
+        now = time.perf_counter()
+        for rec, tag in zip(self.recorders, self._rec_tags()):
+            st = rec.latest_stats
+            u = SourceUsage(tag, rec.state)
+            if st is not None:
+                u.fps, u.speed, u.drop_frames, u.dup_frames = st.fps, st.speed, st.drop_frames, st.dup_frames
+            cpu = cpu_seconds(rec.proc) if rec.proc else None
+            prev = self._cpu_prev.get(tag)
+            if cpu is not None:
+                if prev and now > prev[0]:
+                    u.cpu_pct = round((cpu - prev[1]) / (now - prev[0]) * 100.0, 1)
+                self._cpu_prev[tag] = (now, cpu)
+            out.append(u)
+        return out
+
+    # Single: izvor 0 su delovi procesa, ostali su njegovi dodatni izlazi
+    def _outfiles(self, rec: Recorder, i: int) -> List[str]:
+        if self.mode != "single":
+            return rec.parts
+        if i == 0:
+            return list(rec.parts)
+        return rec.extra_files[i - 1:i] or [str(self.specs[i].outfile)]
+
+    def _write_manifest(self, started: bool) -> Optional[str]:
+        if not self.specs:
+            return None
+        path = Path(self.specs[0].outfile).with_name(
+            f"session_{datetime.fromtimestamp(self.t0).strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        offs = self.offsets()
+        sources = []
+        for i, (spec, tag) in enumerate(zip(self.specs, self.tags)):
+            rec = self.recorders[0] if self.mode == "single" else self.recorders[i]
+            st = rec.latest_stats
+            sources.append({
+                "tag": tag,
+                "monitor_index": spec.monitor_index,
+                "geometry": [spec.left, spec.top, spec.width, spec.height],
+                "outfiles": self._outfiles(rec, i),
+                "offset_ms": round(offs[0 if self.mode == "single" else i], 1),
+                "exit_code": rec.last_exit_code,
+                "last_stats": st.to_dict() if st else None,
+            })
+        data = {
+            "mode": self.mode,
+            "t0": datetime.fromtimestamp(self.t0, timezone.utc).isoformat(),
+            "started": started,
+            "sources": sources,
+        }
+        try:
+            path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        except OSError as e:
+            self.log(f"Manifest nije upisan: {e}")
+            return None
+        self.log(f"Sesija: {path}")
+        return str(path)
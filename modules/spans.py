@@ -0,0 +1,112 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from .constants import SPAN_HISTORY
+
+# Merenje latencija na putu hotkey -> prvi frejm -> zavrsen fajl. Iskljuceno
+# po defaultu: begin/end/record tada izlaze na prvoj liniji (bez sata, bez
+# alokacije). Ukljuceno: uzorci u memoriji (p50/p95) + jedna JSONL linija
+# po span-u sa id-jem sesije aplikacije.
+#   hotkey      WM_HOTKEY (vreme iz poruke) -> poziv kontrolera
+#   first_frame Popen -> prvi enkodovan frejm (armed: START -> prvi frejm)
+#   stop        stop() -> izlaz FFmpeg procesa
+#   finalize    izlaz procesa -> fajl spreman za puštanje (faststart/spajanje)
+
+@dataclass
+class SpanSummary:
+    name: str
+    count: int
+    p50: float
+    p95: float
+    last: float
+
+    def label(self) -> str:
+        return f"{self.name} {self.p50:.0f}/{self.p95:.0f} ms (n={self.count})"
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, math.ceil(pct / 100.0 * len(s)) - 1))  # nearest-rank
+    return s[k]
+
+class Spans:
+    def __init__(self, history: int = SPAN_HISTORY):
+        self.enabled = False
+        self.session = ""
+        self.history = history
+        self._open: Dict[tuple, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def enable(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is not None and self._file is None:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(path, "a", encoding="utf-8")
+            self.session = self.session or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+            self.enabled = True
+
+    def disable(self) -> None:
+        with self._lock:
+            self.enabled = False
+            self._open.clear()
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    # key razdvaja iste span-ove vise izvora (npr. id Recorder-a);
+    # t0 = perf_counter() pocetka ako je dogadjaj poceo ranije (vreme iz poruke)
+    def begin(self, name: str, key=None, t0: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        self._open[(name, key)] = time.perf_counter() if t0 is None else t0
+
+    def end(self, name: str, key=None, **attrs) -> Optional[float]:
+        if not self.enabled:
+            return None
+        t0 = self._open.pop((name, key), None)
+        if t0 is None:
+            return None
+        ms = (time.perf_counter() - t0) * 1000.0
+        if isinstance(key, str):  # ime tastera i sl.; id objekta se ne upisuje
+            attrs.setdefault("key", key)
+        self.record(name, ms, **attrs)
+        return ms
+
+    def cancel(self, name: str, key=None) -> None:
+        if self.enabled:
+            self._open.pop((name, key), None)
+
+    def record(self, name: str, ms: float, **attrs) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(
+            {"t": round(time.time(), 3), "session": self.session, "span": name, "ms": round(ms, 3), **attrs},
+            ensure_ascii=False, default=str,
+        )
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.history)).append(ms)
+            if self._file:
+                try:
+                    self._file.write(line + "\n")
+                    self._file.flush()
+                except (OSError, ValueError):
+                    pass
+
+    def summary(self) -> List[SpanSummary]:
+        with self._lock:
+            items = [(n, list(v)) for n, v in self._samples.items()]
+        return [SpanSummary(n, len(v), percentile(v, 50), percentile(v, 95), v[-1]) for n, v in items if v]
+
+# Jedna instanca po procesu: hotkey filter, Recorder i GUI dele isti span log
+SPANS = Spans()
@@ -0,0 +1,161 @@
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+from .capture import PIPE_PIX_FMT, RecordSpec, build_standby_args, frame_bytes, output_size
+from .constants import FFMPEG_PATH, STANDBY_PREROLL_SEC
+from .frametap import FrameTap, read_full
+
+# "Armed" rezim: grabber proces je vec pokrenut i uredjaj otvoren, frejmovi
+# se odbacuju. Na START se frejmovi od trenutka pritiska preusmeravaju u
+# stdin enkodera, pa gubitak pocetka zavisi samo od jednog frejma.
+class StandbyCapture:
+    def __init__(self, spec: RecordSpec, ffmpeg_path: str = FFMPEG_PATH, log: Optional[Callable[[str], None]] = None):
+        self.spec = spec
+        self.ffmpeg_path = ffmpeg_path
+        self.log = log or (lambda msg: None)
+        self.size = output_size(spec)
+        self.frame_size = frame_bytes(*self.size)
+        self.proc = None
+        self.paused = False
+        self.frames_grabbed = 0
+        self.frames_written = 0
+        self.go_latency_ms: Optional[float] = None
+        self.tap = FrameTap()  # screenshot-ovi dok je armed/snima
+
+        self._lock = threading.Lock()
+        self._sink = None
+        self._pending: Optional[Deque[bytes]] = None
+        self._max_pending = max(1, int(spec.fps * STANDBY_PREROLL_SEC))
+        self._t_go = 0.0
+        self._thread = None
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    @property
+    def live(self) -> bool:
+        return self._sink is not None or self._pending is not None
+
+    def matches(self, spec: RecordSpec) -> bool:
+        a, b = self.spec, spec
+        return (
+            (a.backend, a.left, a.top, a.width, a.height, a.fps, a.monitor_index, a.display, a.window)
+            == (b.backend, b.left, b.top, b.width, b.height, b.fps, b.monitor_index, b.display, b.window)
+            and output_size(a) == output_size(b)
+        )
+
+    def start(self) -> bool:
+        try:
+            args = build_standby_args(self.spec, self.ffmpeg_path)
+        except ValueError as e:
+            self.log(f"Standby error: {e}")
+            return False
+        self.log(f"STANDBY CMD: {' '.join(args)}")
+        try:
+            cf = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+            self.proc = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,
+                creationflags=cf,
+            )
+        except Exception as e:
+            self.log(f"Standby error: {e}")
+            self.proc = None
+            return False
+        threading.Thread(target=self._read_stderr, args=(self.proc,), daemon=True).start()
+        self.tap.open(self.spec.fps)
+        self._thread = threading.Thread(target=self._pump, args=(self.proc,), daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self.detach()
+        self.tap.close()
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            proc.kill()
+            try:
+                proc.wait(timeout=2.0)
+            except Exception:
+                pass
+
+    # START: od ovog trenutka frejmovi se cuvaju dok enkoder ne bude spreman
+    def go(self) -> None:
+        with self._lock:
+            self._pending = deque()
+            self._t_go = time.perf_counter()
+            self.go_latency_ms = None
+            self.frames_written = 0
+            self.paused = False
+
+    def attach(self, sink) -> None:
+        with self._lock:
+            pending, self._pending = self._pending or deque(), None
+            try:
+                while pending:
+                    sink.write(pending.popleft())
+                    self.frames_written += 1
+                self._sink = sink
+            except OSError:
+                self._sink = None
+
+    def detach(self) -> None:
+        with self._lock:
+            self._sink = None
+            self._pending = None
+
+    def _pump(self, proc) -> None:
+        buf = bytearray(self.frame_size)
+        mv = memoryview(buf)
+        while True:
+            try:
+                if read_full(proc.stdout, mv) < self.frame_size:
+                    break
+            except Exception:
+                break
+            self.frames_grabbed += 1
+            if self.tap.active:
+                self.tap.push(mv, self.size[0], self.size[1], PIPE_PIX_FMT)
+            with self._lock:
+                sink = self._sink
+                if sink is None and self._pending is not None and len(self._pending) < self._max_pending:
+                    self._pending.append(bytes(mv))
+                    self._mark_first()
+            if sink is None or self.paused:
+                continue
+            try:
+                sink.write(mv)
+                self.frames_written += 1
+                self._mark_first()
+            except OSError:
+                with self._lock:
+                    self._sink = None
+
+        # Grabber je pao - enkoder dobija EOF pa se fajl uredno zatvara
+        with self._lock:
+            sink, self._sink = self._sink, None
+        if sink is not None:
+            try:
+                sink.close()
+            except OSError:
+                pass
+        if self.proc is proc:
+            self.log("Standby grabber se ugasio.")
+
+    def _mark_first(self) -> None:
+        if self.go_latency_ms is None and self._t_go:
+            self.go_latency_ms = (time.perf_counter() - self._t_go) * 1000.0
+
+    def _read_stderr(self, proc) -> None:
+        for raw in iter(proc.stderr.readline, b""):
+            line = raw.decode("utf-8", "replace").strip()
+            if line:
+                self.log(f"standby: {line}")
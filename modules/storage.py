@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .capture import RecordSpec, output_size, rendition_specs
+from .constants import (
+    STORAGE_BPP_CRF23, STORAGE_FILE, STORAGE_HEADROOM, STORAGE_LOSSLESS_BPP, STORAGE_MIN_FREE_MB, STORAGE_PROBE_MB,
+    STORAGE_TTL_SEC, VIDEO_SUBDIR, ensure_dir,
+)
+
+# Disk kao deo snimanja: procena bitrate-a sesije, izmerena odrziva brzina
+# upisa po volumenu (kes, merenje u pozadini), staging folder na brzem disku
+# kad ciljni ne stize, i minimum slobodnog mesta koji Recorder prati.
+MB = 1024 * 1024
+
+@dataclass
+class StorageConfig:
+    staging_dir: str = ""                  # "" = bez staging-a, samo upozorenje
+    headroom: float = STORAGE_HEADROOM     # disk mora da drzi headroom x procenjen bitrate
+    min_free_mb: int = STORAGE_MIN_FREE_MB  # ispod ovoga snimanje se uredno zaustavlja
+
+    @classmethod
+    def from_cfg(cls, d: Optional[dict]) -> "StorageConfig":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (d or {}).items() if k in names})
+
+def volume_key(path: str) -> str:
+    # st_dev je na Windows-u serijski broj volumena, na Linux-u uredjaj
+    p = Path(path)
+    while not p.exists() and p != p.parent:
+        p = p.parent
+    return str(os.stat(p).st_dev)
+
+def free_bytes(path: str) -> Optional[int]:
+    p = Path(path)
+    while not p.exists() and p != p.parent:
+        p = p.parent
+    try:
+        return shutil.disk_usage(p).free
+    except OSError:
+        return None
+
+# Bajtova u sekundi: bits/piksel po kodeku (CRF: svakih 6 nize = duplo),
+# ukljucujuci dodatne verzije koje se pisu na isti disk
+def estimate_bytes_per_sec(spec: RecordSpec) -> float:
+    w, h = output_size(spec)
+    if spec.capture_codec:
+        bpp = STORAGE_LOSSLESS_BPP.get(spec.capture_codec, 12.0)
+    else:
+        bpp = STORAGE_BPP_CRF23 * 2 ** ((23 - spec.crf) / 6.0)
+    return w * h * spec.fps * bpp / 8.0 + sum(estimate_bytes_per_sec(rs) for rs in rendition_specs(spec))
+
+# Sekvencijalan upis sa fsync-om: keš OS-a ne sme da ulepsa rezultat
+def measure_write_mbps(folder: str, size_mb: int = STORAGE_PROBE_MB) -> float:
+    ensure_dir(Path(folder))
+    path = Path(folder) / f".write_probe_{os.getpid()}.tmp"
+    chunk = os.urandom(4 * MB)
+    t0 = time.perf_counter()
+    try:
+        with open(path, "wb", buffering=0) as f:
+            for _ in range(max(1, size_mb // 4)):
+                f.write(chunk)
+            os.fsync(f.fileno())
+        dt = time.perf_counter() - t0
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return max(1, size_mb // 4) * 4 / max(dt, 1e-6)
+
+class ThroughputCache:
+    def __init__(self, path: Path = STORAGE_FILE, ttl: float = STORAGE_TTL_SEC):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._data: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._busy = set()
+        self._pending = set()
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8")).get("volumes", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _save(self) -> None:
+        try:
+            ensure_dir(self.path.parent)
+            tmp = self.path.with_suffix(".tmp")
+            with self._lock:
+                tmp.write_text(json.dumps({"volumes": self._data}, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    # MB/s iz kesa; None = nema (ili je zastarelo) merenje za taj volumen
+    def get(self, folder: str) -> Optional[float]:
+        try:
+            key = volume_key(folder)
+        except OSError:
+            return None
+        with self._lock:
+            d = self._data.get(key)
+        if not d or time.time() - d.get("stamp", 0) > self.ttl:
+            return None
+        return float(d["mbps"])
+
+    def measure(self, folder: str) -> Optional[float]:
+        try:
+            key = volume_key(folder)
+            mbps = measure_write_mbps(folder)
+        except OSError:
+            return None
+        with self._lock:
+            self._data[key] = {"mbps": round(mbps, 1), "stamp": time.time(), "path": str(folder)}
+        self._save()
+        return mbps
+
+    # Merenje (64 MB upisa sa fsync-om) ne ide u start snimanja - tada bi
+    # se otimalo o disk sa enkoderom; folder ceka da aplikacija bude slobodna
+    def defer(self, folder: str) -> None:
+        with self._lock:
+            self._pending.add(str(folder))
+
+    def take_pending(self) -> List[str]:
+        with self._lock:
+            out, self._pending = sorted(self._pending), set()
+        return [f for f in out if self.get(f) is None]
+
+    def measure_async(self, folder: str, done: Optional[Callable[[Optional[float]], None]] = None) -> None:
+        folder = str(folder)
+        with self._lock:
+            if folder in self._busy:
+                return
+            self._busy.add(folder)
+
+        def run():
+            try:
+                mbps = self.measure(folder)
+            finally:
+                with self._lock:
+                    self._busy.discard(folder)
+            if done:
+                done(mbps)
+
+        threading.Thread(target=run, daemon=True).start()
+
+_CACHE: Optional[ThroughputCache] = None
+
+def throughput_cache() -> ThroughputCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ThroughputCache()
+    return _CACHE
+
+# Odluka pre starta (bez cekanja na merenje): uvek min. slobodnog mesta,
+# a ako ciljni disk ne stize procenjen bitrate - staging ili upozorenje.
+# Neizmeren disk se samo pamti (cache.defer) i meri kad snimanje stane.
+# ValueError = na disku vec nema mesta za pocetak.
+def plan(spec: RecordSpec, cfg: StorageConfig, log: Callable[[str], None],
+         cache: Optional[ThroughputCache] = None) -> RecordSpec:
+    cache = cache or throughput_cache()
+    folder = str(Path(spec.outfile).parent)
+    free = free_bytes(folder)
+    if free is not None and cfg.min_free_mb > 0 and free < cfg.min_free_mb * MB:
+        raise ValueError(f"Na disku ima samo {free / MB:.0f} MB slobodno (minimum {cfg.min_free_mb} MB).")
+    spec = replace(spec, min_free_mb=cfg.min_free_mb)
+    if spec.output_mode == "replay":
+        return spec
+
+    need = estimate_bytes_per_sec(spec) * cfg.headroom / MB
+    rate = cache.get(folder)
+    if rate is None:
+        log(f"Disk: brzina upisa za {folder} nije izmerena - merim posle snimanja.")
+        cache.defer(folder)
+        return spec
+    if free is not None:
+        log(f"Disk: procena {need / cfg.headroom:.1f} MB/s, disk {rate:.0f} MB/s, slobodno {free / MB / 1024:.1f} GB "
+            f"(~{free / MB / max(need / cfg.headroom, 0.01) / 60:.0f} min)")
+    if rate >= need:
+        return spec
+
+    log(f"UPOZORENJE: disk ({rate:.1f} MB/s) verovatno ne stize {need:.1f} MB/s za ovo snimanje.")
+    # Two-stage medjufajl je vec u scratch-u; nespojeni segmenti ostaju gde su
+    if not cfg.staging_dir or spec.capture_codec or (spec.output_mode == "segment" and not spec.faststart):
+        return spec
+    stage = Path(cfg.staging_dir) / VIDEO_SUBDIR
+    try:
+        if volume_key(str(stage)) == volume_key(folder):
+            log("Disk: staging folder je na istom disku - snimam direktno.")
+            return spec
+    except OSError:
+        return spec
+    srate = cache.get(str(stage))
+    if srate is None:
+        cache.defer(str(stage))
+        log("Disk: staging folder još nije izmeren - snimam direktno.")
+        return spec
+    sfree = free_bytes(str(stage))
+    if srate < need or (sfree is not None and sfree < cfg.min_free_mb * MB):
+        log(f"Disk: ni staging ({srate:.0f} MB/s) nije dovoljno brz - snimam direktno.")
+        return spec
+    ensure_dir(stage)
+    log(f"Disk: snimam u staging {stage} ({srate:.0f} MB/s), premeštam u {folder} posle stopa.")
+    return replace(spec, outfile=str(stage / Path(spec.outfile).name), stage_to=str(spec.outfile))
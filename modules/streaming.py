@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass, fields
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .constants import STREAM_QUEUE_PACKETS, STREAM_RETRY_SEC
+
+# Encode-once, output-many: isti enkodovani paketi idu u fajl i u stream
+# izlaze kroz FFmpeg "tee" muxer. Svaki stream je tee slave sa onfail=ignore
+# (pad streama ne gasi fajl) i svojim fifo redom: mreza ne koci enkoder,
+# pun red odbacuje pakete, a fifo sam ponovo otvara vezu (od keyframe-a).
+
+# Muxer po semi URL-a; sve ostalo (pipe, named pipe, fajl) dobija MPEG-TS
+STREAM_FORMATS = {"rtmp": "flv", "rtmps": "flv", "srt": "mpegts", "udp": "mpegts", "tcp": "mpegts"}
+
+@dataclass(frozen=True)
+class StreamTarget:
+    url: str
+    fmt: str = ""            # "" = po semi URL-a (STREAM_FORMATS)
+    reconnect: bool = True
+    retry_sec: float = STREAM_RETRY_SEC
+    max_retries: int = 0     # 0 = bez ograničenja
+    queue: int = STREAM_QUEUE_PACKETS
+
+    # Config: "rtmp://..." ili {"url": ..., "reconnect": false, ...}
+    @classmethod
+    def from_cfg(cls, d) -> "StreamTarget":
+        if isinstance(d, str):
+            d = {"url": d}
+        names = {f.name for f in fields(cls)}
+        t = cls(**{k: v for k, v in (d or {}).items() if k in names})
+        if not str(t.url).strip():
+            raise ValueError("Stream izlaz bez URL-a.")
+        return t
+
+    @property
+    def muxer(self) -> str:
+        return self.fmt or stream_format(self.url)
+
+    @property
+    def label(self) -> str:
+        return mask_url(self.url)
+
+def stream_format(url: str) -> str:
+    return STREAM_FORMATS.get(urlsplit(url).scheme.lower(), "mpegts")
+
+def parse_targets(items: Optional[Iterable]) -> Tuple[StreamTarget, ...]:
+    return tuple(StreamTarget.from_cfg(d) for d in (items or ()))
+
+# Stream key (poslednji deo RTMP putanje), lozinke i SRT passphrase ne idu u log
+_SECRET_QUERY = re.compile(r"((?:passphrase|streamid|key|token|password)=)[^&]*", re.I)
+
+def mask_url(url: str) -> str:
+    p = urlsplit(url)
+    if p.scheme.lower() in ("rtmp", "rtmps") and p.path.count("/") >= 2:
+        head, _, key = url.partition("?")[0].rpartition("/")
+        if key:
+            url = head + "/***" + url[len(head) + 1 + len(key):]
+    if p.password:
+        url = url.replace(f":{p.password}@", ":***@", 1)
+    return _SECRET_QUERY.sub(r"\1***", url)
+
+# tee string se raspakuje dva puta (slave-ovi pa opcije slave-a), pa se
+# vrednosti opcija escape-uju dvaput, a cilj jednom
+def tee_escape(text: str) -> str:
+    return re.sub(r"([\\:|\[\]'])", r"\\\1", text)
+
+def tee_slave(opts: List[Tuple[str, str]], target: str) -> str:
+    inner = ":".join(f"{k}={tee_escape(str(v))}" for k, v in opts)
+    return tee_escape(f"[{inner}]{target}")
+
+def stream_slave_opts(t: StreamTarget) -> List[Tuple[str, str]]:
+    fifo = [("queue_size", str(max(1, int(t.queue)))), ("drop_pkts_on_overflow", "1")]
+    if t.reconnect:
+        fifo += [
+            ("attempt_recovery", "1"), ("recover_any_error", "1"), ("restart_with_keyframe", "1"),
+            ("recovery_wait_time", f"{max(0.1, float(t.retry_sec)):g}"),
+            ("max_recovery_attempts", str(max(0, int(t.max_retries)))),
+        ]
+    opts = [
+        ("f", t.muxer), ("onfail", "ignore"), ("use_fifo", "1"),
+        ("fifo_options", ":".join(f"{k}={v}" for k, v in fifo)),
+    ]
+    if t.muxer == "flv":
+        # Live cilj: bez povratnog upisa trajanja/velicine u header
+        opts.append(("flvflags", "no_duration_filesize"))
+    return opts
+
+# Fajl (muxer iz build_muxer-a) je prvi slave i ostaje onfail=abort
+def build_tee_target(fmt: Optional[str], opts: List[Tuple[str, str]], target: str,
+                     streams: Iterable[StreamTarget]) -> str:
+    file_opts = ([("f", fmt)] if fmt else []) + list(opts)
+    return "|".join([tee_slave(file_opts, target)] + [tee_slave(stream_slave_opts(t), t.url) for t in streams])
+
+# Stanje stream izlaza iz stderr-a FFmpeg-a (loglevel error):
+#   [fifo @ 0x..] Error opening rtmp://...: Connection refused   -> novi pokusaj
+#   [tee @ 0x..] Slave muxer #2 failed: I/O error, continuing with 2/3 slaves.  -> izlaz ugasen
+_OPEN_ERR = re.compile(r"Error opening (.+?): (.+)$")
+_SLAVE_FAILED = re.compile(r"Slave muxer #(\d+) failed: (.+?), continuing")
+
+class StreamMonitor:
+    def __init__(self, targets: Iterable[StreamTarget]):
+        self.targets = list(targets)
+        self.retries = [0] * len(self.targets)
+        self.lost = [False] * len(self.targets)
+
+    # I u obliku iz tee stringa (CMD linija)
+    def mask(self, text: str) -> str:
+        for t in self.targets:
+            for url in (t.url, tee_escape(t.url)):
+                if url in text:
+                    text = text.replace(url, t.label)
+        return text
+
+    # Novi FFmpeg proces (adaptivni deo) ponovo otvara sve izlaze
+    def reopen(self) -> None:
+        self.lost = [False] * len(self.targets)
+
+    # -> (indeks izlaza, "retry"/"lost", poruka) ili None; dok cilj ne
+    # odgovara javlja se prvi i svaki deseti neuspeo pokusaj
+    def feed(self, line: str) -> Optional[Tuple[int, str, str]]:
+        m = _SLAVE_FAILED.search(line)
+        if m:
+            i = int(m.group(1)) - 1  # slave #0 je fajl
+            if 0 <= i < len(self.targets) and not self.lost[i]:
+                self.lost[i] = True
+                return i, "lost", f"Stream {self.targets[i].label} je ugašen ({m.group(2)}) - snimanje u fajl se nastavlja."
+            return None
+        m = _OPEN_ERR.search(line)
+        if m:
+            for i, t in enumerate(self.targets):
+                if t.url == m.group(1) and not self.lost[i]:
+                    self.retries[i] += 1
+                    n = self.retries[i]
+                    if t.reconnect and (n == 1 or n % 10 == 0):
+                        return i, "retry", (
+                            f"Stream {t.label}: veza nije uspela ({m.group(2)}, pokušaj {n}) - "
+                            f"novi pokušaj za {t.retry_sec:g} s."
+                        )
+                    return None
+        return None
+
+    def summary(self) -> List[str]:
+        out = []
+        for t, n, lost in zip(self.targets, self.retries, self.lost):
+            if lost:
+                out.append(f"Stream {t.label}: ugašen tokom snimanja.")
+            elif n:
+                out.append(f"Stream {t.label}: {n} neuspelih pokušaja povezivanja.")
+        return out
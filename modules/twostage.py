@@ -0,0 +1,85 @@
+import os
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .capture import CAPTURE_CODECS, ENCODERS, RecordSpec
+from .constants import TWO_STAGE_CAP_GB, TWO_STAGE_CODEC, TWO_STAGE_SUBDIR, TWO_STAGE_X264_PRESET, ensure_dir
+
+# Two-stage snimanje: tokom snimanja samo jeftin lossless kodek u scratch
+# folder (CPU ostaje igri/demou), a finalni fajl pravi "transcode" posao iz
+# reda poslova sporijim, efikasnijim presetom. Disk za CPU headroom.
+
+@dataclass
+class TwoStageConfig:
+    codec: str = TWO_STAGE_CODEC
+    preset: str = ""             # "" = TWO_STAGE_X264_PRESET / najsporiji preset enkodera
+    cap_gb: float = TWO_STAGE_CAP_GB
+
+    @classmethod
+    def from_cfg(cls, d: Optional[dict]) -> "TwoStageConfig":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (d or {}).items() if k in names})
+
+def intermediate_dir(scratch_root: str) -> Path:
+    return Path(scratch_root) / TWO_STAGE_SUBDIR
+
+def scratch_used(folder: Path) -> int:
+    total = 0
+    try:
+        with os.scandir(folder) as it:
+            for de in it:
+                if de.is_file():
+                    total += de.stat().st_size
+    except OSError:
+        pass
+    return total
+
+def transcode_preset(encoder: str, preset: str = "") -> str:
+    if preset:
+        return preset
+    if encoder == "libx264":
+        return TWO_STAGE_X264_PRESET
+    return ENCODERS[encoder].presets[-1] if encoder in ENCODERS else ""
+
+# Spec prvog koraka: isti izvor i oblast, izlaz .mkv u scratch (citljiv i
+# posle pada), enkoder/CRF ostaju u spec-u za transcode. None = nema mesta.
+def plan(spec: RecordSpec, scratch_root: str, cfg: TwoStageConfig, log: Callable[[str], None]) -> Optional[RecordSpec]:
+    if cfg.codec not in CAPTURE_CODECS:
+        log(f"Two-stage: nepoznat kodek '{cfg.codec}' - direktan enkod.")
+        return None
+    if spec.output_mode == "replay":
+        return None
+    if spec.streams or spec.renditions:
+        # Stream izlazi i dodatne verzije traze finalni enkod vec tokom snimanja
+        log("Two-stage: snimanje sa stream izlazima / dodatnim verzijama - direktan enkod.")
+        return None
+    folder = intermediate_dir(scratch_root)
+    ensure_dir(folder)
+    cap = int(cfg.cap_gb * 1024 ** 3)
+    free = cap - scratch_used(folder)
+    if free <= 0:
+        log(f"Two-stage: scratch ({folder}) je pun ({cfg.cap_gb:g} GB na čekanju za transcode) - direktan enkod.")
+        return None
+    final = Path(spec.outfile)
+    return replace(
+        spec, outfile=str(folder / f"{final.stem}.mkv"), capture_codec=cfg.codec, transcode_to=str(final),
+        output_mode="mp4", faststart=False, max_bytes=free,
+    )
+
+# Deo snimka (adaptivni delovi dele stem) -> finalni fajl u output folderu
+def final_path(spec: RecordSpec, part: str) -> str:
+    return str(Path(spec.transcode_to).with_name(Path(part).stem + Path(spec.transcode_to).suffix))
+
+def transcode_params(spec: RecordSpec, cfg: TwoStageConfig) -> Dict[str, str]:
+    return {
+        "encoder": spec.encoder, "preset": transcode_preset(spec.encoder, cfg.preset), "crf": str(spec.crf),
+        "threads": str(spec.threads),
+    }
+
+def transcode_jobs(spec: RecordSpec, parts: List[str], cfg: TwoStageConfig) -> List[tuple]:
+    # (src, dst, params) za svaki deo koji postoji
+    params = transcode_params(spec, cfg)
+    return [
+        (p, final_path(spec, p), params) for p in parts if os.path.isfile(p) and os.path.getsize(p) > 0
+    ]
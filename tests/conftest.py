@@ -0,0 +1,16 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Testovi uvoze modules.* iz korena repoa (bez instalacije paketa)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Testovi koji pokrecu pravi FFmpeg (lavfi izvor) - bez njega se preskacu
+@pytest.fixture
+def ffmpeg():
+    path = shutil.which("ffmpeg")
+    if path is None:
+        pytest.skip("ffmpeg nije u PATH-u")
+    return path
@@ -0,0 +1,96 @@
+from modules.adaptive import AdaptiveConfig, AdaptiveController, QualityLevel, apply_level, build_ladder
+from modules.capture import RecordSpec
+from modules.constants import STATS_WARMUP_SEC
+from modules.progress import EncoderStats
+
+def _spec(fps=60, preset="veryfast"):
+    return RecordSpec(0, 0, 1920, 1080, fps, 23, "out.mp4", x264_preset=preset)
+
+def test_ladder_presets_then_fps_then_scale():
+    ladder = build_ladder(_spec(), AdaptiveConfig())
+    assert ladder == [
+        QualityLevel("veryfast", 60), QualityLevel("superfast", 60), QualityLevel("ultrafast", 60),
+        QualityLevel("ultrafast", 48), QualityLevel("ultrafast", 30),
+        QualityLevel("ultrafast", 30, 0.75), QualityLevel("ultrafast", 30, 0.5),
+    ]
+
+def test_ladder_without_geometry_changes_only_preset():
+    ladder = build_ladder(_spec(), AdaptiveConfig(), allow_geometry=False)
+    assert [l.preset for l in ladder] == ["veryfast", "superfast", "ultrafast"]
+    assert {(l.fps, l.scale) for l in ladder} == {(60, 1.0)}
+
+def test_ladder_respects_min_fps():
+    ladder = build_ladder(_spec(fps=30, preset="ultrafast"), AdaptiveConfig(min_fps=24, allow_scale=False))
+    assert [l.fps for l in ladder] == [30, 24]
+
+def test_apply_level_keeps_even_dimensions():
+    spec = apply_level(RecordSpec(0, 0, 1366, 768, 60, 23, "out.mp4"), QualityLevel("ultrafast", 30, 0.75))
+    assert (spec.x264_preset, spec.fps, spec.res_mode, spec.custom_wh) == ("ultrafast", 30, "Custom", (1024, 576))
+
+# Simulirani -progress tok: speed, udeo drop frejmova i CPU (deo svih jezgara)
+class Feed:
+    def __init__(self, ctl, fps=60):
+        self.ctl, self.fps = ctl, fps
+        self.now = self.out = self.cpu = 0.0
+        self.frames = self.drops = 0
+
+    def run(self, seconds, speed=1.0, drop=0.0, cpu=0.2, step=0.5):
+        decisions = []
+        for _ in range(int(seconds / step)):
+            self.now += step
+            self.out += speed * step
+            n = int(round(self.fps * speed * step))
+            self.frames += n
+            self.drops += int(round(n * drop))
+            self.cpu += cpu * self.ctl._ncpu * step
+            st = EncoderStats(frame=self.frames, out_time_sec=self.out, drop_frames=self.drops)
+            d = self.ctl.feed(st, self.cpu, self.now)
+            if d:
+                decisions.append((round(self.now, 1), d[0]))
+        return decisions
+
+def _ctl(**kw):
+    ctl = AdaptiveController(_spec(), AdaptiveConfig(**kw))
+    ctl._ncpu = 4
+    return ctl
+
+def test_no_decision_during_warmup():
+    f = Feed(_ctl())
+    assert f.run(STATS_WARMUP_SEC - 0.5, speed=0.5) == []
+
+def test_steps_down_after_hold_and_waits_for_apply():
+    ctl = _ctl()
+    f = Feed(ctl)
+    f.run(STATS_WARMUP_SEC + 6, speed=1.0)
+    d = f.run(10, speed=0.8)
+    assert len(d) == 1 and d[0][1] == 1
+    assert ctl.pending == 1 and f.run(5, speed=0.5) == []
+    ctl.applied(f.now)
+    assert ctl.level == 1 and ctl.pending is None
+
+def test_drops_count_as_behind():
+    f = Feed(_ctl())
+    assert [lvl for _, lvl in f.run(STATS_WARMUP_SEC + 12, speed=1.0, drop=0.05)] == [1]
+
+def test_steps_up_only_after_long_idle_headroom():
+    cfg = dict(up_hold_sec=20.0, cooldown_sec=5.0)
+    ctl = _ctl(**cfg)
+    ctl.level = 2
+    f = Feed(ctl)
+    assert f.run(STATS_WARMUP_SEC + 15, cpu=0.1) == []
+    d = f.run(20, cpu=0.1)
+    assert [lvl for _, lvl in d] == [1]
+    # Visok CPU: nema penjanja
+    ctl.applied(f.now)
+    assert f.run(60, cpu=0.9) == []
+
+def test_quick_fall_after_step_up_doubles_backoff():
+    ctl = _ctl(up_hold_sec=20.0)
+    ctl.level = 1
+    f = Feed(ctl)
+    f.run(STATS_WARMUP_SEC + 30, cpu=0.1)
+    ctl.applied(f.now)
+    assert ctl.level == 0
+    # Posle promene: ponovo warmup + pun prozor + down_hold (< up_hold)
+    f.run(STATS_WARMUP_SEC + 10, speed=0.7)
+    assert ctl.pending == 1 and ctl._backoff == 2.0
@@ -0,0 +1,31 @@
+import json
+
+from modules.audio import AudioDevice, AudioDeviceCache, resolve_audio
+from modules.capture import RecordSpec
+from modules.constants import AUDIO_DEFAULT_DEVICE
+
+def _cache(tmp_path, devices):
+    path = tmp_path / "audio_devices.json"
+    path.write_text(json.dumps({"stamp": 0.0, "devices": [d.__dict__ for d in devices]}), encoding="utf-8")
+    return AudioDeviceCache(path=path)
+
+def _spec(*devices):
+    return RecordSpec(0, 0, 640, 480, 30, 23, "out.mp4", record_audio=True, audio_devices=tuple(devices))
+
+def test_missing_default_device_falls_back_to_loopback(tmp_path):
+    cache = _cache(tmp_path, [
+        AudioDevice("alsa_input.mic", kind="pulse"),
+        AudioDevice("alsa_output.monitor", kind="pulse", loopback=True),
+    ])
+    spec = resolve_audio(_spec(AUDIO_DEFAULT_DEVICE), lambda msg: None, cache)
+    assert spec.record_audio and spec.audio_devices == ("alsa_output.monitor",)
+
+def test_missing_named_device_is_dropped_without_fallback(tmp_path):
+    cache = _cache(tmp_path, [AudioDevice("Monitor", loopback=True)])
+    spec = resolve_audio(_spec("USB Mic"), lambda msg: None, cache)
+    assert not spec.record_audio and spec.audio_devices == ()
+
+def test_partial_name_resolves_and_duplicates_collapse(tmp_path):
+    cache = _cache(tmp_path, [AudioDevice("Stereo Mix (Realtek(R) Audio)", loopback=True)])
+    spec = resolve_audio(_spec("stereo mix", AUDIO_DEFAULT_DEVICE), lambda msg: None, cache)
+    assert spec.audio_devices == ("Stereo Mix (Realtek(R) Audio)",)
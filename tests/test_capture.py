@@ -0,0 +1,133 @@
+import subprocess
+
+import pytest
+
+from modules.capture import (
+    FRAG_MOVFLAGS, RecordSpec, build_muxer, build_record_args, part_path, rendition_path, rendition_spec,
+    rendition_specs, segment_list_path, segment_pattern,
+)
+from modules.constants import Rendition
+from modules.library import probe_media
+
+def _spec(**kw):
+    kw.setdefault("backend", "lavfi")
+    return RecordSpec(0, 0, 1280, 720, 30, 23, "/out/capture.mp4", **kw)
+
+def _after(args, flag):
+    return args[args.index(flag) + 1]
+
+def test_default_mp4_command():
+    args = build_record_args(_spec(), ffmpeg_path="ffmpeg", loglevel="error")
+    assert args[:5] == ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    assert _after(args, "-i") == "testsrc2=size=1280x720:rate=30"
+    assert _after(args, "-c:v") == "libx264"
+    assert _after(args, "-preset") == "veryfast"
+    assert _after(args, "-crf") == "23"
+    assert _after(args, "-r") == "30"
+    assert args[-1] == "/out/capture.mp4"
+    # Klasican MP4: bez mape, muxera i GOP-a (sve podrazumevano)
+    assert "-map" not in args and "-f" not in args[args.index("-c:v"):] and "-g" not in args
+
+def test_custom_resolution_scales():
+    args = build_record_args(_spec(res_mode="Custom", custom_wh=(640, 360)))
+    assert _after(args, "-vf") == "scale=640:360"
+
+def test_progress_url():
+    args = build_record_args(_spec(), progress="pipe:1")
+    assert _after(args, "-progress") == "pipe:1"
+    assert "-nostats" in args
+
+def test_fmp4_muxer_and_gop_follow_fragment():
+    spec = _spec(output_mode="fmp4", frag_sec=1.5, frag_size_mb=4)
+    fmt, opts, target = build_muxer(spec)
+    assert fmt == "mp4" and target == "/out/capture.mp4"
+    d = dict(opts)
+    assert d["movflags"] == FRAG_MOVFLAGS
+    assert d["frag_duration"] == "1500000"
+    assert d["frag_size"] == str(4 * 1024 * 1024)
+    args = build_record_args(spec)
+    assert _after(args, "-g") == "45"
+    assert args[-3:] == ["-f", "mp4", "/out/capture.mp4"]
+
+def test_segment_muxer():
+    fmt, opts, target = build_muxer(_spec(output_mode="segment", segment_sec=60))
+    d = dict(opts)
+    assert fmt == "segment"
+    assert target == segment_pattern("/out/capture.mp4")
+    assert d["segment_time"] == "60"
+    assert d["segment_list"] == segment_list_path("/out/capture.mp4")
+
+def test_unknown_output_mode():
+    with pytest.raises(ValueError):
+        build_muxer(_spec(output_mode="avi"))
+
+def test_part_path():
+    assert part_path("/out/capture.mp4", 2).replace("\\", "/") == "/out/capture_p02.mp4"
+
+def test_rendition_path():
+    assert rendition_path("/out/capture.mp4", "720p").replace("\\", "/") == "/out/capture_720p.mp4"
+
+def test_rendition_spec_size_and_encoder():
+    rs = rendition_spec(_spec(), Rendition("proxy", 405, 28, "ultrafast"))
+    # 1280 * 405 / 720 = 720 (sirina parna), visina 405 -> 404
+    assert rs.custom_wh == (720, 404) and rs.res_mode == "Custom"
+    assert (rs.crf, rs.encoder, rs.x264_preset) == (28, "libx264", "ultrafast")
+    assert rs.outfile.replace("\\", "/") == "/out/capture_proxy.mp4" and rs.renditions == ()
+    assert rendition_spec(_spec(), Rendition("up", 1080)) is None
+
+def test_rendition_specs_skip_two_stage():
+    r = (Rendition("360p", 360), Rendition("4k", 2160))
+    assert [s.custom_wh for s in rendition_specs(_spec(renditions=r))] == [(640, 360)]
+    assert rendition_specs(_spec(renditions=r, capture_codec="ffv1")) == []
+
+def test_rendition_args_split_once():
+    spec = _spec(renditions=(Rendition("360p", 360, 28), Rendition("full", 0, 30)))
+    args = build_record_args(spec)
+    assert "-vf" not in args
+    graph = _after(args, "-filter_complex")
+    assert graph == "[0:v]format=yuv420p,split=3[s0][s1][s2];[s1]scale=640:360[v1]"
+    maps = [args[i + 1] for i, a in enumerate(args) if a == "-map"]
+    assert maps == ["[s0]", "[v1]", "[s2]"]
+    assert [args[i + 1] for i, a in enumerate(args) if a == "-crf"] == ["23", "28", "30"]
+    outs = [a.replace("\\", "/") for a in args if a.startswith(("/out", "\\out"))]
+    assert outs == ["/out/capture.mp4", "/out/capture_360p.mp4", "/out/capture_full.mp4"]
+
+def test_rendition_args_dedup_before_split():
+    graph = _after(build_record_args(_spec(dedup=True, renditions=(Rendition("360p", 360),))), "-filter_complex")
+    pre, rest = graph.split(",split=2")
+    assert "mpdecimate" in pre and "mpdecimate" not in rest
+
+def test_record_with_rendition(ffmpeg, tmp_path):
+    out = tmp_path / "a.mp4"
+    args = build_record_args(
+        RecordSpec(0, 0, 320, 240, 15, 30, str(out), backend="lavfi", renditions=(Rendition("120p", 120),)),
+        ffmpeg_path=ffmpeg,
+    )
+    i = args.index("-i")
+    args[i:i] = ["-t", "1"]  # lavfi izvor inace nema kraj
+    assert subprocess.run(args, capture_output=True, timeout=60).returncode == 0
+    main = probe_media(str(out), ffmpeg)
+    assert (main["width"], main["height"]) == (320, 240)
+    small = probe_media(rendition_path(str(out), "120p"), ffmpeg)
+    assert (small["width"], small["height"]) == (160, 120)
+
+def test_dedup_filter_and_vfr_encoder_args():
+    args = build_record_args(_spec(dedup=True, dedup_threshold=600, dedup_max_sec=1.0))
+    assert _after(args, "-vf") == "mpdecimate=hi=600:lo=250:frac=0.33:max=30:keep=15"
+    assert _after(args, "-vsync") == "vfr" and "-r" not in args
+    # Lookahead kraci od keep-a, GOP se ne meri brojem frejmova
+    assert _after(args, "-rc-lookahead") == "7" and "-g" not in args
+
+def test_dedup_keyframes_follow_time():
+    args = build_record_args(_spec(dedup=True, output_mode="fmp4", frag_sec=1.5))
+    assert _after(args, "-force_key_frames") == "expr:gte(t,n_forced*1.5)" and "-g" not in args
+    assert "-rc-lookahead" not in build_record_args(_spec(dedup=True, encoder="h264_nvenc"))
+
+def test_record_with_dedup(ffmpeg, tmp_path):
+    out = tmp_path / "a.mp4"
+    args = build_record_args(RecordSpec(0, 0, 320, 240, 15, 30, str(out), backend="lavfi", dedup=True),
+                             ffmpeg_path=ffmpeg)
+    i = args.index("-i")
+    args[i:i] = ["-t", "1"]
+    assert subprocess.run(args, capture_output=True, timeout=60).returncode == 0
+    assert probe_media(str(out), ffmpeg)["duration"] > 0.5
@@ -0,0 +1,84 @@
+import json
+import socket
+
+import pytest
+
+from modules import control
+from modules.control import ControlClient, ControlServer
+from modules.recorder import Hook
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(control, "CONTROL_FILE", tmp_path / "control.json")
+    calls = []
+
+    def marker(cmd):
+        if not cmd.get("label"):
+            raise ValueError("Marker bez oznake.")
+        calls.append(cmd["label"])
+        return {"index": len(calls)}
+
+    srv = ControlServer({"marker": marker, "boom": lambda cmd: 1 / 0}, port=0, token="s3cret")
+    assert srv.start()
+    srv.calls = calls
+    yield srv
+    srv.stop()
+
+def test_port_file_and_round_trip(server, tmp_path):
+    info = json.loads((tmp_path / "control.json").read_text(encoding="utf-8"))
+    assert info["port"] == server.port
+    c = ControlClient(server.port, token="s3cret")
+    try:
+        assert c.call("ping")["ok"]
+        r = c.call("marker", label="intro")
+        assert r["ok"] and r["index"] == 1 and r["id"] == 2 and r["ms"] >= 0
+        assert server.calls == ["intro"]
+    finally:
+        c.close()
+    server.stop()
+    assert not (tmp_path / "control.json").exists()
+
+def test_errors_are_replies(server):
+    c = ControlClient(server.port, token="s3cret")
+    try:
+        r = c.call("marker")
+        assert (r["id"], r["ok"], r["error"]) == (1, False, "Marker bez oznake.")
+        assert not c.call("nope")["ok"]
+        assert not c.call("boom")["ok"]
+        assert c.call("ping")["ok"]  # veza ostaje otvorena
+    finally:
+        c.close()
+
+def test_token_is_required(server):
+    c = ControlClient(server.port)
+    try:
+        r = c.call("marker", label="x")
+        assert not r["ok"] and "token" in r["error"].lower()
+        assert server.calls == []
+    finally:
+        c.close()
+
+def test_malformed_line(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as s:
+        s.sendall(b"not json\n")
+        reply = json.loads(s.makefile("rb").readline())
+    assert not reply["ok"] and reply["error"].startswith("Neispravna komanda")
+
+def test_subscribed_events_are_filtered(server):
+    rec = type("Rec", (), {})()
+    for name in ("on_state", "on_status", "on_started", "on_failed", "on_process_ended", "on_stats", "on_stream"):
+        setattr(rec, name, Hook())
+    rec.parts, rec.start_latency_ms = ["a.mp4"], 12.5
+    server.attach(rec)
+    c = ControlClient(server.port, token="s3cret")
+    try:
+        assert c.call("subscribe", events=["state", "ended"])["ok"]
+        rec.on_status.emit("ignored", "#fff")
+        rec.on_state.emit("recording")
+        rec.on_process_ended.emit(0)
+        events = c.events()
+        first, second = next(events), next(events)
+    finally:
+        c.close()
+    assert (first["event"], first["state"]) == ("state", "recording")
+    assert (second["event"], second["exit_code"], second["files"]) == ("ended", 0, ["a.mp4"])
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from modules.capture import RecordSpec, frame_bytes
+from modules.framesource import BufferPool, FramePipeline, SyntheticSource, make_source
+from modules.library import probe_media
+from modules.recorder import RecState, Recorder
+
+class MemorySink:
+    def __init__(self, delay_at=None, delay=0.0):
+        self.frames = []
+        self.delay_at, self.delay = delay_at, delay
+
+    def write(self, mv):
+        if len(self.frames) == self.delay_at:
+            time.sleep(self.delay)
+        self.frames.append(bytes(mv))
+
+def test_source_validation():
+    with pytest.raises(ValueError):
+        SyntheticSource(321, 240, 30)
+    with pytest.raises(ValueError):
+        make_source("webcam", 320, 240, 30)
+
+def test_synthetic_frames_move():
+    src = SyntheticSource(64, 32, 30)
+    size = frame_bytes(64, 32)
+    a, b = bytearray(size), bytearray(size)
+    src.fill(memoryview(a), 0)
+    src.fill(memoryview(b), 1)
+    assert a != b
+    src.fill(memoryview(b), 0)
+    assert a == b
+
+def test_pool_backpressure():
+    pool = BufferPool(16, count=2)
+    i, j = pool.acquire(), pool.acquire()
+    assert {i, j} == {0, 1} and pool.acquire(timeout=0.01) is None
+    pool.release(i)
+    assert pool.acquire(timeout=0.01) == i
+    pool.close()
+
+def _run(sink, seconds, fps=30):
+    pipe = FramePipeline(SyntheticSource(64, 32, fps))
+    assert pipe.start()
+    pipe.go()
+    pipe.attach(sink)
+    time.sleep(seconds)
+    pipe.detach()
+    stats = pipe.stats()
+    pipe.stop()
+    return pipe, stats
+
+def test_pipeline_paces_to_wall_clock():
+    sink = MemorySink()
+    pipe, stats = _run(sink, 1.0)
+    assert 24 <= stats["written"] <= 33
+    assert all(len(f) == pipe.frame_size for f in sink.frames)
+    assert sink.frames[0] != sink.frames[1]
+    assert pipe.go_latency_ms is not None
+
+def test_slow_sink_repeats_frames_to_keep_timeline():
+    sink = MemorySink(delay_at=5, delay=0.3)
+    _, stats = _run(sink, 1.5)
+    assert stats["repeated"] > 0 and stats["dropped"] == 0
+    assert 36 <= stats["written"] <= 48
+
+def test_recorder_encodes_from_pipeline(ffmpeg, tmp_path):
+    out = tmp_path / "pipe.mp4"
+    spec = RecordSpec(0, 0, 320, 240, 30, 30, str(out), backend="lavfi")
+    pipe = FramePipeline(SyntheticSource(320, 240, 30))
+    assert pipe.matches(spec) and pipe.start()
+    rec = Recorder(ffmpeg)
+    try:
+        assert rec.start(spec, standby=pipe)
+        deadline = time.time() + 15
+        while rec.state == RecState.STARTING and time.time() < deadline:
+            time.sleep(0.02)
+        assert rec.state == RecState.RECORDING
+        time.sleep(1.5)
+        rec.stop()
+        assert rec.wait(30)
+    finally:
+        rec.close()
+        pipe.stop()
+    assert rec.last_exit_code == 0
+    meta = probe_media(str(out), ffmpeg)
+    assert (meta["width"], meta["height"]) == (320, 240) and meta["duration"] >= 1.0
@@ -0,0 +1,40 @@
+import threading
+import time
+
+from modules.frametap import FrameTap
+
+# Producer gura frejmove sa zadatim vremenima hvatanja cim take() ceka
+def _feed(tap, times):
+    def run():
+        while not tap.active:
+            time.sleep(0.001)
+        for t in times:
+            tap.push(b"\0" * 3, 1, 1, "rgb24", t=t)
+            time.sleep(0.01)
+        tap.close()
+    th = threading.Thread(target=run, daemon=True)
+    th.start()
+    return th
+
+def _take(times, n, interval, fps=5.0):
+    tap = FrameTap()
+    tap.open(fps)
+    got = []
+    th = _feed(tap, times)
+    tap.take(n, interval, 2.0, got.append)
+    th.join(2.0)
+    return [f.t for f in got]
+
+def test_burst_equal_to_tap_fps_keeps_every_jittered_frame():
+    jitter = [0.0, -0.012, 0.009, -0.02, 0.015, -0.008, 0.011, -0.018]
+    times = [100.0 + i * 0.2 + j for i, j in enumerate(jitter)]
+    assert _take(times, len(times), 0.2) == times
+
+def test_faster_source_is_thinned_to_burst_rate():
+    jitter = [0.0, 0.004, -0.006, 0.003, -0.002, 0.005, -0.004, 0.002, -0.003, 0.001]
+    times = [100.0 + i * 0.1 + j for i, j in enumerate(jitter)]
+    assert _take(times, 5, 0.2, fps=10.0) == times[::2]
+
+def test_gap_in_source_restarts_grid_without_catch_up():
+    times = [100.0, 100.2, 101.0, 101.05, 101.2, 101.4]
+    assert _take(times, 4, 0.2) == [100.0, 100.2, 101.0, 101.2]
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+
+from modules.jobs import Job, JobQueue, JobState
+
+# Event koji se postavlja kad je n poslova gotovo
+def _done_event(q, n):
+    done = threading.Event()
+    def on_job(job):
+        if sum(j.state == JobState.DONE for j in q.jobs.values()) >= n:
+            done.set()
+    q.on_job.connect(on_job)
+    return done
+
+def _file(tmp_path, name, data=b"x" * 1000):
+    p = tmp_path / name
+    p.write_bytes(data)
+    return str(p)
+
+def test_submit_persists_before_start(tmp_path):
+    path = tmp_path / "jobs.json"
+    q = JobQueue(path=path)
+    job = q.submit("checksum", _file(tmp_path, "a.mp4"))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert [d["id"] for d in data["jobs"]] == [job.id]
+    assert data["jobs"][0]["state"] == JobState.QUEUED
+    assert q.submit("nope", "x") is None
+
+def test_interrupted_job_resumes_after_restart(tmp_path):
+    path = tmp_path / "jobs.json"
+    src = _file(tmp_path, "a.mp4", b"abc" * 1000)
+    # Stanje kakvo ostaje kad se aplikacija ugasi usred posla
+    job = Job("checksum", src, dst=src + ".sha256", state=JobState.RUNNING, progress=0.4)
+    path.write_text(json.dumps({"jobs": [job.to_dict()]}), encoding="utf-8")
+    q = JobQueue(path=path, workers=1)
+    logs = []
+    q.on_log.connect(logs.append)
+    done = _done_event(q, 1)
+    q.start()
+    try:
+        assert done.wait(10.0)
+    finally:
+        q.close()
+    assert any("nastavljam 1" in l for l in logs)
+    digest = hashlib.sha256(b"abc" * 1000).hexdigest()
+    assert (tmp_path / "a.mp4.sha256").read_text(encoding="utf-8").startswith(digest)
+    saved = json.loads(path.read_text(encoding="utf-8"))["jobs"]
+    assert [(d["id"], d["state"]) for d in saved] == [(job.id, JobState.DONE)]
+
+def test_finished_jobs_are_not_rerun(tmp_path):
+    path = tmp_path / "jobs.json"
+    q = JobQueue(path=path, workers=1)
+    q.start()
+    done = _done_event(q, 1)
+    q.submit("checksum", _file(tmp_path, "a.mp4"))
+    assert done.wait(10.0)
+    q.close()
+    q2 = JobQueue(path=path, workers=1)
+    q2.start()
+    try:
+        assert q2.pending() == [] and len(q2.jobs) == 1
+    finally:
+        q2.close()
+
+def test_priority_order_with_one_worker(tmp_path):
+    q = JobQueue(path=tmp_path / "jobs.json", workers=1)
+    order = []
+    q.on_job.connect(lambda j: j.state == JobState.RUNNING and j.src not in order and order.append(j.src))
+    srcs = [_file(tmp_path, f"{n}.mp4") for n in ("low", "high", "mid")]
+    for src, prio in zip(srcs, (9, 1, 5)):
+        q.submit("checksum", src, priority=prio)
+    done = _done_event(q, 3)
+    q.start()
+    try:
+        assert done.wait(10.0)
+    finally:
+        q.close()
+    assert order == [srcs[1], srcs[2], srcs[0]]
+
+def test_recording_lowers_limit(tmp_path):
+    q = JobQueue(path=tmp_path / "jobs.json", workers=4, workers_recording=1)
+    assert q.limit == 4
+    q.set_recording("rec", True)
+    q.set_recording("session", True)
+    q.set_recording("rec", False)
+    assert q.limit == 1
+    q.set_recording("session", False)
+    assert q.limit == 4
+
+def test_failed_replace_marks_job_failed(tmp_path):
+    path = tmp_path / "jobs.json"
+    src = _file(tmp_path, "a.mp4")
+    # Direktorijum na mestu cilja: os.replace pada kao kod zakljucanog fajla
+    (tmp_path / "a.mp4.sha256").mkdir()
+    (tmp_path / "a.mp4.sha256" / "x").write_bytes(b"")
+    q = JobQueue(path=path, workers=1)
+    failed = threading.Event()
+    q.on_job.connect(lambda job: job.state == JobState.FAILED and failed.set())
+    q.start()
+    try:
+        job = q.submit("checksum", src)
+        assert failed.wait(10.0)
+    finally:
+        q.close()
+    assert "ne mogu da upisem" in job.error
+    saved = json.loads(path.read_text(encoding="utf-8"))["jobs"]
+    assert [d["state"] for d in saved] == [JobState.FAILED]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.mp4", "a.mp4.sha256", "jobs.json"]
@@ -0,0 +1,48 @@
+import re
+import threading
+
+from modules.logpipe import LogBatcher
+
+def _text(lines):
+    return [re.sub(r"^\[\d\d:\d\d:\d\d\] ", "", l) for l in lines]
+
+def test_repeats_collapse_into_one_line():
+    b = LogBatcher(100, 10.0)
+    for line in ["a", "a", "a", "b", "b"]:
+        b.push(line)
+    assert _text(b.drain()) == ["a", "    ... (ponovljeno jos 2x)", "b", "    ... (ponovljeno jos 1x)"]
+    assert b.drain() == []
+
+def test_backpressure_drops_oldest_and_reports():
+    b = LogBatcher(3, 10.0)
+    for i in range(5):
+        b.push(f"l{i}")
+    lines = b.drain()
+    assert _text(lines[:3]) == ["l2", "l3", "l4"]
+    assert lines[3].startswith("[log] 2 linija odbaceno") and b.dropped_total == 2
+
+def test_timer_delivers_batches(tmp_path):
+    got, done = [], threading.Event()
+    b = LogBatcher(100, 0.02)
+    b.attach_file(tmp_path / "session.log", 1024 * 1024, 1)
+    b.start(lambda lines: (got.append(lines), done.set()))
+    b.push("x")
+    b.push("y")
+    assert done.wait(2.0)
+    b.push("z")
+    b.close()
+    assert [_text(batch) for batch in got][0] == ["x", "y"]
+    assert _text(sum(got, [])) == ["x", "y", "z"]
+    assert "z" in (tmp_path / "session.log").read_text(encoding="utf-8")
+
+def test_concurrent_push_keeps_every_line():
+    b = LogBatcher(100000, 10.0)
+    def worker(n):
+        for i in range(500):
+            b.push(f"{n}:{i}")
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(b.drain()) == 2000
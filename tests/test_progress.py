@@ -0,0 +1,62 @@
+from modules.progress import EncoderStats, ProgressParser, StatsHistory
+
+BLOCK = """frame=150
+fps=29.97
+stream_0_0_q=23.0
+bitrate=1234.5kbits/s
+total_size=772608
+out_time_us=5000000
+out_time=00:00:05.000000
+dup_frames=2
+drop_frames=1
+speed=1.01x
+progress={}
+"""
+
+def _feed(parser, text):
+    out = []
+    for line in text.splitlines():
+        st = parser.feed(line)
+        if st is not None:
+            out.append(st)
+    return out
+
+def test_block_parses_on_progress_line():
+    stats = _feed(ProgressParser(), BLOCK.format("continue"))
+    assert len(stats) == 1
+    s = stats[0]
+    assert (s.frame, s.fps, s.bitrate_kbps, s.total_size) == (150, 29.97, 1234.5, 772608)
+    assert (s.out_time_sec, s.dup_frames, s.drop_frames, s.speed) == (5.0, 2, 1, 1.01)
+    assert not s.ended and not s.behind
+
+def test_end_block_and_missing_values():
+    text = "frame=0\nbitrate=N/A\nout_time_us=N/A\nspeed=N/A\nprogress=end\n"
+    (s,) = _feed(ProgressParser(), text)
+    assert s.ended
+    assert s.bitrate_kbps is None and s.speed is None and s.out_time_sec == 0.0
+
+def test_blocks_do_not_leak_keys():
+    parser = ProgressParser()
+    _feed(parser, BLOCK.format("continue"))
+    (s,) = _feed(parser, "frame=160\nprogress=continue\n")
+    assert s.frame == 160 and s.drop_frames == 0 and s.speed is None
+
+def test_negative_out_time_clamps_to_zero():
+    (s,) = _feed(ProgressParser(), "out_time_us=-9223372036854775807\nprogress=continue\n")
+    assert s.out_time_sec == 0.0
+
+def test_vfr_frame_accounting():
+    s = EncoderStats(frame=40, out_time_sec=10.0, speed=0.9)
+    assert s.expected_frames(30) == 300
+    assert s.skipped_frames(30) == 260
+    assert s.behind
+
+def test_history_is_bounded_ring():
+    h = StatsHistory(3)
+    assert h.latest is None and len(h) == 0
+    for i in range(5):
+        h.append(EncoderStats(frame=i))
+    assert [s.frame for s in h.snapshot()] == [2, 3, 4]
+    assert h.latest.frame == 4
+    h.clear()
+    assert h.snapshot() == [] and h.latest is None
@@ -0,0 +1,82 @@
+import subprocess
+import time
+
+from modules.capture import RecordSpec
+from modules.constants import Rendition
+from modules.library import probe_media
+from modules.recorder import RecState, Recorder
+
+def _spec(path, **kw):
+    return RecordSpec(0, 0, 320, 240, 15, 30, str(path), backend="lavfi", **kw)
+
+def _record(rec, spec, seconds=1.5):
+    states = []
+    rec.on_state.connect(states.append)
+    assert rec.start(spec)
+    deadline = time.time() + 15
+    while rec.state == RecState.STARTING and time.time() < deadline:
+        time.sleep(0.02)
+    assert rec.state == RecState.RECORDING
+    time.sleep(seconds)
+    rec.stop()
+    assert rec.wait(30)
+    return states
+
+def test_start_stop_mp4(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    out = tmp_path / "a.mp4"
+    try:
+        states = _record(rec, _spec(out))
+    finally:
+        rec.close()
+    assert states == [RecState.STARTING, RecState.RECORDING, RecState.STOPPING, RecState.FINALIZING, RecState.IDLE]
+    assert rec.last_exit_code == 0 and rec.parts == [str(out)]
+    assert rec.start_latency_ms is not None and rec.latest_stats is not None
+    meta = probe_media(str(out), ffmpeg)
+    assert (meta["width"], meta["height"]) == (320, 240) and meta["duration"] > 0.5
+
+def test_fmp4_with_faststart(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    out = tmp_path / "b.mp4"
+    try:
+        _record(rec, _spec(out, output_mode="fmp4", frag_sec=0.5, faststart=True))
+    finally:
+        rec.close()
+    assert rec.state == RecState.IDLE and rec.last_exit_code == 0
+    assert probe_media(str(out), ffmpeg)["duration"] > 0.5
+
+def test_bad_spec_is_rejected_without_state_change(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    try:
+        assert not rec.start(_spec(tmp_path / "c.mp4", encoder="nope"))
+        assert rec.state == RecState.IDLE and not rec.is_busy
+    finally:
+        rec.close()
+
+def test_second_start_while_busy_is_refused(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    try:
+        assert rec.start(_spec(tmp_path / "d.mp4"))
+        assert not rec.start(_spec(tmp_path / "e.mp4"))
+        rec.stop()
+        assert rec.wait(30)
+    finally:
+        rec.close()
+    assert not (tmp_path / "e.mp4").exists()
+
+def _has_audio(path, ffmpeg):
+    err = subprocess.run([ffmpeg, "-hide_banner", "-i", str(path)], capture_output=True, timeout=10).stderr
+    return b"Audio:" in err
+
+def test_separate_audio_reaches_renditions(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    out = tmp_path / "f.mp4"
+    spec = _spec(out, record_audio=True, audio_devices=("lavfi:sine",), audio_mode="separate",
+                 renditions=(Rendition("120p", 120),))
+    try:
+        _record(rec, spec)
+    finally:
+        rec.close()
+    assert rec.last_exit_code == 0 and len(rec.rendition_files) == 1
+    assert _has_audio(out, ffmpeg) and _has_audio(rec.rendition_files[0], ffmpeg)
+    assert not list(tmp_path.glob("*.mka"))
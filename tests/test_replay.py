@@ -0,0 +1,51 @@
+import threading
+import time
+from dataclasses import replace
+
+from modules.capture import RecordSpec, replay_list_path, replay_ring_size
+from modules.constants import VIDEO_SUBDIR
+from modules.library import probe_media
+from modules.recorder import RecState, Recorder
+from modules.replay import ReplayBuffer
+
+def _spec(**kw):
+    return RecordSpec(0, 0, 320, 240, 15, 30, "", backend="lavfi", **kw)
+
+def test_pick_segments_newest_first(tmp_path):
+    rb = ReplayBuffer(Recorder("ffmpeg"), str(tmp_path))
+    rb.spec = replace(_spec(), outfile=str(tmp_path / "replay.mp4"), output_mode="replay", frag_sec=2.0)
+    names = [f"replay_{i:06d}.mp4" for i in range(6)]
+    for n in names:
+        (tmp_path / n).write_bytes(b"x")
+    # Zavrseni segmenti su u csv listi, poslednji se jos pise
+    rows = "".join(f"{n},{2.0 * i:.3f},{2.0 * i + 2:.3f}\n" for i, n in enumerate(names[:-1]))
+    (tmp_path / "replay.csv").write_text(rows, encoding="utf-8")
+    assert replay_list_path(rb.spec.outfile) == str(tmp_path / "replay.csv")
+    # 1 s (pola segmenta u toku) + 2 + 2 >= 5
+    assert [p.name for p in rb.pick_segments(5.0)] == names[-3:]
+    assert [p.name for p in rb.pick_segments(100.0)] == names
+
+def test_ring_evicts_and_save_joins(ffmpeg, tmp_path):
+    rec = Recorder(ffmpeg)
+    rb = ReplayBuffer(rec, str(tmp_path / "scratch"))
+    saved = []
+    done = threading.Event()
+    rb.on_saved.connect(lambda p: (saved.append(p), done.set()))
+    rb.on_save_failed.connect(lambda r: done.set())
+    try:
+        assert rb.start(_spec(replay_sec=2))
+        deadline = time.time() + 15
+        while rec.state != RecState.RECORDING and time.time() < deadline:
+            time.sleep(0.05)
+        assert rb.running
+        time.sleep(7.5)
+        # Ring: replay_sec / frag_sec + 2 segmenta (+ jedan koji se brise u sledecem krugu)
+        assert len(rb._segments()) <= replay_ring_size(rb.spec) + 1
+        assert rb.save(str(tmp_path / "out"))
+        assert done.wait(30)
+    finally:
+        rb.close()
+        rec.close()
+    assert len(saved) == 1 and saved[0].startswith(str(tmp_path / "out" / VIDEO_SUBDIR))
+    assert probe_media(saved[0], ffmpeg)["duration"] >= 2.0
+    assert list((tmp_path / "scratch").glob("replay_*.mp4")) == []
@@ -0,0 +1,15 @@
+from modules.capture import RecordSpec
+from modules.constants import Rendition
+from modules.session import RecordingSession
+
+def _spec(name, **kw):
+    return RecordSpec(0, 0, 320, 240, 15, 30, f"/out/{name}.mp4", backend="lavfi", **kw)
+
+def test_encoder_limit_counts_renditions():
+    sess = RecordingSession("ffmpeg", max_encoders=3)
+    status = []
+    sess.on_status.connect(lambda msg, col: status.append(msg))
+    proxy = (Rendition("120p", 120),)
+    assert not sess.start([_spec("a", renditions=proxy), _spec("b", renditions=proxy)])
+    assert status and "4 enkodera > limit 3" in status[0]
+    assert sess.recorders == [] and not sess.is_busy
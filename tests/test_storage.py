@@ -0,0 +1,86 @@
+import json
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from modules import storage
+from modules.capture import RecordSpec
+from modules.constants import Rendition, VIDEO_SUBDIR
+from modules.storage import StorageConfig, ThroughputCache, estimate_bytes_per_sec, plan
+
+def _spec(tmp_path, **kw):
+    out = tmp_path / "out" / VIDEO_SUBDIR
+    out.mkdir(parents=True, exist_ok=True)
+    return RecordSpec(0, 0, 1920, 1080, 60, 18, str(out / "capture_1.mp4"), backend="lavfi", **kw)
+
+# Kes sa unapred upisanim merenjima (MB/s po kljucu volumena)
+def _cache(tmp_path, volumes):
+    path = tmp_path / "storage.json"
+    data = {k: {"mbps": v, "stamp": time.time()} for k, v in volumes.items()}
+    path.write_text(json.dumps({"volumes": data}), encoding="utf-8")
+    return ThroughputCache(path=path)
+
+# Dva "diska" unutar tmp_path: sve ispod staging/ je drugi volumen
+@pytest.fixture
+def two_volumes(monkeypatch):
+    monkeypatch.setattr(storage, "volume_key", lambda p: "fast" if "staging" in Path(p).parts else "slow")
+
+def test_min_free_rejects_start(tmp_path):
+    with pytest.raises(ValueError):
+        plan(_spec(tmp_path), StorageConfig(min_free_mb=1 << 40), lambda m: None, _cache(tmp_path, {}))
+
+def test_unmeasured_disk_is_deferred_not_probed(tmp_path):
+    cache = _cache(tmp_path, {})
+    spec = _spec(tmp_path)
+    out = plan(spec, StorageConfig(min_free_mb=1), lambda m: None, cache)
+    assert out.outfile == spec.outfile and out.min_free_mb == 1
+    assert list(Path(spec.outfile).parent.iterdir()) == []  # nista nije pisano na start
+    assert cache.take_pending() == [str(Path(spec.outfile).parent)]
+    assert cache.take_pending() == []
+
+def test_fast_disk_records_directly(tmp_path, two_volumes):
+    spec = _spec(tmp_path)
+    out = plan(spec, StorageConfig(staging_dir=str(tmp_path / "staging"), min_free_mb=0), lambda m: None,
+               _cache(tmp_path, {"slow": 10000.0}))
+    assert out.outfile == spec.outfile and out.stage_to == ""
+
+def test_slow_disk_uses_staging(tmp_path, two_volumes):
+    spec = _spec(tmp_path)
+    logs = []
+    out = plan(spec, StorageConfig(staging_dir=str(tmp_path / "staging"), min_free_mb=0), logs.append,
+               _cache(tmp_path, {"slow": 0.5, "fast": 10000.0}))
+    assert Path(out.outfile) == tmp_path / "staging" / VIDEO_SUBDIR / "capture_1.mp4"
+    assert out.stage_to == spec.outfile
+    assert Path(out.outfile).parent.is_dir()
+    assert any(m.startswith("UPOZORENJE") for m in logs)
+
+def test_staging_not_used_when_unmeasured_or_slow(tmp_path, two_volumes):
+    spec = _spec(tmp_path)
+    cfg = StorageConfig(staging_dir=str(tmp_path / "staging"), min_free_mb=0)
+    cache = _cache(tmp_path, {"slow": 0.5})
+    assert plan(spec, cfg, lambda m: None, cache).stage_to == ""
+    assert cache.take_pending() == [str(tmp_path / "staging" / VIDEO_SUBDIR)]
+    assert plan(spec, cfg, lambda m: None, _cache(tmp_path, {"slow": 0.5, "fast": 0.6})).stage_to == ""
+
+def test_staging_on_same_volume_falls_back(tmp_path):
+    spec = _spec(tmp_path)
+    key = storage.volume_key(str(tmp_path))
+    logs = []
+    out = plan(spec, StorageConfig(staging_dir=str(tmp_path / "staging"), min_free_mb=0), logs.append,
+               _cache(tmp_path, {key: 0.5}))
+    assert out.outfile == spec.outfile and out.stage_to == ""
+    assert any("istom disku" in m for m in logs)
+
+def test_two_stage_and_replay_are_not_staged(tmp_path, two_volumes):
+    cfg = StorageConfig(staging_dir=str(tmp_path / "staging"), min_free_mb=0)
+    cache = _cache(tmp_path, {"slow": 0.5, "fast": 10000.0})
+    assert plan(_spec(tmp_path, capture_codec="ffv1"), cfg, lambda m: None, cache).stage_to == ""
+    assert plan(_spec(tmp_path, output_mode="replay"), cfg, lambda m: None, cache).stage_to == ""
+
+def test_estimate_counts_renditions(tmp_path):
+    base = estimate_bytes_per_sec(_spec(tmp_path))
+    proxy = estimate_bytes_per_sec(_spec(tmp_path, renditions=(Rendition("540p", 540, 18),)))
+    assert proxy == pytest.approx(base * 1.25)
+    assert estimate_bytes_per_sec(replace(_spec(tmp_path), crf=24)) == pytest.approx(base / 2)
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from modules.capture import RecordSpec, build_record_args
+from modules.library import probe_media
+from modules.recorder import RecState, Recorder
+from modules.streaming import (
+    StreamMonitor, StreamTarget, build_tee_target, mask_url, parse_targets, stream_format, stream_slave_opts,
+    tee_escape, tee_slave,
+)
+
+RTMP = "rtmp://live.example.com/app/sk-12345"
+
+def test_stream_format_by_scheme():
+    assert stream_format(RTMP) == "flv"
+    assert stream_format("srt://h:9000?mode=caller") == "mpegts"
+    assert stream_format(r"\\.\pipe\obs") == "mpegts"
+    assert StreamTarget(RTMP, fmt="mpegts").muxer == "mpegts"
+
+def test_from_cfg():
+    a, b = parse_targets([RTMP, {"url": "udp://239.0.0.1:1234", "reconnect": False, "extra": 1}])
+    assert a.url == RTMP and a.reconnect
+    assert b.url == "udp://239.0.0.1:1234" and not b.reconnect
+    with pytest.raises(ValueError):
+        StreamTarget.from_cfg({"url": " "})
+
+@pytest.mark.parametrize("url, masked", [
+    (RTMP, "rtmp://live.example.com/app/***"),
+    ("rtmps://h/app/key?x=1", "rtmps://h/app/***?x=1"),
+    ("rtmp://h/app", "rtmp://h/app"),
+    ("srt://h:9000?streamid=abc&passphrase=p4ss&latency=200", "srt://h:9000?streamid=***&passphrase=***&latency=200"),
+    ("rtmp://user:pw@h/app/k", "rtmp://user:***@h/app/***"),
+])
+def test_mask_url(url, masked):
+    assert mask_url(url) == masked
+
+def test_tee_escape():
+    assert tee_escape("a:b|c[d]e'f\\") == "a\\:b\\|c\\[d\\]e\\'f\\\\"
+
+def test_tee_slave_escapes_option_values_twice_and_target_once():
+    slave = tee_slave([("f", "mp4"), ("movflags", "+a:b")], "C:/v|x.mp4")
+    # Prvi nivo (tee) vidi "[f=mp4:movflags=+a\:b]C:/v|x.mp4", drugi (opcije) "+a:b"
+    assert slave == "\\[f=mp4\\:movflags=+a\\\\\\:b\\]C\\:/v\\|x.mp4"
+
+def test_stream_slave_opts():
+    d = dict(stream_slave_opts(StreamTarget(RTMP, retry_sec=0.5, max_retries=3, queue=100)))
+    assert (d["f"], d["onfail"], d["use_fifo"], d["flvflags"]) == ("flv", "ignore", "1", "no_duration_filesize")
+    fifo = dict(kv.split("=") for kv in d["fifo_options"].split(":"))
+    assert fifo["queue_size"] == "100" and fifo["drop_pkts_on_overflow"] == "1"
+    assert fifo["recovery_wait_time"] == "0.5" and fifo["max_recovery_attempts"] == "3"
+    d = dict(stream_slave_opts(StreamTarget("udp://h:1", reconnect=False)))
+    assert "attempt_recovery" not in d["fifo_options"] and "flvflags" not in d
+
+def test_build_tee_target_file_first():
+    target = build_tee_target("mp4", [("movflags", "+faststart")], "/out/a.mp4", [StreamTarget(RTMP)])
+    file_slave, stream = target.split("|", 1)
+    assert file_slave == "\\[f=mp4\\:movflags=+faststart\\]/out/a.mp4"
+    assert stream.startswith("\\[f=flv\\:onfail=ignore") and stream.endswith("]rtmp\\://live.example.com/app/sk-12345")
+
+def test_record_args_with_streams():
+    spec = RecordSpec(0, 0, 1280, 720, 30, 23, "/out/a.mp4", backend="lavfi", streams=(StreamTarget(RTMP),))
+    args = build_record_args(spec)
+    assert args[args.index("-map") + 1] == "0:v"
+    assert args[args.index("-g") + 1] == "60"  # STREAM_KEYFRAME_SEC
+    assert args[-4:-1] == ["+global_header", "-f", "tee"]
+    assert args[-1].startswith("\\[\\]/out/a.mp4|")
+
+def test_monitor_retry_and_lost():
+    mon = StreamMonitor([StreamTarget(RTMP), StreamTarget("udp://h:1")])
+    err = f"[fifo @ 0x1] Error opening {RTMP}: Connection refused"
+    first = mon.feed(err)
+    assert first[:2] == (0, "retry") and "sk-12345" not in first[2]
+    assert [mon.feed(err) for _ in range(8)] == [None] * 8
+    assert mon.feed(err)[:2] == (0, "retry")  # deseti pokusaj
+    lost = mon.feed("[tee @ 0x2] Slave muxer #2 failed: I/O error, continuing with 2/3 slaves.")
+    assert lost[:2] == (1, "lost")
+    assert mon.feed("[tee @ 0x2] Slave muxer #2 failed: I/O error, continuing with 1/3 slaves.") is None
+    assert mon.feed("Slave muxer #0 failed: x, continuing") is None  # fajl nije stream
+    assert mon.summary() == [
+        "Stream rtmp://live.example.com/app/***: 10 neuspelih pokušaja povezivanja.",
+        "Stream udp://h:1: ugašen tokom snimanja.",
+    ]
+    mon.reopen()
+    assert mon.lost == [False, False]
+
+def test_monitor_masks_command_line():
+    mon = StreamMonitor([StreamTarget(RTMP)])
+    line = "ffmpeg ... " + tee_escape(RTMP) + " " + RTMP
+    assert "sk-12345" not in mon.mask(line)
+
+# Pravi tee: fajl + "stream" u lokalni .ts fajl iz istog enkoda
+def test_record_file_and_stream(ffmpeg, tmp_path):
+    out, ts = tmp_path / "a.mp4", tmp_path / "live.ts"
+    spec = RecordSpec(0, 0, 320, 240, 15, 30, str(out), backend="lavfi", streams=(StreamTarget(str(ts)),))
+    rec = Recorder(ffmpeg)
+    try:
+        assert rec.start(spec)
+        deadline = time.time() + 15
+        while rec.state == RecState.STARTING and time.time() < deadline:
+            time.sleep(0.02)
+        assert rec.state == RecState.RECORDING
+        time.sleep(1.5)
+        rec.stop()
+        assert rec.wait(30)
+    finally:
+        rec.close()
+    assert rec.last_exit_code == 0
+    assert probe_media(str(out), ffmpeg)["duration"] > 0.5
+    assert ts.stat().st_size > 0
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from modules.capture import RecordSpec, build_record_args
+from modules.constants import Rendition, TWO_STAGE_X264_PRESET
+from modules.twostage import TwoStageConfig, final_path, intermediate_dir, plan, transcode_jobs, transcode_preset
+
+def _spec(tmp_path, **kw):
+    return RecordSpec(0, 0, 1280, 720, 30, 21, str(tmp_path / "out" / "capture_1.mp4"), backend="lavfi", **kw)
+
+def test_plan_moves_capture_to_scratch(tmp_path):
+    logs = []
+    spec = _spec(tmp_path, output_mode="fmp4", faststart=True)
+    spec = plan(spec, str(tmp_path / "scratch"), TwoStageConfig(), logs.append)
+    assert Path(spec.outfile) == intermediate_dir(str(tmp_path / "scratch")) / "capture_1.mkv"
+    assert Path(spec.transcode_to) == tmp_path / "out" / "capture_1.mp4"
+    assert (spec.capture_codec, spec.output_mode, spec.faststart) == ("x264_qp0", "mp4", False)
+    # Enkoder i CRF ostaju za transcode posao
+    assert (spec.encoder, spec.crf) == ("libx264", 21)
+    assert spec.max_bytes == int(TwoStageConfig().cap_gb * 1024 ** 3) and logs == []
+    args = build_record_args(spec)
+    assert args[args.index("-qp") + 1] == "0" and args[-1] == spec.outfile
+
+def test_plan_falls_back_to_direct_encode(tmp_path):
+    scratch = str(tmp_path / "scratch")
+    logs = []
+    assert plan(_spec(tmp_path), scratch, TwoStageConfig(codec="nope"), logs.append) is None
+    assert plan(_spec(tmp_path, output_mode="replay"), scratch, TwoStageConfig(), logs.append) is None
+    assert plan(_spec(tmp_path, renditions=(Rendition("360p", 360),)), scratch, TwoStageConfig(), logs.append) is None
+    assert len(logs) == 2
+
+def test_plan_respects_scratch_cap(tmp_path):
+    scratch = str(tmp_path / "scratch")
+    folder = intermediate_dir(scratch)
+    folder.mkdir(parents=True)
+    (folder / "waiting.mkv").write_bytes(b"x" * 4096)
+    cfg = TwoStageConfig(cap_gb=8192 / 1024 ** 3)
+    assert plan(_spec(tmp_path), scratch, cfg, lambda m: None).max_bytes == 4096
+    (folder / "more.mkv").write_bytes(b"x" * 4096)
+    logs = []
+    assert plan(_spec(tmp_path), scratch, cfg, logs.append) is None
+    assert "pun" in logs[0]
+
+def test_final_path_keeps_part_names(tmp_path):
+    spec = plan(_spec(tmp_path), str(tmp_path / "scratch"), TwoStageConfig(), lambda m: None)
+    part = str(Path(spec.outfile).with_name("capture_1_p02.mkv"))
+    assert Path(final_path(spec, spec.outfile)) == tmp_path / "out" / "capture_1.mp4"
+    assert Path(final_path(spec, part)) == tmp_path / "out" / "capture_1_p02.mp4"
+
+def test_transcode_jobs_skip_missing_and_empty_parts(tmp_path):
+    spec = plan(_spec(tmp_path), str(tmp_path / "scratch"), TwoStageConfig(), lambda m: None)
+    folder = Path(spec.outfile).parent
+    (folder / "capture_1.mkv").write_bytes(b"x")
+    (folder / "capture_1_p01.mkv").write_bytes(b"")
+    parts = [str(folder / n) for n in ("capture_1.mkv", "capture_1_p01.mkv", "capture_1_p02.mkv")]
+    jobs = transcode_jobs(spec, parts, TwoStageConfig())
+    assert [(Path(src).name, Path(dst).name) for src, dst, _ in jobs] == [("capture_1.mkv", "capture_1.mp4")]
+    assert jobs[0][2] == {"encoder": "libx264", "preset": TWO_STAGE_X264_PRESET, "crf": "21", "threads": "0"}
+
+def test_transcode_preset():
+    assert transcode_preset("libx264") == TWO_STAGE_X264_PRESET
+    assert transcode_preset("libx264", "medium") == "medium"
+    assert transcode_preset("h264_nvenc") == "p4"
+    assert transcode_preset("unknown") == ""